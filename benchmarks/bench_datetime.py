@@ -0,0 +1,42 @@
+"""Benchmark the array conversions of OqDateTime against loops of the scalar ones.
+
+Parses request window strings, most of them repeated, and labels one minute bars, checks
+both paths give the same result and prints the time of each.
+
+Run with `python benchmarks/bench_datetime.py`.
+"""
+import time
+
+import numpy as np
+
+from onequant.util.datetime import OqDateTime
+
+TZ = 'Asia/Shanghai'
+
+
+def _timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def main(n_windows=200000, n_bars=500000):
+    """Prints the time of both paths for parsing and labelling."""
+    days = [f'2023{month:02d}{day:02d}' for month in range(1, 13) for day in range(1, 29)]
+    strings = np.array([days[i % len(days)] if i % 2 else '2023-06-01 09:00:00' for i in range(n_windows)])
+    loop, loop_time = _timed(lambda: [OqDateTime.string_to_ms_timestamp(s, tz=TZ) for s in strings])
+    vector, vector_time = _timed(OqDateTime.strings_to_ms_timestamps, strings, tz=TZ)
+    assert np.array_equal(vector, loop)
+    print(
+        f'parse  n={n_windows}: loop {loop_time:7.3f} s  array {vector_time:7.3f} s  ({loop_time / vector_time:.1f}x)'
+    )
+
+    stamps = np.arange(n_bars, dtype='int64') * 60 + 1672531200
+    loop, loop_time = _timed(lambda: [OqDateTime.timestamp_to_string(t, tz=TZ) for t in stamps.tolist()])
+    vector, vector_time = _timed(OqDateTime.timestamps_to_strings, stamps, tz=TZ)
+    assert vector.tolist() == loop
+    print(f'label  n={n_bars}: loop {loop_time:7.3f} s  array {vector_time:7.3f} s  ({loop_time / vector_time:.1f}x)')
+
+
+if __name__ == '__main__':
+    main()
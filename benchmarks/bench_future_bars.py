@@ -0,0 +1,81 @@
+"""Benchmark long K-line requests end to end against the local stand-in server.
+
+Fetches `days` days of 1m bars with `OqQuotes.future_bars`, decoding each chunk as a whole and
+streamed, checks both frames are equal and prints the time and the bars per second of each.
+
+Then decodes one response holding all those bars, as received in pieces of `STREAM_CHUNK_SIZE`
+bytes, as a whole (joined, `json.loads`, columns) and streamed (`iter_tddata_chunks`), and prints
+the peak memory allocated by each, measured with tracemalloc.
+
+Run with `python benchmarks/bench_future_bars.py`.
+"""
+import json
+import time
+import tracemalloc
+
+import pandas as pd
+
+from onequant.api.quotes import OqQuotes
+from onequant.api.request import STREAM_CHUNK_SIZE, ApiWrapper
+from onequant.api.standin import StandInServer
+from onequant.api.synthetic import encode, kline_range_payload
+from onequant.api.tdstream import _columns_output, concat_chunks, iter_tddata_chunks
+from onequant.api.wrapper import _tddata_columns, _to_output
+
+
+def _timed(quotes, end_time, stream, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        frame = quotes.future_bars('rb000', '1m', '20230101', end_time, stream=stream)
+        best = min(best, time.perf_counter() - start)
+    return frame, best
+
+
+def _decode_whole(pieces):
+    # what requests does with response.content and response.json()
+    return _to_output(*_tddata_columns(json.loads(b''.join(pieces))))
+
+
+def _decode_streamed(pieces):
+    return _columns_output(concat_chunks(iter_tddata_chunks(iter(pieces))))
+
+
+def _peak(decode, pieces):
+    """Returns the frame decoded from the pieces and the peak memory allocated meanwhile, in bytes."""
+    tracemalloc.start()
+    try:
+        frame = decode(pieces)
+        return frame, tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def main(days=120, repeat=3):
+    """Prints the time of a long K-line request decoded as a whole and streamed, and their peak memory."""
+    end_time = (pd.Timestamp('2023-01-01') + pd.Timedelta(days=days)).strftime('%Y%m%d')
+    with StandInServer() as server:
+        quotes = OqQuotes(ApiWrapper(server.url, 'bench', 'bench'))
+        whole, whole_time = _timed(quotes, end_time, False, repeat)
+        streamed, streamed_time = _timed(quotes, end_time, True, repeat)
+    pd.testing.assert_frame_equal(whole, streamed)
+
+    print(f'bars={len(whole)}')
+    print(f'whole:    {whole_time:8.3f} s  {len(whole) / whole_time:12,.0f} bars/s')
+    print(f'streamed: {streamed_time:8.3f} s  {len(whole) / streamed_time:12,.0f} bars/s')
+
+    start, end = (int(pd.Timestamp(t).timestamp() * 1000) for t in ('2023-01-01', end_time))
+    body = encode(kline_range_payload('rb000', start, end))
+    pieces = [body[i : i + STREAM_CHUNK_SIZE] for i in range(0, len(body), STREAM_CHUNK_SIZE)]
+    del body
+    whole, whole_peak = _peak(_decode_whole, pieces)
+    streamed, streamed_peak = _peak(_decode_streamed, pieces)
+    pd.testing.assert_frame_equal(whole, streamed)
+    frame_size = streamed.memory_usage(deep=True).sum()
+    print(f'one response of {sum(map(len, pieces)) / 1e6:.0f} MB, frame of {frame_size / 1e6:.0f} MB')
+    print(f'whole:    peak {whole_peak / 1e6:8.1f} MB')
+    print(f'streamed: peak {streamed_peak / 1e6:8.1f} MB  ({streamed_peak / whole_peak:.2f}x)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""Benchmark the cold import time of the onequant modules.
+
+Imports every module of `TARGETS` in a fresh interpreter with `python -X importtime`, prints the
+best cumulative import time of a few runs and fails if a module pulls in one of the heavy
+modules it must not load at import, or takes longer than `BUDGET_MS`.
+
+Run with `python benchmarks/bench_import_time.py`.
+"""
+import subprocess
+import sys
+
+# the heavy modules only loaded when they are used
+HEAVY = ('pandas', 'numpy', 'matplotlib', 'wordcloud', 'aiohttp', 'asyncio')
+TARGETS = {
+    'onequant': HEAVY + ('requests',),
+    'onequant.api.client': HEAVY + ('requests',),
+    'onequant.api.trades': HEAVY,
+    'onequant.api.quotes': HEAVY,
+    'onequant.api.strategies': HEAVY,
+    'onequant.portfolio.strategy_folio': HEAVY + ('requests',),
+    'onequant.portfolio.polts': HEAVY,
+}
+# generous, only a regression pulling in a heavy dependency should exceed it
+BUDGET_MS = 150
+
+
+def import_time(module):
+    """Imports a module in a fresh interpreter.
+
+    Args:
+        module (str): The module to import.
+
+    Returns:
+        tuple: The cumulative import time of the module in ms and the set of the modules imported.
+    """
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'], capture_output=True, text=True, check=True
+    )
+    cumulative, imported = None, set()
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        _, total, name = line.split('|')
+        name = name.strip()
+        imported.add(name)
+        if name == module:
+            cumulative = int(total) / 1000
+    return cumulative, imported
+
+
+def main(repeat=5):
+    """Prints the import time of every target and exits with an error on a regression."""
+    failures = []
+    for module, forbidden in TARGETS.items():
+        best, imported = min(import_time(module) for _ in range(repeat))
+        heavy = sorted({name for name in imported if name.split('.')[0] in forbidden})
+        print(f'{module:36} {best:8.1f} ms')
+        if heavy:
+            failures.append(f'{module} imports {", ".join(heavy[:5])}')
+        if best > BUDGET_MS:
+            failures.append(f'{module} takes {best:.1f} ms, more than {BUDGET_MS} ms')
+    if failures:
+        sys.exit('\n'.join(failures))
+
+
+if __name__ == '__main__':
+    main()
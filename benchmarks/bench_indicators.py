@@ -0,0 +1,59 @@
+"""Benchmark the batch form of the indicators against their streaming form.
+
+Builds a random walk of minute bars, runs `compute` of every indicator on all of it and `update`
+bar by bar on a slice, checks both give the same values on the slice and prints the bars per
+second of each.
+
+Run with `python benchmarks/bench_indicators.py`.
+"""
+import time
+
+import numpy as np
+
+from onequant.indicators.ATR import ATR
+from onequant.indicators.BOLL import BOLL
+from onequant.indicators.EMA import EMA
+from onequant.indicators.MA import MA
+from onequant.indicators.MACD import MACD
+from onequant.indicators.RSI import RSI
+
+INDICATORS = (MA(20), EMA(12), MACD(12, 26, 9), RSI(14), ATR(14), BOLL(20, 2))
+
+
+def _bars(n_bars, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 3000 + np.cumsum(rng.normal(0, 1, n_bars)).round(1)
+    return {
+        'high': close + rng.uniform(0, 2, n_bars).round(1),
+        'low': close - rng.uniform(0, 2, n_bars).round(1),
+        'close': close,
+    }
+
+
+def main(n_bars=1000000, n_rows=100000):
+    """Prints the throughput of both forms of every indicator."""
+    bars = _bars(n_bars)
+    for indicator in INDICATORS:
+        inputs = [bars[name] for name in indicator.INPUTS]
+
+        start = time.perf_counter()
+        outputs = indicator.compute(*inputs)
+        batch_rate = n_bars / (time.perf_counter() - start)
+
+        streaming = type(indicator)(**indicator.params)
+        rows = zip(*(values[:n_rows].tolist() for values in inputs))
+        start = time.perf_counter()
+        streamed = [streaming.update(*row) for row in rows]
+        stream_rate = n_rows / (time.perf_counter() - start)
+
+        outputs = outputs if len(indicator.OUTPUTS) > 1 else (outputs,)
+        streamed = np.array(streamed).reshape(n_rows, -1)
+        assert all(np.array_equal(values[:n_rows], streamed[:, i], equal_nan=True) for i, values in enumerate(outputs))
+        print(
+            f'{type(indicator).__name__:5} compute {batch_rate:12,.0f} bars/s  update {stream_rate:10,.0f} bars/s'
+            f'  ({batch_rate / stream_rate:.1f}x)'
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+"""Benchmark KDJ.apply_to_df and StreamingKDJ against calling KDJ.calcKDJ on every row.
+
+Builds a random walk of minute bars, runs the row by row paths on a slice of it and the batch
+path on all of it, checks they give the same values on the slice and prints the bars per second.
+
+Run with `python benchmarks/bench_kdj.py`.
+"""
+import time
+
+import numpy as np
+import pandas as pd
+
+from onequant.indicators.KDJ import KDJ, StreamingKDJ
+
+
+def _bars(n_bars, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 3000 + np.cumsum(rng.normal(0, 1, n_bars)).round(1)
+    return pd.DataFrame(
+        {
+            'high': close + rng.uniform(0, 2, n_bars).round(1),
+            'low': close - rng.uniform(0, 2, n_bars).round(1),
+            'close': close,
+        }
+    )
+
+
+def main(n_bars=1000000, n_rows=50000, params=(43, 9, 3)):
+    """Prints the throughput of both paths."""
+    df = _bars(n_bars)
+
+    start = time.perf_counter()
+    kdj = KDJ(*params)
+    rows = [kdj.calcKDJ(h, l, c) for h, l, c in df.iloc[:n_rows].itertuples(index=False)]
+    row_rate = n_rows / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    kdj = StreamingKDJ(*params)
+    streamed = [kdj.calcKDJ(h, l, c) for h, l, c in df.iloc[:n_rows].itertuples(index=False)]
+    stream_rate = n_rows / (time.perf_counter() - start)
+    assert streamed == rows
+
+    start = time.perf_counter()
+    batch = KDJ(*params).apply_to_df(df.copy())
+    batch_rate = n_bars / (time.perf_counter() - start)
+
+    assert list(batch[['K', 'D', 'J']].iloc[:n_rows].itertuples(index=False, name=None)) == rows
+    print(f'calcKDJ     n={n_rows:>8}: {row_rate:12,.0f} bars/s')
+    print(f'streaming   n={n_rows:>8}: {stream_rate:12,.0f} bars/s  ({stream_rate / row_rate:.1f}x)')
+    print(f'apply_to_df n={n_bars:>8}: {batch_rate:12,.0f} bars/s  ({batch_rate / row_rate:.0f}x)')
+
+
+if __name__ == '__main__':
+    main()
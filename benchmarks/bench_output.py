@@ -0,0 +1,60 @@
+"""Benchmark the output backends of the decoded K-line data.
+
+Converts the columns of a synthetic kline response and synthetic json records to every backend
+of `onequant.api.output`, checks they hold the same values and prints the time and memory of each. The memory of
+a DataFrame includes its python string objects (`deep=True`).
+
+Run with `python benchmarks/bench_output.py`.
+"""
+import importlib.util
+import sys
+import time
+
+import numpy as np
+
+from onequant.api.output import OUTPUTS, num_rows
+from onequant.api.synthetic import kline_payload, report_rows
+from onequant.api.wrapper import _tddata_columns, _to_output
+
+
+def _nbytes(result):
+    if hasattr(result, 'memory_usage'):
+        return int(result.memory_usage(deep=True).sum())
+    if isinstance(result, dict):
+        return sum(
+            column.nbytes + (sum(map(sys.getsizeof, column)) if column.dtype == object else 0)
+            for column in result.values()
+        )
+    return result.nbytes
+
+
+def _report(name, data, code, outputs, repeat):
+    print(name)
+    for output in outputs:
+        best = float('inf')
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = _to_output(dict(data) if isinstance(data, dict) else data, code, output)
+            best = min(best, time.perf_counter() - start)
+        yield output, result
+        print(f'  {output:8} {best * 1000:9.2f} ms  {_nbytes(result) / 2 ** 20:8.1f} MB')
+
+
+def main(n_rows=500000, n_records=100000, repeat=3):
+    """Prints the conversion time and the size of every backend, for TDengine columns and json records."""
+    outputs = [output for output in OUTPUTS if output != 'arrow' or importlib.util.find_spec('pyarrow')]
+
+    columns, code = _tddata_columns(kline_payload(n_rows, seed=0))
+    for output, result in _report(f'kline columns, rows={n_rows}', columns, code, outputs, repeat):
+        assert num_rows(result) == n_rows
+        assert np.array_equal(np.asarray(result['close']), columns['close'])
+
+    records = report_rows(n_records)
+    sharpe = np.array([record['sharpe'] for record in records])
+    for output, result in _report(f'json records, rows={n_records}', records, 200, outputs, repeat):
+        assert num_rows(result) == n_records
+        assert np.array_equal(np.asarray(result['sharpe']), sharpe)
+
+
+if __name__ == '__main__':
+    main()
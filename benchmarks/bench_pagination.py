@@ -0,0 +1,40 @@
+"""Benchmark paginated queries against the local stand-in server.
+
+Serves `symbols` rows in pages of `page_size` rows with `latency` seconds per page and times
+`OqQuotes.symbols()` with one connection (the pages one after the other) and with a pool of
+`workers` connections (the pages fetched concurrently), checking both return the same rows.
+
+Run with `python benchmarks/bench_pagination.py`.
+"""
+import time
+
+import pandas as pd
+
+from onequant.api.quotes import OqQuotes
+from onequant.api.request import ApiWrapper
+from onequant.api.standin import StandInServer
+
+
+def _timed(url, pool_size):
+    wrapper = ApiWrapper(url, 'bench', 'bench', pool_size=pool_size)
+    start = time.perf_counter()
+    frame = OqQuotes(wrapper).symbols()
+    elapsed = time.perf_counter() - start
+    wrapper.api.close()
+    return frame, elapsed
+
+
+def main(symbols=50000, page_size=1000, latency=0.01, workers=10):
+    """Prints the time of a paginated query with one connection and with a pool of connections."""
+    with StandInServer(symbols=symbols, max_page_size=page_size, latency=latency) as server:
+        serial_frame, serial_time = _timed(server.url, 1)
+        pooled_frame, pooled_time = _timed(server.url, workers)
+    pd.testing.assert_frame_equal(serial_frame, pooled_frame)
+
+    print(f'rows={symbols} pages={-(-symbols // page_size)} latency={latency * 1000:.0f}ms')
+    print(f'1 connection:   {serial_time:8.3f} s')
+    print(f'{workers} connections: {pooled_time:8.3f} s  ({serial_time / pooled_time:.2f}x)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""Benchmark the panel KDJ and SAR against running the indicators symbol by symbol.
+
+Builds random walks of minute bars for a universe of symbols, computes the indicators of the
+whole panel and of every symbol alone, checks they give the same values, then times one bar
+close update of the whole universe with the panel and with a streaming indicator per symbol.
+
+Run with `python benchmarks/bench_panel.py`.
+"""
+import time
+
+import numpy as np
+import pandas as pd
+
+from onequant.indicators.KDJ import KDJ, StreamingKDJ
+from onequant.indicators.panel import PanelKDJ, PanelSAR
+from onequant.indicators.SAR import SAR, StreamingSAR
+
+
+def _panels(n_bars, n_symbols, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 3000 + np.cumsum(rng.normal(0, 1, (n_bars, n_symbols)), axis=0).round(1)
+    return (
+        close + rng.uniform(0, 2, close.shape).round(1),
+        close - rng.uniform(0, 2, close.shape).round(1),
+        close,
+    )
+
+
+def _timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def main(n_bars=2000, n_symbols=500, n_updates=200):
+    """Prints the time of the batch paths and of one bar close update."""
+    high, low, close = _panels(n_bars + n_updates, n_symbols)
+    columns = range(n_symbols)
+
+    (k, _, _), panel_time = _timed(PanelKDJ(43, 9, 3).compute, high, low, close)
+    loop, loop_time = _timed(lambda: [KDJ(43, 9, 3).compute(high[:, s], low[:, s], close[:, s]) for s in columns])
+    assert all(np.array_equal(k[:, s], loop[s][0]) for s in columns)
+    print(f'KDJ {n_symbols} symbols x {len(high)} bars: per symbol {loop_time:6.2f} s  panel {panel_time:6.2f} s')
+
+    (psar, *_), panel_time = _timed(PanelSAR().compute, high, low)
+    loop, loop_time = _timed(lambda: [SAR().compute(high[:, s], low[:, s]) for s in columns])
+    assert all(np.array_equal(psar[:, s], loop[s][0]) for s in columns)
+    print(f'SAR {n_symbols} symbols x {len(high)} bars: per symbol {loop_time:6.2f} s  panel {panel_time:6.2f} s')
+
+    panel_kdj, panel_sar = PanelKDJ(43, 9, 3), PanelSAR()
+    panel_kdj.apply(high[:n_bars], low[:n_bars], close[:n_bars])
+    panel_sar.apply(high[:n_bars], low[:n_bars])
+    streams = [(StreamingKDJ(43, 9, 3), StreamingSAR()) for _ in columns]
+    for s, (kdj, sar) in enumerate(streams):
+        kdj.apply_to_df(pd.DataFrame({'high': high[:n_bars, s], 'low': low[:n_bars, s], 'close': close[:n_bars, s]}))
+        sar.apply_to_df(pd.DataFrame({'high': high[:n_bars, s], 'low': low[:n_bars, s]}))
+    start = time.perf_counter()
+    for bar in range(n_bars, n_bars + n_updates):
+        k, _, _ = panel_kdj.update(high[bar], low[bar], close[bar])
+        psar = panel_sar.update(high[bar], low[bar])
+    panel_time = (time.perf_counter() - start) / n_updates
+    start = time.perf_counter()
+    for bar in range(n_bars, n_bars + n_updates):
+        for s, (kdj, sar) in enumerate(streams):
+            kdj.calcKDJ(high[bar, s], low[bar, s], close[bar, s])
+            sar.calcPSAR(high[bar, s], low[bar, s])
+    stream_time = (time.perf_counter() - start) / n_updates
+    assert np.array_equal(k, [round(kdj.k, 2) for kdj, _ in streams])
+    assert psar.tolist() == [sar.psar for _, sar in streams]
+    print(
+        f'KDJ+SAR update of {n_symbols} symbols: per symbol {stream_time * 1000:6.2f} ms  '
+        f'panel {panel_time * 1000:6.2f} ms  ({stream_time / panel_time:.0f}x)'
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""Benchmark pooled keep-alive sessions against one connection per request.
+
+Starts a local HTTP/1.1 server answering every request with a small json body and
+measures requests/sec of the old `requests.request` call path against the pooled
+`ApiRequest.request`.
+
+Run with `python benchmarks/bench_request_pool.py`.
+"""
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests  # type: ignore
+
+from onequant.api.request import ApiRequest
+
+BODY = json.dumps({'code': 200, 'data': [{'ts': '2024-01-02 09:00:00.000', 'close': 3800.0}]}).encode()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(BODY)))
+        self.end_headers()
+        self.wfile.write(BODY)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _run(call, n_requests, workers):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(lambda _: call(), range(n_requests)))
+    return n_requests / (time.perf_counter() - start)
+
+
+def main(n_requests=2000, workers=8):
+    """Prints requests/sec before and after connection pooling."""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f'http://127.0.0.1:{server.server_address[1]}'
+
+    def unpooled():
+        return requests.request(method='get', url=url + '/bench').json()
+
+    api = ApiRequest(url, pool_size=workers)
+
+    def pooled():
+        return api.request('get', '/bench')
+
+    try:
+        before = _run(unpooled, n_requests, workers)
+        after = _run(pooled, n_requests, workers)
+    finally:
+        api.close()
+        server.shutdown()
+
+    print(f'requests={n_requests} workers={workers}')
+    print(f'new connection per request: {before:10.1f} req/s')
+    print(f'pooled keep-alive session:  {after:10.1f} req/s  ({after / before:.2f}x)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+"""Benchmark SAR.compute and StreamingSAR against calling SAR.calcPSAR on every row.
+
+Builds a random walk of minute bars, runs the row by row paths, a loop and DataFrame.apply, on a
+slice of it and the batch path on all of it, checks they give the same values on the slice and
+prints the bars per second.
+
+Run with `python benchmarks/bench_sar.py`.
+"""
+import time
+
+import numpy as np
+import pandas as pd
+
+from onequant.indicators.SAR import SAR, StreamingSAR
+
+
+def _bars(n_bars, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 3000 + np.cumsum(rng.normal(0, 1, n_bars)).round(1)
+    return close + rng.uniform(0, 2, n_bars).round(1), close - rng.uniform(0, 2, n_bars).round(1)
+
+
+def main(n_bars=1000000, n_rows=100000, params=(0.2, 0.02)):
+    """Prints the throughput of both paths."""
+    high, low = _bars(n_bars)
+
+    start = time.perf_counter()
+    sar = SAR(*params)
+    rows = [sar.calcPSAR(h, l) for h, l in zip(high[:n_rows].tolist(), low[:n_rows].tolist())]
+    row_rate = n_rows / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    stream = StreamingSAR(*params)
+    streamed = [stream.calcPSAR(h, l) for h, l in zip(high[:n_rows].tolist(), low[:n_rows].tolist())]
+    stream_rate = n_rows / (time.perf_counter() - start)
+
+    df = pd.DataFrame({'high': high[:n_rows], 'low': low[:n_rows]})
+    start = time.perf_counter()
+    indic = SAR(*params)
+    applied = df.apply(lambda x: indic.calcPSAR(x['high'], x['low']), axis=1)
+    apply_rate = n_rows / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    psar, trend, af, next_psar = SAR(*params).compute(high, low)
+    batch_rate = n_bars / (time.perf_counter() - start)
+
+    assert psar[:n_rows].tolist() == rows == applied.tolist() == streamed
+    assert trend[:n_rows].tolist() == sar.trend_list and next_psar[:n_rows].tolist() == sar.next_psar_list
+    print(f'apply    n={n_rows:>8}: {apply_rate:12,.0f} bars/s')
+    print(f'calcPSAR n={n_rows:>8}: {row_rate:12,.0f} bars/s')
+    print(f'stream   n={n_rows:>8}: {stream_rate:12,.0f} bars/s')
+    print(f'compute  n={n_bars:>8}: {batch_rate:12,.0f} bars/s  ({batch_rate / apply_rate:.0f}x apply)')
+
+
+if __name__ == '__main__':
+    main()
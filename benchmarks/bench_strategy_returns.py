@@ -0,0 +1,51 @@
+"""Benchmark `get_strategy_returns` end to end against the local stand-in server.
+
+Fetches the daily net values of `strategies` strategies from a server that answers code 500 to the
+requests beyond `max_in_flight` at once, with and without the adaptive concurrency limit of
+`ApiRequest`, and prints the time and the number of strategies lost to errors.
+
+Run with `python benchmarks/bench_strategy_returns.py`.
+"""
+import time
+import warnings
+
+import pandas as pd
+
+from onequant.api.request import ApiWrapper
+from onequant.api.standin import StandInServer
+from onequant.api.strategies import OqStrategies
+from onequant.portfolio.strategy_folio import get_strategy_returns
+
+
+def _timed(url, adaptive, strategies, workers):
+    wrapper = ApiWrapper(url, 'bench', 'bench', pool_size=workers, adaptive=adaptive)
+    start = time.perf_counter()
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        returns = get_strategy_returns(
+            OqStrategies(wrapper),
+            [f's{i}' for i in range(strategies)],
+            fill_start_date=pd.Timestamp('2015-01-05', tz='UTC'),
+            fill_end_date=pd.Timestamp('2021-12-31', tz='UTC'),
+        )
+    elapsed = time.perf_counter() - start
+    wrapper.api.close()
+    return returns, elapsed
+
+
+def main(strategies=100, days=2500, latency=0.02, max_in_flight=6, workers=16):
+    """Prints the time and the failures of get_strategy_returns with a fixed and an adaptive concurrency."""
+    print(f'strategies={strategies} days={days} latency={latency * 1000:.0f}ms max_in_flight={max_in_flight}')
+    for adaptive in (False, True):
+        with StandInServer(netequity_days=days, latency=latency, max_in_flight=max_in_flight) as server:
+            returns, elapsed = _timed(server.url, adaptive, strategies, workers)
+            requests, errors = server.requests, server.errors
+        label = 'adaptive' if adaptive else 'fixed   '
+        print(
+            f'{label}: {elapsed:8.3f} s  requests={requests} server errors={errors} '
+            f'failed strategies={len(returns.attrs["failed"])}'
+        )
+
+
+if __name__ == '__main__':
+    main()
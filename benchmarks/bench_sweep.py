@@ -0,0 +1,55 @@
+"""Benchmark the KDJ and SAR parameter sweeps against computing every combination one by one.
+
+Builds a random walk of minute bars, runs `compute` of every combination of a grid and the
+sweep in one process and in a process pool, checks they give the same values and prints the
+time of each.
+
+Run with `python benchmarks/bench_sweep.py`.
+"""
+import itertools
+import time
+
+import numpy as np
+
+from onequant.indicators.KDJ import KDJ
+from onequant.indicators.SAR import SAR
+from onequant.indicators.sweep import sweep_kdj, sweep_sar
+
+
+def _bars(n_bars, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 3000 + np.cumsum(rng.normal(0, 1, n_bars)).round(1)
+    return close + rng.uniform(0, 2, n_bars).round(1), close - rng.uniform(0, 2, n_bars).round(1), close
+
+
+def _timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def main(n_bars=200000):
+    """Prints the time of every path for a KDJ and a SAR grid."""
+    high, low, close = _bars(n_bars)
+
+    grid = list(itertools.product(range(9, 60, 5), [3, 5, 9], [3, 5, 9]))
+    loop, loop_time = _timed(lambda: [KDJ(*params).compute(high, low, close) for params in grid])
+    print(f'KDJ {len(grid)} combinations, n={n_bars}: loop {loop_time:7.2f} s')
+    for processes in (1, None):
+        cube, sweep_time = _timed(sweep_kdj, high, low, close, grid, processes=processes)
+        assert all(
+            np.array_equal(cube['K'][i], k) and np.array_equal(cube['J'][i], j) for i, (k, _, j) in enumerate(loop)
+        )
+        print(f'    sweep processes={processes}: {sweep_time:7.2f} s  ({loop_time / sweep_time:.1f}x)')
+
+    grid = list(itertools.product([0.1, 0.2, 0.3], [0.01, 0.02, 0.03, 0.05]))
+    loop, loop_time = _timed(lambda: [SAR(*params).compute(high, low) for params in grid])
+    print(f'SAR {len(grid)} combinations, n={n_bars}: loop {loop_time:7.2f} s')
+    for processes in (1, None):
+        cube, sweep_time = _timed(sweep_sar, high, low, grid, processes=processes)
+        assert all(np.array_equal(cube['psar'][i], psar) for i, (psar, *_) in enumerate(loop))
+        print(f'    sweep processes={processes}: {sweep_time:7.2f} s  ({loop_time / sweep_time:.1f}x)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+"""Benchmark the columnar TDengine decoder against the row dict decoder.
+
+Decodes a synthetic kline response with `_tddata_rows` + `pd.DataFrame` (the previous path)
+and with `_tddata_columns` + `_to_output`, checks both frames hold the same values, prints the
+columns whose dtype changed and the time of each path.
+
+Run with `python benchmarks/bench_tddata_decode.py`.
+"""
+import time
+
+import pandas as pd
+
+from onequant.api.synthetic import kline_payload
+from onequant.api.wrapper import _tddata_columns, _tddata_rows, _to_output
+
+
+def _rows_frame(payload):
+    rows, _ = _tddata_rows(payload)
+    return pd.DataFrame(rows)
+
+
+def _columns_frame(payload):
+    return _to_output(*_tddata_columns(payload))
+
+
+def _timed(decode, payload, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        frame = decode(payload)
+        best = min(best, time.perf_counter() - start)
+    return frame, best
+
+
+def main(n_rows=500000, repeat=3):
+    """Prints the decode time of both paths and asserts they hold the same values."""
+    payload = kline_payload(n_rows, seed=0)
+
+    rows_frame, rows_time = _timed(_rows_frame, payload, repeat)
+    columns_frame, columns_time = _timed(_columns_frame, payload, repeat)
+
+    assert rows_frame.columns.tolist() == columns_frame.columns.tolist()
+    for name in rows_frame:
+        before, after = rows_frame[name], columns_frame[name]
+        if before.dtype != after.dtype:
+            print(f'{name}: {before.dtype} -> {after.dtype}')
+        # ts was a string, the other columns only change dtype
+        expected = pd.to_datetime(before).tolist() if name == 'ts' else before.tolist()
+        assert after.tolist() == expected, name
+
+    print(f'rows={n_rows}')
+    print(f'row dicts: {rows_time:8.3f} s')
+    print(f'columnar:  {columns_time:8.3f} s  ({rows_time / columns_time:.2f}x)')
+
+
+if __name__ == '__main__':
+    main()
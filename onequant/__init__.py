@@ -1,10 +1,44 @@
-"""Top-level package for onequant."""
+"""Top-level package for onequant.
+
+The public names are imported on first access, so `import onequant` stays cheap:
+
+    import onequant
+
+    client = onequant.connect(url, username, password)
+"""
 
 __author__ = """recluse"""
 __email__ = 'zhiyiquant@foxmail.com'
 __version__ = '0.1.2'
 
-import pathlib
-import sys
+import importlib
+
+# public name -> module defining it
+_LAZY_NAMES = {
+    'connect': 'onequant.api.client',
+    'OqClient': 'onequant.api.client',
+    'ApiWrapper': 'onequant.api.request',
+    'OqQuotes': 'onequant.api.quotes',
+    'OqStrategies': 'onequant.api.strategies',
+    'OqTrades': 'onequant.api.trades',
+}
+_SUBMODULES = ('api', 'data_wash', 'indicators', 'portfolio', 'util')
+
+__all__ = list(_LAZY_NAMES)
+
+
+def __getattr__(name):
+    """Imports a public name or a subpackage on first access."""
+    if name in _LAZY_NAMES:
+        value = getattr(importlib.import_module(_LAZY_NAMES[name]), name)
+    elif name in _SUBMODULES:
+        value = importlib.import_module(f'{__name__}.{name}')
+    else:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+    globals()[name] = value
+    return value
+
 
-sys.path.append(str(pathlib.Path(__file__).parent))
+def __dir__():
+    """Lists the public names along with the ones not imported yet."""
+    return sorted(set(globals()) | set(_LAZY_NAMES) | set(_SUBMODULES))
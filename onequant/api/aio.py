@@ -0,0 +1,499 @@
+"""Asyncio variant of the OneQuant api.
+
+The async classes reuse the public methods of `OqQuotes`, `OqStrategies` and `OqTrades`:
+only the low level `_query*` helpers are replaced by coroutines, so every public method
+returns an awaitable and decodes the response with the same functions as the sync path.
+
+Example:
+    async with AsyncApiWrapper(url, username, password, concurrency=64) as wrapper:
+        oqs = AsyncOqStrategies(wrapper)
+        netvalues = await gather(oqs.strategy_netvalue, strategy_ids, return_exceptions=True)
+
+`aiohttp` is required to use this module.
+"""
+import asyncio
+import datetime
+import re
+import time
+
+from onequant.api.output import check_output
+from onequant.api.quotes import (
+    KLINE_RETRIES,
+    KLINE_RETRY_DELAY,
+    PANEL_FIELDS,
+    BarsFetchError,
+    OqQuotes,
+    _bars_panel,
+    _chunk_span,
+    _split_range,
+    _stitch_bars,
+)
+from onequant.api.request import DEFAULT_POOL_SIZE, DEFAULT_TIMEOUT, STREAM_CHUNK_SIZE
+from onequant.api.strategies import OqStrategies
+from onequant.api.tdstream import DEFAULT_CHUNK_ROWS, _columns_output, _measured_chunks, concat_chunks
+from onequant.api.trades import OqTrades
+from onequant.api.wrapper import (
+    PAGE_RETRIES,
+    PAGE_RETRY_DELAY,
+    PAGE_SIZE,
+    _join_pages,
+    _measured,
+    _page_count,
+    _tddata_columns,
+    _to_output,
+)
+
+
+def _clean_params(params):
+    """Drops None values and stringifies the rest, the same way `requests` encodes params.
+
+    Args:
+        params (dict): The parameters of the request.
+
+    Returns:
+        dict: The parameters accepted by aiohttp.
+    """
+    if params is None:
+        return None
+    return {
+        key: value if isinstance(value, (str, int, float)) and not isinstance(value, bool) else str(value)
+        for key, value in params.items()
+        if value is not None
+    }
+
+
+class AsyncApiRequest:
+    """Class for connecting to trading server from asyncio code.
+
+    At most `concurrency` requests are in flight at the same time, the others wait on a semaphore.
+    """
+
+    def __init__(self, url, concurrency=DEFAULT_POOL_SIZE, timeout=DEFAULT_TIMEOUT, metrics=None):
+        """Initializes the AsyncApiRequest class with a given url.
+
+        Args:
+            url (str): The url to be used for the API request.
+            concurrency (int, optional): The maximum number of requests in flight. Defaults to 10.
+            timeout (float or tuple, optional): The default (connect, read) timeout in seconds. Defaults to (5, 60).
+            metrics (ApiMetrics, optional): Collects per-router metrics of the requests. Defaults to None, off.
+        """
+        self.url = url
+        self.token = None
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.metrics = metrics
+        self.headers = {
+            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 \
+            (KHTML, like Gecko) Chrome/71.0.3578.98 Safari/537.36"
+        }
+        self._session = None
+        self._semaphore = None
+
+    @staticmethod
+    def _client_timeout(timeout):
+        import aiohttp
+
+        if isinstance(timeout, tuple):
+            return aiohttp.ClientTimeout(sock_connect=timeout[0], sock_read=timeout[1])
+        return aiohttp.ClientTimeout(total=timeout)
+
+    def _get_session(self):
+        """Returns the aiohttp session, creating it inside the running event loop on first use."""
+        import aiohttp
+
+        if self._session is None:
+            connector = aiohttp.TCPConnector(limit=self.concurrency)
+            self._session = aiohttp.ClientSession(
+                connector=connector, headers=self.headers, timeout=self._client_timeout(self.timeout)
+            )
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        return self._session
+
+    async def login(self, username, password):
+        """Logs in to the API with the given username and password.
+
+        Args:
+            username (str): The username to be used for the login.
+            password (str): The password to be used for the login.
+
+        Returns:
+            str: The token for the logged in user.
+        """
+        data = {'username': username, 'password': password, 'autoLogin': False, 'type': 'pc'}
+
+        session = self._get_session()
+        async with session.post(self.url + '/system/login/login', json=data) as response:
+            for cookie in response.headers.getall('Set-Cookie', []):
+                match = re.search(r'satoken=([\w-]+);', cookie)
+                if match:
+                    self.token = 'satoken=' + match.group(1)
+                    self.headers['Cookie'] = self.token
+                    session.cookie_jar.update_cookies({'satoken': match.group(1)})
+
+        return self.token
+
+    async def request(self, method, router, params=None, data=None, json=None, timeout=None):
+        """Sends a request to the API with the given parameters.
+
+        Args:
+            method (str): The HTTP method to be used for the request.
+            router (str): The router to be used for the request.
+            params (dict, optional): The parameters to be used for the request. Defaults to None.
+            data (dict, optional): The data to be used for the request. Defaults to None.
+            json (dict, optional): The json to be used for the request. Defaults to None.
+            timeout (float or tuple, optional): Overrides the default timeout for this request. Defaults to None.
+
+        Raises:
+            AssertionError: If an unsupported request method is used.
+
+        Returns:
+            dict: The response from the API in json format.
+        """
+        assert method in ['get', 'post', 'put', 'delete'], 'Unsupported request method'
+
+        session = self._get_session()
+        kwargs = {} if timeout is None else {'timeout': self._client_timeout(timeout)}
+        metrics = self.metrics
+        async with self._semaphore:
+            if metrics is None:
+                async with session.request(
+                    method, self.url + router, params=_clean_params(params), data=data, json=json, **kwargs
+                ) as response:
+                    return await response.json(content_type=None)
+
+            metrics.start(router)
+            started = time.perf_counter()
+            try:
+                async with session.request(
+                    method, self.url + router, params=_clean_params(params), data=data, json=json, **kwargs
+                ) as response:
+                    body = await response.read()
+                    metrics.observe('network', time.perf_counter() - started, router)
+                    metrics.add_bytes(len(body), router)
+                    started = time.perf_counter()
+                    # the body is read already, this only parses it
+                    result = await response.json(content_type=None)
+                    metrics.observe('decode', time.perf_counter() - started, router)
+            except Exception as e:
+                metrics.add_error(type(e).__name__, router)
+                raise
+            metrics.check_response(result, response.status, router)
+            return result
+
+    async def stream(
+        self, method, router, params=None, data=None, json=None, timeout=None, chunk_size=STREAM_CHUNK_SIZE
+    ):
+        """Sends a request to the API and yields the body of the response as it arrives.
+
+        Args:
+            method (str): The HTTP method to be used for the request.
+            router (str): The router to be used for the request.
+            params (dict, optional): The parameters to be used for the request. Defaults to None.
+            data (dict, optional): The data to be used for the request. Defaults to None.
+            json (dict, optional): The json to be used for the request. Defaults to None.
+            timeout (float or tuple, optional): Overrides the default timeout for this request. Defaults to None.
+            chunk_size (int, optional): The number of bytes read at a time. Defaults to 1 MB.
+
+        Raises:
+            AssertionError: If an unsupported request method is used.
+
+        Yields:
+            bytes: The next piece of the body.
+        """
+        assert method in ['get', 'post', 'put', 'delete'], 'Unsupported request method'
+
+        session = self._get_session()
+        kwargs = {} if timeout is None else {'timeout': self._client_timeout(timeout)}
+        metrics = self.metrics
+        async with self._semaphore:
+            if metrics is None:
+                async with session.request(
+                    method, self.url + router, params=_clean_params(params), data=data, json=json, **kwargs
+                ) as response:
+                    async for piece in response.content.iter_chunked(chunk_size):
+                        yield piece
+                return
+
+            metrics.start(router)
+            network = 0.0
+            started = time.perf_counter()
+            try:
+                async with session.request(
+                    method, self.url + router, params=_clean_params(params), data=data, json=json, **kwargs
+                ) as response:
+                    if response.status >= 400:
+                        metrics.add_error(f'http_{response.status}', router)
+                    # only the time spent waiting for the body is network time, not the time of the consumer
+                    async for piece in response.content.iter_chunked(chunk_size):
+                        network += time.perf_counter() - started
+                        metrics.add_bytes(len(piece), router)
+                        yield piece
+                        started = time.perf_counter()
+                    network += time.perf_counter() - started
+            except Exception as e:
+                metrics.add_error(type(e).__name__, router)
+                raise
+            finally:
+                metrics.observe('network', network, router)
+
+    async def close(self):
+        """Closes the session and all of its connections."""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+
+class AsyncApiWrapper:
+    """Async counterpart of `ApiWrapper`, logs in when entering the context."""
+
+    def __init__(self, url, username, password, concurrency=DEFAULT_POOL_SIZE, timeout=DEFAULT_TIMEOUT, metrics=None):
+        """Initializes the AsyncApiWrapper class with a given url, username, and password.
+
+        Args:
+            url (str): The url to be used for the API request.
+            username (str): The username to be used for the login.
+            password (str): The password to be used for the login.
+            concurrency (int, optional): The maximum number of requests in flight. Defaults to 10.
+            timeout (float or tuple, optional): The default timeout of each request. Defaults to (5, 60).
+            metrics (ApiMetrics, optional): Collects per-router metrics of the requests. Defaults to None.
+        """
+        self.api = AsyncApiRequest(url, concurrency=concurrency, timeout=timeout, metrics=metrics)
+        self.username = username
+        self._password = password
+
+    async def login(self):
+        """Logs in to the API.
+
+        Returns:
+            str: The token for the logged in user.
+        """
+        return await self.api.login(self.username, self._password)
+
+    async def close(self):
+        """Closes the underlying session."""
+        await self.api.close()
+
+    async def __aenter__(self):
+        """Logs in when entering the context."""
+        await self.login()
+        return self
+
+    async def __aexit__(self, *exc):
+        """Closes the session when leaving the context."""
+        await self.close()
+
+
+class _AsyncQueryMixin:
+    """Coroutine versions of the `_query*` helpers shared by the Oq* classes."""
+
+    async def _query(self, router, params=None):
+        result = await self.api.request(method='get', router=router, params=params)
+        if result['code'] != 200:
+            raise Exception(f'An error occurred while retrieving tdegine data! code is {result["code"]}')
+        return result['data']
+
+    async def _query_pd(self, params=None, router=None, output=None):
+        result = await self.api.request(method='get', router=router, params=params)
+        return _measured(self.api, 'frame', _to_output, result['data'], result['code'], output or self.output)
+
+    async def _query_pd_pg(self, params=None, router=None, output=None):
+        params = params or {}
+        data = await self.api.request(method='get', router=router, params=dict(params, current=1, pageSize=PAGE_SIZE))
+
+        num_pages, page_size = _page_count(data)
+        if num_pages > 1:
+
+            async def fetch(page):
+                error = None
+                for attempt in range(PAGE_RETRIES + 1):
+                    if attempt:
+                        await asyncio.sleep(PAGE_RETRY_DELAY * 2 ** (attempt - 1))
+                    try:
+                        page_data = await self.api.request(
+                            method='get', router=router, params=dict(params, current=page, pageSize=page_size)
+                        )
+                    except Exception as e:
+                        error = e
+                        continue
+                    if page_data['code'] == 200:
+                        return page_data['data'], None
+                    error = page_data['code']
+                return None, error
+
+            pages = range(2, num_pages + 1)
+            _join_pages(data, pages, await asyncio.gather(*(fetch(page) for page in pages)))
+
+        return _measured(self.api, 'frame', _to_output, data['data'], data['code'], output or self.output)
+
+    async def _querytd_pd(self, router, params=None, output=None):
+        result = await self.api.request(method='get', router=router, params=params)
+        data, code = _measured(self.api, 'decode', _tddata_columns, result)
+        return _measured(self.api, 'frame', _to_output, data, code, output or self.output)
+
+    async def _read_pieces(self, router, params=None):
+        # the body is kept as bytes and decoded by the sync chunk decoder, it is never parsed as a whole
+        return [piece async for piece in self.api.stream(method='get', router=router, params=params)]
+
+    async def _querytd_chunks(self, router, params=None, chunk_rows=DEFAULT_CHUNK_ROWS, output=None):
+        output = check_output(output or self.output)
+        pieces = await self._read_pieces(router, params)
+        for columns in _measured_chunks(self.api, pieces, chunk_rows=chunk_rows):
+            yield _measured(self.api, 'frame', _columns_output, columns, output)
+
+    async def _querytd_pd_stream(self, router, params=None, chunk_rows=DEFAULT_CHUNK_ROWS, output=None):
+        output = check_output(output or self.output)
+        pieces = await self._read_pieces(router, params)
+        columns = concat_chunks(_measured_chunks(self.api, pieces, chunk_rows=chunk_rows))
+        return _measured(self.api, 'frame', _columns_output, columns, output)
+
+
+class AsyncOqQuotes(_AsyncQueryMixin, OqQuotes):
+    """Async version of `OqQuotes`, every public method returns an awaitable."""
+
+    def __init__(self, wrapper=None, output='pandas'):
+        """Initializes an AsyncOqQuotes object, the bar store is not supported by the async client.
+
+        Args:
+            wrapper (AsyncApiWrapper, optional): An object containing the API and username. Defaults to None.
+            output (str, optional): The backend of the data returned, see `onequant.api.output`.
+                Defaults to 'pandas'.
+        """
+        super().__init__(wrapper, output=output)
+
+    def stream_quotes(self, key='symbol', interval=1.0, adaptive=False, max_interval=None):
+        """Polls the realtime quotes and streams the rows that changed, see `OqQuotes.stream_quotes`.
+
+        Returns:
+            QuoteStream: An endless async iterator of pandas DataFrame deltas, used with `async for`.
+        """
+        return super().stream_quotes(key, interval, adaptive, max_interval)
+
+    async def future_bars(
+        self,
+        code=None,
+        interval=None,
+        start_time=None,
+        end_time=None,
+        limit=None,
+        stream=False,
+        progress=None,
+        output=None,
+    ):
+        """Fetches K-line data for futures, see `OqQuotes.future_bars`.
+
+        Long ranges are split into chunks fetched concurrently, each retried `KLINE_RETRIES` times.
+
+        Returns:
+            pandas.DataFrame: The K-line data as a pandas DataFrame.
+        """
+        output = check_output(output or self.output)
+        params = self._bars_params(code, interval, start_time, end_time, limit)
+        fetch = self._querytd_pd_stream if stream else self._querytd_pd
+        ranges = [[params['start'], params['end']]]
+        if limit is None:
+            ranges = _split_range(params['start'], params['end'], _chunk_span(interval))
+        if len(ranges) == 1:
+            return await fetch(router='/tvquote/kline_ascend', params=params, output=output)
+
+        done = 0
+
+        async def fetch_range(bounds):
+            nonlocal done
+            error = None
+            for attempt in range(KLINE_RETRIES + 1):
+                if attempt:
+                    await asyncio.sleep(KLINE_RETRY_DELAY * 2 ** (attempt - 1))
+                try:
+                    bars = await fetch(
+                        router='/tvquote/kline_ascend',
+                        params=dict(params, start=bounds[0], end=bounds[1]),
+                        output='columns',
+                    )
+                    break
+                except Exception as e:
+                    error = e
+            else:
+                raise error
+            done += 1
+            if progress is not None:
+                progress(done, len(ranges))
+            return bars
+
+        results = await asyncio.gather(*(fetch_range(bounds) for bounds in ranges), return_exceptions=True)
+        failed = {tuple(bounds): result for bounds, result in zip(ranges, results) if isinstance(result, Exception)}
+        bars = _columns_output(_stitch_bars(result for result in results if not isinstance(result, Exception)), output)
+        if failed:
+            raise BarsFetchError(failed, bars)
+        return bars
+
+    async def future_bars_batch(
+        self, codes, interval=None, start_time=None, end_time=None, layout='long', fields=PANEL_FIELDS, progress=None
+    ):
+        """Fetches the K-line data of several futures concurrently, see `OqQuotes.future_bars_batch`.
+
+        Returns:
+            The K-line panel in the requested layout.
+        """
+        codes = list(dict.fromkeys(codes))
+        output = 'pandas' if layout == 'long' else 'columns'
+        done = 0
+
+        async def fetch(code):
+            nonlocal done
+            try:
+                return await self.future_bars(code, interval, start_time, end_time, output=output)
+            finally:
+                done += 1
+                if progress is not None:
+                    progress(done, len(codes))
+
+        results = await asyncio.gather(*(fetch(code) for code in codes), return_exceptions=True)
+        failed = {code: result for code, result in zip(codes, results) if isinstance(result, Exception)}
+        panel = _bars_panel(
+            {code: result for code, result in zip(codes, results) if not isinstance(result, Exception)}, layout, fields
+        )
+        if failed:
+            raise BarsFetchError(failed, panel)
+        return panel
+
+
+class AsyncOqStrategies(_AsyncQueryMixin, OqStrategies):
+    """Async version of `OqStrategies`, every public method returns an awaitable."""
+
+
+class AsyncOqTrades(_AsyncQueryMixin, OqTrades):
+    """Async version of `OqTrades`, every public method returns an awaitable."""
+
+    async def _query_pd(self, router=None, params=None, output=None):
+        # OqTrades takes the router first
+        result = await self.api.request(method='get', router=router, params=params)
+        return _measured(self.api, 'frame', _to_output, result['data'], result['code'], output or self.output)
+
+    async def snapshot(self, virtual=False):
+        """Fetches the account, positions, orders, unfilled orders and trades concurrently, see `OqTrades.snapshot`.
+
+        Returns:
+            dict: The tables keyed by name, with the capture datetime under 'ts' and the seconds taken under
+            'elapsed'.
+        """
+        methods = self._snapshot_methods(virtual)
+        ts, started = datetime.datetime.now(), time.monotonic()
+        tables = await asyncio.gather(*(method() for method in methods.values()))
+        return dict(zip(methods, tables), ts=ts, elapsed=time.monotonic() - started)
+
+
+async def gather(func, items, return_exceptions=False):
+    """Calls an async api method for every item concurrently.
+
+    The number of requests in flight is bounded by the `concurrency` of the wrapper.
+
+    Args:
+        func: The async method to call, e.g. `AsyncOqStrategies.strategy_netvalue`.
+        items (iterable): The arguments, e.g. a list of strategy ids.
+        return_exceptions (bool, optional): Return exceptions in place of the failed results instead of
+            raising the first one. Defaults to False.
+
+    Returns:
+        list: The results in the order of the items.
+    """
+    return await asyncio.gather(*(func(item) for item in items), return_exceptions=return_exceptions)
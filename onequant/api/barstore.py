@@ -0,0 +1,238 @@
+"""Local persistent store of K-line data.
+
+Every (symbol, interval) partition is a directory holding one `.npy` file per column, sorted
+by `ts`, plus a `meta.json` listing the time ranges already fetched from the server, in the
+ms timestamps of the requests. `ts` holds the naive times decoded from TDengine, whose ms are the
+epoch ms of the bars, so the bars of a fetched range are read with `np.datetime64(start, 'ms')` and
+`np.datetime64(end, 'ms')`, whatever the local timezone. Reading a partition memory-maps the column
+files, so cached history never goes through HTTP or json.
+
+Column files are never overwritten: each write saves a new version and `meta.json` switches to
+it, so frames still mapping an older version stay valid (and Windows does not refuse the write).
+
+Example:
+    quotes = OqQuotes(wrapper, store=BarStore('~/.onequant/bars'))
+    quotes.future_bars('rb000', '1m', '20230101', '20240101')  # only the missing ranges are fetched
+"""
+import json
+import os
+import re
+import threading
+
+META_FILE = 'meta.json'
+
+
+def _partition_name(value):
+    """Returns a file system safe directory name for a symbol or an interval."""
+    return re.sub(r'[^\w.-]', '_', str(value))
+
+
+def _to_ms(ts):
+    """Converts a datetime64 array to int64 milliseconds."""
+    import numpy as np
+
+    return ts.astype('datetime64[ms]').astype(np.int64)
+
+
+class BarStore:
+    """Local columnar store of K-line data keyed by (symbol, interval)."""
+
+    def __init__(self, path):
+        """Initializes the BarStore.
+
+        Args:
+            path (str): The root directory of the store.
+        """
+        self.path = os.path.expanduser(path)
+        self._lock = threading.Lock()
+        os.makedirs(self.path, exist_ok=True)
+
+    def _dir(self, symbol, interval):
+        return os.path.join(self.path, _partition_name(symbol), _partition_name(interval))
+
+    def _meta(self, directory):
+        try:
+            with open(os.path.join(directory, META_FILE)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {'columns': [], 'ranges': [], 'version': 0}
+
+    def ranges(self, symbol, interval):
+        """Returns the time ranges of a partition already fetched from the server.
+
+        Args:
+            symbol (str): The symbol of the partition.
+            interval (str): The interval of the partition.
+
+        Returns:
+            list: The sorted, disjoint [start, end] ranges in ms timestamps, both ends included.
+        """
+        return self._meta(self._dir(symbol, interval))['ranges']
+
+    def missing(self, symbol, interval, start, end):
+        """Returns the parts of a time range not fetched yet.
+
+        Args:
+            symbol (str): The symbol of the partition.
+            interval (str): The interval of the partition.
+            start (int): The start of the range in ms timestamp.
+            end (int): The end of the range in ms timestamp, included.
+
+        Returns:
+            list: The [start, end] gaps in ms timestamps.
+        """
+        gaps = []
+        for covered_start, covered_end in self.ranges(symbol, interval):
+            if covered_end < start:
+                continue
+            if covered_start > end:
+                break
+            if covered_start > start:
+                gaps.append([start, covered_start - 1])
+            start = max(start, covered_end + 1)
+        if start <= end:
+            gaps.append([start, end])
+        return gaps
+
+    def read(self, symbol, interval, start=None, end=None):
+        """Reads the bars of a partition, memory-mapping the column files.
+
+        Args:
+            symbol (str): The symbol of the partition.
+            interval (str): The interval of the partition.
+            start (numpy.datetime64, optional): The first `ts` to read. Defaults to None, from the first bar.
+            end (numpy.datetime64, optional): The last `ts` to read, included. Defaults to None, to the last bar.
+
+        Returns:
+            dict: The columns keyed by name, or None if the partition is empty.
+        """
+        import numpy as np
+
+        directory = self._dir(symbol, interval)
+        meta = self._meta(directory)
+        if not meta['columns']:
+            return None
+        # copy-on-write mapping: callers may modify the arrays without touching the files
+        columns = {name: np.load(_column_file(directory, name, meta), mmap_mode='c') for name in meta['columns']}
+        ts = columns['ts']
+        first = 0 if start is None else int(np.searchsorted(ts, np.datetime64(start, 'ms'), side='left'))
+        last = len(ts) if end is None else int(np.searchsorted(ts, np.datetime64(end, 'ms'), side='right'))
+        return {name: column[first:last] for name, column in columns.items()}
+
+    def read_pd(self, symbol, interval, start=None, end=None):
+        """Reads the bars of a partition as a pandas DataFrame.
+
+        Args:
+            symbol (str): The symbol of the partition.
+            interval (str): The interval of the partition.
+            start (numpy.datetime64, optional): The first `ts` to read. Defaults to None.
+            end (numpy.datetime64, optional): The last `ts` to read, included. Defaults to None.
+
+        Returns:
+            pandas.DataFrame: The bars, empty if the partition is empty.
+        """
+        import pandas as pd
+
+        columns = self.read(symbol, interval, start, end)
+        return pd.DataFrame() if columns is None else pd.DataFrame(columns, copy=False)
+
+    def write(self, symbol, interval, columns, ranges):
+        """Merges fetched bars into a partition and records their ranges as fetched.
+
+        The bars are de-duplicated on `ts`, the newly fetched ones win.
+
+        Args:
+            symbol (str): The symbol of the partition.
+            interval (str): The interval of the partition.
+            columns (dict or pandas.DataFrame): The fetched bars, with a datetime64 `ts` column.
+            ranges (list): The [start, end] ranges fetched, in ms timestamps with both ends included.
+                Ranges ending before their start are not recorded.
+        """
+        import numpy as np
+
+        new = {name: _storable(np.asarray(columns[name])) for name in columns}
+        directory = self._dir(symbol, interval)
+        with self._lock:
+            os.makedirs(directory, exist_ok=True)
+            meta = self._meta(directory)
+
+            if new and len(new.get('ts', ())):
+                old = self.read(symbol, interval)
+                if old is not None and set(old) == set(new):
+                    merged = {name: np.concatenate([old[name], new[name]]) for name in meta['columns']}
+                else:
+                    merged = new
+                    if old is not None:
+                        # the server changed the columns, start the partition over
+                        meta['ranges'] = []
+                ts = _to_ms(merged['ts'])
+                # stable sort puts the new bars after the old ones of the same ts, keep the last of each ts
+                order = np.argsort(ts, kind='stable')
+                ts = ts[order]
+                keep = order[np.append(ts[1:] != ts[:-1], True)]
+                meta['columns'] = list(merged)
+                meta['version'] = meta.get('version', 0) + 1
+                for name, column in merged.items():
+                    np.save(_column_file(directory, name, meta), np.ascontiguousarray(column[keep]))
+                del old, merged
+
+            fetched = [[int(start), int(end)] for start, end in ranges if start <= end]
+            meta['ranges'] = _merge_ranges(meta['ranges'] + fetched)
+            tmp = os.path.join(directory, META_FILE + '.tmp')
+            with open(tmp, 'w') as f:
+                json.dump(meta, f)
+            os.replace(tmp, os.path.join(directory, META_FILE))
+            _remove_stale(directory, meta)
+
+    def invalidate(self, symbol=None, interval=None):
+        """Deletes stored bars.
+
+        Args:
+            symbol (str, optional): Only delete this symbol. Defaults to None, all symbols.
+            interval (str, optional): Only delete this interval of the symbol. Defaults to None, all intervals.
+        """
+        import shutil
+
+        if symbol is None:
+            target = self.path
+        elif interval is None:
+            target = os.path.join(self.path, _partition_name(symbol))
+        else:
+            target = self._dir(symbol, interval)
+        with self._lock:
+            shutil.rmtree(target, ignore_errors=True)
+            os.makedirs(self.path, exist_ok=True)
+
+
+def _storable(column):
+    """Converts object columns of strings to fixed width unicode, which can be memory-mapped."""
+    if column.dtype == object:
+        return column.astype('U')
+    return column
+
+
+def _column_file(directory, name, meta):
+    """Returns the file of a column in the current version of a partition."""
+    return os.path.join(directory, f'{name}.{meta.get("version", 0)}.npy')
+
+
+def _remove_stale(directory, meta):
+    """Deletes the column files of older versions, skipping those still mapped on Windows."""
+    current = {os.path.basename(_column_file(directory, name, meta)) for name in meta['columns']}
+    for name in os.listdir(directory):
+        if name.endswith('.npy') and name not in current:
+            try:
+                os.remove(os.path.join(directory, name))
+            except OSError:
+                pass
+
+
+def _merge_ranges(ranges):
+    """Merges overlapping or adjacent [start, end] ranges."""
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
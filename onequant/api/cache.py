@@ -0,0 +1,182 @@
+"""Cache of slow-changing reference data fetched from the API server.
+
+Example:
+    wrapper = ApiWrapper(url, username, password, cache=ApiCache(path='~/.onequant/cache'))
+    OqQuotes(wrapper).codeinfos()  # fetched from the server, then served from the cache for a day
+"""
+import copy
+import hashlib
+import json
+import os
+import pickle
+import re
+import threading
+import time
+from collections import OrderedDict
+
+# seconds a result stays valid, routers not listed here are never cached
+REFERENCE_TTL = {
+    '/quote/futureBase/symbol': 24 * 3600,
+    '/quote/futureBase/allCode': 24 * 3600,
+    '/quote/futureBase/indexCode': 24 * 3600,
+    '/quote/futureBase/optionCode': 24 * 3600,
+    '/quote/futureBase/stdCode': 24 * 3600,
+    '/strategy/info/base/query': 3600,
+}
+# the name of a cache file, the router prefix and the digest of the key
+_FILE_NAME = re.compile(r'[0-9a-f]{16}-[0-9a-f]{40}')
+
+
+class ApiCache:
+    """In-memory LRU cache with a per-router TTL and an optional on-disk store.
+
+    Results are kept in memory up to `maxsize` entries. When `path` is set they are also
+    pickled to one file per (router, params), so they survive a restart of the process.
+    """
+
+    def __init__(self, ttl=None, maxsize=128, path=None):
+        """Initializes the ApiCache.
+
+        Args:
+            ttl (dict, optional): The seconds a result of each router stays valid. Defaults to REFERENCE_TTL.
+            maxsize (int, optional): The maximum number of results kept in memory. Defaults to 128.
+            path (str, optional): The directory of the on-disk store. Defaults to None, memory only.
+        """
+        self.ttl = dict(REFERENCE_TTL if ttl is None else ttl)
+        self.maxsize = maxsize
+        self.path = None if path is None else os.path.expanduser(path)
+        self.hits = {}
+        self.misses = {}
+        self._entries = OrderedDict()
+        self._lock = threading.RLock()
+        if self.path is not None:
+            os.makedirs(self.path, exist_ok=True)
+
+    def caches(self, router):
+        """Returns whether results of the router are cached."""
+        return self.ttl.get(router) is not None
+
+    @staticmethod
+    def _key(router, params):
+        return router, json.dumps(params or {}, sort_keys=True, default=str)
+
+    @staticmethod
+    def _router_prefix(router):
+        return hashlib.sha1(router.encode()).hexdigest()[:16] + '-'
+
+    def _file(self, key):
+        # files of one router share a prefix, so they can be invalidated without being read
+        return os.path.join(self.path, self._router_prefix(key[0]) + hashlib.sha1(repr(key).encode()).hexdigest())
+
+    def get(self, router, params=None, default=None):
+        """Returns the cached result of a request.
+
+        Args:
+            router (str): The router of the request.
+            params (dict, optional): The parameters of the request. Defaults to None.
+            default (optional): The value returned if there is no valid result. Defaults to None.
+
+        Returns:
+            The cached result, or default if there is no valid result.
+        """
+        key = self._key(router, params)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= now:
+                del self._entries[key]
+                entry = None
+            if entry is None and self.path is not None:
+                entry = self._load(key, now)
+                if entry is not None:
+                    self._store(key, entry)
+            if entry is None:
+                self.misses[router] = self.misses.get(router, 0) + 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits[router] = self.hits.get(router, 0) + 1
+        # callers are free to modify what they get back
+        return copy.deepcopy(entry[1])
+
+    def set(self, router, params, value):
+        """Caches the result of a request for the TTL of its router.
+
+        Args:
+            router (str): The router of the request.
+            params (dict): The parameters of the request.
+            value: The result to cache.
+        """
+        if not self.caches(router):
+            return
+        key = self._key(router, params)
+        entry = (time.time() + self.ttl[router], copy.deepcopy(value))
+        with self._lock:
+            self._store(key, entry)
+            if self.path is not None:
+                tmp = self._file(key) + '.tmp'
+                with open(tmp, 'wb') as f:
+                    pickle.dump((key, entry), f, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(tmp, self._file(key))
+
+    def _store(self, key, entry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def _load(self, key, now):
+        try:
+            with open(self._file(key), 'rb') as f:
+                stored_key, entry = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+        if stored_key != key:
+            return None
+        if entry[0] <= now:
+            self._remove_file(self._file(key))
+            return None
+        return entry
+
+    @staticmethod
+    def _remove_file(file):
+        try:
+            os.remove(file)
+        except OSError:
+            pass
+
+    def invalidate(self, router=None, params=None):
+        """Drops cached results from memory and disk.
+
+        Args:
+            router (str, optional): Only drop results of this router. Defaults to None, all routers.
+            params (dict, optional): Only drop the result of these parameters of the router. Defaults to None.
+        """
+        with self._lock:
+            if router is not None and params is not None:
+                key = self._key(router, params)
+                self._entries.pop(key, None)
+                if self.path is not None:
+                    self._remove_file(self._file(key))
+                return
+            for key in [key for key in self._entries if router is None or key[0] == router]:
+                del self._entries[key]
+            if self.path is not None:
+                # the directory may be shared, only the files of the cache are removed
+                prefix = '' if router is None else self._router_prefix(router)
+                for name in os.listdir(self.path):
+                    if _FILE_NAME.fullmatch(name) and name.startswith(prefix):
+                        self._remove_file(os.path.join(self.path, name))
+
+    def stats(self):
+        """Returns the hit and miss counters.
+
+        Returns:
+            dict: The total hits and misses and the counters of every router.
+        """
+        with self._lock:
+            routers = sorted(set(self.hits) | set(self.misses))
+            return {
+                'hits': sum(self.hits.values()),
+                'misses': sum(self.misses.values()),
+                'routers': {r: {'hits': self.hits.get(r, 0), 'misses': self.misses.get(r, 0)} for r in routers},
+            }
@@ -0,0 +1,75 @@
+"""Client bundling the Oq* classes over one connection.
+
+    import onequant
+
+    client = onequant.connect(url, username, password)
+    client.trades.position()
+
+The `quotes`, `strategies` and `trades` of a client are built, and their modules imported, the
+first time they are used, so a tool needing only the trades never loads the others.
+"""
+import functools
+
+from onequant.api.output import check_output
+
+
+class OqClient:
+    """The `OqQuotes`, `OqStrategies` and `OqTrades` of one `ApiWrapper`, created on first access."""
+
+    def __init__(self, wrapper, output='pandas', store=None):
+        """Initializes the OqClient.
+
+        Args:
+            wrapper (ApiWrapper): The logged in wrapper shared by the Oq* objects.
+            output (str, optional): The backend of the data returned, see `onequant.api.output`.
+                Defaults to 'pandas'.
+            store (BarStore, optional): The bar store of the quotes. Defaults to None.
+        """
+        self.wrapper = wrapper
+        self.output = check_output(output)
+        self.store = store
+
+    @property
+    def api(self):
+        """Returns the ApiRequest shared by the Oq* objects."""
+        return self.wrapper.api
+
+    @functools.cached_property
+    def quotes(self):
+        """Returns the OqQuotes of the client."""
+        from onequant.api.quotes import OqQuotes
+
+        return OqQuotes(self.wrapper, store=self.store, output=self.output)
+
+    @functools.cached_property
+    def strategies(self):
+        """Returns the OqStrategies of the client."""
+        from onequant.api.strategies import OqStrategies
+
+        return OqStrategies(self.wrapper, output=self.output)
+
+    @functools.cached_property
+    def trades(self):
+        """Returns the OqTrades of the client."""
+        from onequant.api.trades import OqTrades
+
+        return OqTrades(self.wrapper, output=self.output)
+
+
+def connect(url, username, password, output='pandas', store=None, **kwargs):
+    """Logs in to the API server and returns a client.
+
+    Args:
+        url (str): The url of the API server.
+        username (str): The username of the login.
+        password (str): The password of the login.
+        output (str, optional): The backend of the data returned. Defaults to 'pandas'.
+        store (BarStore, optional): The bar store of the quotes. Defaults to None.
+        **kwargs: The other arguments of `ApiWrapper`, e.g. pool_size or rate_limit.
+
+    Returns:
+        OqClient: The client.
+    """
+    from onequant.api.request import ApiWrapper
+
+    return OqClient(ApiWrapper(url, username, password, **kwargs), output=output, store=store)
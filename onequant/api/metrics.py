@@ -0,0 +1,319 @@
+"""Per-router instrumentation of the requests sent to the API server.
+
+Every call is split into three phases, each observed in a latency histogram of its router:
+
+- network: sending the request and receiving the body,
+- decode: parsing the json body and converting TDengine rows to typed columns,
+- frame: building the pandas DataFrame.
+
+Response bytes, DataFrame rows and error codes are counted per router as well. Metrics are
+off unless an `ApiMetrics` is given to the api, and then cost one attribute check per call.
+
+Example:
+    wrapper = ApiWrapper(url, username, password, metrics=ApiMetrics())
+    OqQuotes(wrapper).future_bars('rb000', '1m', '20230101', '20230201')
+    wrapper.api.metrics.as_dict()
+    print(wrapper.api.metrics.to_prometheus())
+"""
+import bisect
+import contextvars
+import threading
+import time
+
+PHASES = ('network', 'decode', 'frame')
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# the call in progress in the current thread or task, so that the decorators decoding its response
+# know its router without it being passed around
+_current_call = contextvars.ContextVar('onequant_api_call', default=None)
+
+
+class _Call:
+    """A request in progress: its router and the time spent waiting on the network so far."""
+
+    __slots__ = ('router', 'network')
+
+    def __init__(self, router):
+        self.router = router
+        self.network = 0.0
+
+
+class _Histogram:
+    """Latency histogram with fixed bucket bounds."""
+
+    __slots__ = ('counts', 'sum', 'count')
+
+    def __init__(self, buckets):
+        # one more slot for the values above the last bound
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+
+class _RouterMetrics:
+    """The counters and histograms of one router."""
+
+    __slots__ = ('calls', 'bytes', 'rows', 'errors', 'phases')
+
+    def __init__(self, buckets):
+        self.calls = 0
+        self.bytes = 0
+        self.rows = 0
+        self.errors = {}
+        self.phases = {phase: _Histogram(buckets) for phase in PHASES}
+
+
+class ApiMetrics:
+    """Collects per-router call counts, phase latency histograms, bytes, rows and error codes."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        """Initializes the ApiMetrics.
+
+        Args:
+            buckets (tuple, optional): The upper bounds in seconds of the histogram buckets. Defaults to
+                LATENCY_BUCKETS, 1 ms to 60 s.
+        """
+        self.buckets = tuple(sorted(buckets))
+        self._routers = {}
+        self._lock = threading.Lock()
+
+    def _router(self, router):
+        """Returns the metrics of a router, creating them on first use. Must hold the lock."""
+        metrics = self._routers.get(router)
+        if metrics is None:
+            metrics = self._routers[router] = _RouterMetrics(self.buckets)
+        return metrics
+
+    def _current_router(self, router):
+        """Returns the given router, or the router of the call in progress."""
+        if router is not None:
+            return router
+        call = _current_call.get()
+        return None if call is None else call.router
+
+    def start(self, router):
+        """Counts a call to a router and makes it the call in progress of the current thread or task.
+
+        Args:
+            router (str): The router of the call.
+        """
+        _current_call.set(_Call(router))
+        with self._lock:
+            self._router(router).calls += 1
+
+    def observe(self, phase, seconds, router=None):
+        """Records the duration of a phase.
+
+        Args:
+            phase (str): One of PHASES.
+            seconds (float): The duration of the phase.
+            router (str, optional): The router of the call. Defaults to None, the call in progress.
+        """
+        router = self._current_router(router)
+        with self._lock:
+            histogram = self._router(router).phases[phase]
+            histogram.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+            histogram.sum += seconds
+            histogram.count += 1
+
+    def waited(self, seconds):
+        """Adds time spent waiting for a streamed body to the call in progress.
+
+        The total is observed once in the network phase by the api when the body is exhausted, this
+        running sum lets `decoded` leave it out of the decode phase.
+
+        Args:
+            seconds (float): The time spent waiting.
+        """
+        call = _current_call.get()
+        if call is not None:
+            call.network += seconds
+
+    def add_bytes(self, count, router=None):
+        """Counts response bytes.
+
+        Args:
+            count (int): The number of bytes.
+            router (str, optional): The router of the call. Defaults to None, the call in progress.
+        """
+        router = self._current_router(router)
+        with self._lock:
+            self._router(router).bytes += count
+
+    def add_rows(self, count, router=None):
+        """Counts rows of the DataFrames built.
+
+        Args:
+            count (int): The number of rows.
+            router (str, optional): The router of the call. Defaults to None, the call in progress.
+        """
+        router = self._current_router(router)
+        with self._lock:
+            self._router(router).rows += count
+
+    def add_error(self, code, router=None):
+        """Counts an error.
+
+        Args:
+            code (int or str): The error code of the response, the HTTP status or the exception name.
+            router (str, optional): The router of the call. Defaults to None, the call in progress.
+        """
+        router = self._current_router(router)
+        code = str(code)
+        with self._lock:
+            errors = self._router(router).errors
+            errors[code] = errors.get(code, 0) + 1
+
+    def check_response(self, result, status=200, router=None):
+        """Counts the HTTP status and the code of a decoded response as errors if they are not 200.
+
+        Args:
+            result: The decoded json response.
+            status (int, optional): The HTTP status of the response. Defaults to 200.
+            router (str, optional): The router of the call. Defaults to None, the call in progress.
+        """
+        if status >= 400:
+            self.add_error(f'http_{status}', router)
+        if isinstance(result, dict) and result.get('code', 200) != 200:
+            self.add_error(result['code'], router)
+
+    def decoded(self, chunks):
+        """Observes the decode phase of a streamed response while iterating its decoded chunks.
+
+        The time spent waiting for the body, reported by the api with `waited`, is left out.
+
+        Args:
+            chunks (iterable): The chunks decoded from the body.
+
+        Yields:
+            The chunks.
+        """
+        chunks = iter(chunks)
+        decode = 0.0
+        call = None
+        try:
+            while True:
+                before = _current_call.get()
+                network = 0.0 if before is None else before.network
+                started = time.perf_counter()
+                try:
+                    chunk = next(chunks)
+                except StopIteration:
+                    break
+                finally:
+                    # the first chunk starts the call of the stream
+                    call = _current_call.get()
+                    decode += time.perf_counter() - started - _network_since(before, network)
+                yield chunk
+        finally:
+            self.observe('decode', max(decode, 0.0), None if call is None else call.router)
+
+    def reset(self):
+        """Drops all the metrics collected."""
+        with self._lock:
+            self._routers = {}
+
+    def as_dict(self):
+        """Returns the metrics collected.
+
+        Returns:
+            dict: The metrics keyed by router: `calls`, `bytes`, `rows`, `errors` by code, and for every
+            phase the `count`, `sum` and cumulative `buckets` of its histogram keyed by upper bound.
+        """
+        bounds = [*self.buckets, float('inf')]
+        with self._lock:
+            return {
+                router: {
+                    'calls': metrics.calls,
+                    'bytes': metrics.bytes,
+                    'rows': metrics.rows,
+                    'errors': dict(metrics.errors),
+                    'phases': {
+                        phase: {
+                            'count': histogram.count,
+                            'sum': histogram.sum,
+                            'buckets': dict(zip(bounds, _cumulative(histogram.counts))),
+                        }
+                        for phase, histogram in metrics.phases.items()
+                    },
+                }
+                for router, metrics in self._routers.items()
+            }
+
+    def to_prometheus(self, prefix='onequant_api'):
+        """Returns the metrics in the Prometheus text exposition format.
+
+        Args:
+            prefix (str, optional): The prefix of the metric names. Defaults to 'onequant_api'.
+
+        Returns:
+            str: The metrics, one sample per line.
+        """
+        metrics = self.as_dict()
+        lines = []
+
+        def counter(name, help_text, samples):
+            lines.append(f'# HELP {prefix}_{name} {help_text}')
+            lines.append(f'# TYPE {prefix}_{name} counter')
+            for labels, value in samples:
+                lines.append(f'{prefix}_{name}{{{_labels(labels)}}} {_number(value)}')
+
+        counter(
+            'calls_total', 'Requests sent to the API server.', [({'router': r}, m['calls']) for r, m in metrics.items()]
+        )
+        counter(
+            'response_bytes_total',
+            'Bytes of the response bodies.',
+            [({'router': r}, m['bytes']) for r, m in metrics.items()],
+        )
+        counter('rows_total', 'Rows of the DataFrames built.', [({'router': r}, m['rows']) for r, m in metrics.items()])
+        counter(
+            'errors_total',
+            'Responses with an error code and failed requests.',
+            [({'router': r, 'code': code}, n) for r, m in metrics.items() for code, n in sorted(m['errors'].items())],
+        )
+
+        name = f'{prefix}_phase_seconds'
+        lines.append(f'# HELP {name} Seconds spent in each phase of a request.')
+        lines.append(f'# TYPE {name} histogram')
+        for router, router_metrics in metrics.items():
+            for phase, histogram in router_metrics['phases'].items():
+                labels = {'router': router, 'phase': phase}
+                for bound, count in histogram['buckets'].items():
+                    le = '+Inf' if bound == float('inf') else _number(bound)
+                    lines.append(f'{name}_bucket{{{_labels(dict(labels, le=le))}}} {count}')
+                lines.append(f'{name}_sum{{{_labels(labels)}}} {_number(histogram["sum"])}')
+                lines.append(f'{name}_count{{{_labels(labels)}}} {histogram["count"]}')
+        return '\n'.join(lines) + '\n'
+
+
+def _network_since(call, network):
+    """Returns the network time spent since `call` had spent `network`, the api may have started a new call."""
+    current = _current_call.get()
+    if current is None:
+        return 0.0
+    return current.network - network if current is call else current.network
+
+
+def _cumulative(counts):
+    """Returns the running totals of bucket counts."""
+    total = 0
+    result = []
+    for count in counts:
+        total += count
+        result.append(total)
+    return result
+
+
+def _labels(labels):
+    """Formats Prometheus labels, escaping their values."""
+    escaped = (
+        (key, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for key, value in labels.items()
+    )
+    return ','.join(f'{key}="{value}"' for key, value in escaped)
+
+
+def _number(value):
+    """Formats a sample value."""
+    return repr(float(value)) if isinstance(value, float) else str(value)
@@ -0,0 +1,178 @@
+"""Output backends of the data returned by the Oq* classes.
+
+The Oq* classes return pandas DataFrames by default. With `output` set on the class, or passed to
+the methods that take it, they return instead:
+
+- 'numpy': a numpy structured array, one field per column,
+- 'columns': a dict of numpy arrays keyed by column name,
+- 'arrow': a `pyarrow.Table`, `pyarrow` is required for this backend.
+
+Those are built straight from the decoded response, without going through pandas.
+
+The TDengine responses (K-lines, net values, trades...) are decoded column by column into the numpy
+dtype of each TDengine type. The DataFrames therefore hold `ts` as `datetime64[ms]` rather than the
+strings of the response, the other columns keep the dtypes pandas gave them, integer columns holding
+NULL being float64 with NaN. Code calling `pd.to_datetime(df['ts'])` keeps working, code comparing
+`ts` with strings or slicing it as text needs `df['ts'].dt.strftime('%Y-%m-%d %H:%M:%S.%f')`.
+
+Example:
+    quotes = OqQuotes(wrapper, output='numpy')
+    bars = quotes.future_bars('rb000', '1m', '2023-01-01', '2023-02-01')
+    bars['close'].mean()
+"""
+OUTPUTS = ('pandas', 'numpy', 'columns', 'arrow')
+
+
+def check_output(output):
+    """Returns output if it is a known backend.
+
+    Raises:
+        AssertionError: If output is not one of `OUTPUTS`.
+    """
+    assert output in OUTPUTS, f'Unsupported output {output!r}, expected one of {OUTPUTS}'
+    return output
+
+
+def _column(values):
+    """Copies the values of a json column to a numpy array of the narrowest fitting dtype.
+
+    Args:
+        values (list): The values of the column.
+
+    Returns:
+        numpy.ndarray: The column, bool, int64, float64 or object. Missing ints and floats become NaN.
+    """
+    import numpy as np
+
+    kinds = set(map(type, values))
+    nullable = type(None) in kinds
+    kinds.discard(type(None))
+    dtype = None
+    if kinds == {bool} and not nullable:
+        dtype = 'bool'
+    elif kinds == {int} and not nullable:
+        dtype = 'int64'
+    elif kinds and kinds <= {int, float}:
+        dtype = 'float64'
+    if dtype is not None:
+        try:
+            return np.array(values, dtype=dtype)
+        except OverflowError:
+            # ints beyond 64 bits are kept as python ints
+            pass
+    column = np.empty(len(values), dtype=object)
+    column[:] = values
+    return column
+
+
+def records_to_columns(records):
+    """Converts json records to a dict of numpy arrays.
+
+    Args:
+        records (list): The records as dicts, the keys missing from a record are missing values.
+
+    Returns:
+        dict: The columns keyed by name, in the order the keys first appear.
+    """
+    import operator
+
+    names = list(records[0]) if records else []
+    if set(map(len, records)) == {len(names)}:
+        try:
+            # the records of a response usually share their keys
+            return {name: _column(list(map(operator.itemgetter(name), records))) for name in names}
+        except KeyError:
+            pass
+    names = list(dict.fromkeys(name for record in records for name in record))
+    return {name: _column([record.get(name) for record in records]) for name in names}
+
+
+def to_columns(data):
+    """Returns decoded data as a dict of numpy arrays.
+
+    Args:
+        data (dict or list): Decoded columns, json records, or None.
+
+    Returns:
+        dict: The columns keyed by name.
+    """
+    import numpy as np
+
+    if data is None:
+        return {}
+    if isinstance(data, dict):
+        return {name: np.asarray(column) for name, column in data.items()}
+    return records_to_columns(data)
+
+
+def to_numpy(columns):
+    """Packs columns in a numpy structured array.
+
+    Object columns holding only strings become fixed width unicode fields.
+
+    Args:
+        columns (dict): The columns keyed by name, all of the same length.
+
+    Returns:
+        numpy.ndarray: The structured array.
+    """
+    import numpy as np
+
+    fields = {}
+    for name, column in columns.items():
+        if column.dtype == object and len(column) and all(isinstance(value, str) for value in column):
+            column = column.astype(str)
+        fields[str(name)] = column
+    array = np.empty(num_rows(fields), dtype=[(name, column.dtype) for name, column in fields.items()])
+    for name, column in fields.items():
+        array[name] = column
+    return array
+
+
+def to_arrow(columns):
+    """Builds a pyarrow Table from columns.
+
+    Args:
+        columns (dict): The columns keyed by name, all of the same length.
+
+    Raises:
+        ImportError: If pyarrow is not installed.
+
+    Returns:
+        pyarrow.Table: The table, None in object columns become nulls.
+    """
+    try:
+        import pyarrow as pa
+    except ImportError as e:
+        raise ImportError("output='arrow' requires pyarrow, install onequant[arrow]") from e
+
+    return pa.table({str(name): pa.array(column) for name, column in columns.items()})
+
+
+def convert(data, output='pandas'):
+    """Converts decoded data to an output backend.
+
+    Args:
+        data (dict or list): Decoded columns, json records, or None.
+        output (str, optional): One of `OUTPUTS`. Defaults to 'pandas'.
+
+    Returns:
+        The data in the requested backend.
+    """
+    if check_output(output) == 'pandas':
+        import pandas as pd
+
+        return pd.DataFrame(data)
+    columns = to_columns(data)
+    if output == 'numpy':
+        return to_numpy(columns)
+    if output == 'arrow':
+        return to_arrow(columns)
+    return columns
+
+
+def num_rows(result):
+    """Returns the number of rows of a result of any backend."""
+    if isinstance(result, dict):
+        return len(next(iter(result.values()))) if result else 0
+    return len(result)
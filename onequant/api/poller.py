@@ -0,0 +1,84 @@
+"""Incremental polling of the order and trade tables.
+
+The trade routers return the whole table of the day at every call. `RecordPoller` keeps the
+last table as a keyed store and returns only the records that are new or changed since the
+previous poll, so a risk loop only processes what moved:
+
+    poller = trades.order_poller(key='order_id')
+    while True:
+        for _, order in poller.poll().iterrows():
+            ...
+"""
+import time
+
+from onequant.api.quotestream import QuoteDiffer, _Timing
+
+
+class RecordPoller:
+    """Polls a table and returns the records that are new or changed since the previous poll."""
+
+    def __init__(self, fetch, key):
+        """Initializes the RecordPoller.
+
+        Args:
+            fetch (callable): Returns the whole table as a pandas DataFrame, or an awaitable of it for `apoll`.
+            key (str or list): The column, or columns, identifying a record across polls.
+        """
+        self.fetch = fetch
+        self.differ = QuoteDiffer(key)
+        self.records = None
+        self.polls = 0
+        self.rows = 0
+        self.changed_rows = 0
+        self.latency = _Timing()
+
+    @property
+    def removed(self):
+        """Returns the keys of the records that disappeared at the last poll."""
+        return self.differ.removed
+
+    @property
+    def stats(self):
+        """Returns the polling statistics.
+
+        Returns:
+            dict: The polls, the fetch latency (count, mean, max, last, in seconds) and the rows polled
+            and changed.
+        """
+        return {
+            'polls': self.polls,
+            'latency': self.latency.as_dict(),
+            'rows': self.rows,
+            'changed_rows': self.changed_rows,
+        }
+
+    def _record(self, table, started):
+        """Diffs a table, keeps it as the store and returns the delta."""
+        self.latency.add(time.monotonic() - started)
+        delta = self.differ.diff(table)
+        self.records = table
+        self.polls += 1
+        self.rows += len(table)
+        self.changed_rows += len(delta)
+        return delta
+
+    def poll(self):
+        """Fetches the table and returns the records that changed.
+
+        The first poll returns the whole table. The table itself is kept in `records` and the keys
+        of the records that disappeared in `removed`.
+
+        Returns:
+            pandas.DataFrame: The new or changed records.
+        """
+        started = time.monotonic()
+        return self._record(self.fetch(), started)
+
+    async def apoll(self):
+        """Fetches the table from asyncio code and returns the records that changed, see `poll`.
+
+        Returns:
+            pandas.DataFrame: The new or changed records.
+        """
+        started = time.monotonic()
+        return self._record(await self.fetch(), started)
@@ -1,20 +1,118 @@
 """This module provides methods for interacting with OneQuant quotedatas."""
-from onequant.api.wrapper import _pagination, _pd, tddata_2_list
+import functools
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from onequant.api.output import check_output, num_rows
+from onequant.api.quotestream import QuoteStream
+from onequant.api.tdstream import DEFAULT_CHUNK_ROWS, _columns_output, _measured_chunks, concat_chunks
+from onequant.api.wrapper import _cached, _measured, _pagination, _pd, _single_flight, tddata_2_columns
 from onequant.util.datetime import OqDateTime
 
+KLINE_CHUNK_BARS = 10000
+KLINE_RETRIES = 2
+KLINE_RETRY_DELAY = 0.5
+PANEL_FIELDS = ('open', 'high', 'low', 'close', 'volume')
+
+
+class BarsFetchError(Exception):
+    """Raised when some chunks of a long K-line request, or some symbols of a batch, still fail.
+
+    Attributes:
+        failed (dict): The exception of every failed (start, end) chunk or symbol.
+        data: The bars that were fetched, None when they went to the bar store.
+    """
+
+    def __init__(self, failed, data):
+        """Initializes the BarsFetchError with the failed chunks and the partial data."""
+        super().__init__(f'Failed to fetch K-lines of {sorted(failed)}: {list(failed.values())}')
+        self.failed = failed
+        self.data = data
+
+
+def _chunk_span(interval):
+    """Returns the time span in ms of a chunk of `KLINE_CHUNK_BARS` bars, None if the interval is unknown."""
+    interval_ms = OqDateTime.interval_to_ms(interval)
+    return None if interval_ms is None else interval_ms * KLINE_CHUNK_BARS
+
+
+def _split_range(start, end, span):
+    """Splits [start, end] into consecutive ranges of at most `span` ms, both ends included."""
+    if span is None:
+        return [[start, end]]
+    return [[chunk_start, min(chunk_start + span - 1, end)] for chunk_start in range(start, end + 1, span)]
+
+
+def _stitch_bars(chunks):
+    """Joins K-line columns in time order, dropping the bars repeated on the chunk boundaries."""
+    import numpy as np
+
+    chunks = [chunk for chunk in chunks if num_rows(chunk)]
+    if len(chunks) < 2:
+        return chunks[0] if chunks else {}
+    ts = np.concatenate([chunk['ts'] for chunk in chunks])
+    keep = np.zeros(len(ts), dtype=bool)
+    keep[np.unique(ts, return_index=True)[1]] = True
+    return {name: np.concatenate([chunk[name] for chunk in chunks])[keep] for name in chunks[0]}
+
+
+def _bars_panel(frames, layout='long', fields=PANEL_FIELDS):
+    """Assembles the K-line DataFrames of several symbols.
+
+    Args:
+        frames (dict): The K-line DataFrame of every symbol, in output order, or their columns for 'wide'.
+        layout (str, optional): 'long' or 'wide'. Defaults to 'long'.
+        fields (tuple, optional): The fields of the wide layout. Defaults to PANEL_FIELDS.
+
+    Returns:
+        The long pandas DataFrame indexed by (symbol, ts), or the dict of wide arrays.
+    """
+    import numpy as np
+    import pandas as pd
+
+    assert layout in ['long', 'wide'], 'Unsupported layout'
+    frames = {symbol: frame for symbol, frame in frames.items() if num_rows(frame)}
+    if layout == 'long':
+        if not frames:
+            return pd.DataFrame()
+        return pd.concat(
+            {symbol: frame.drop(columns='symbol', errors='ignore').set_index('ts') for symbol, frame in frames.items()},
+            names=['symbol', 'ts'],
+        )
+
+    symbols = list(frames)
+    stamps = [np.asarray(frame['ts'], dtype='datetime64[ms]') for frame in frames.values()]
+    ts = np.unique(np.concatenate(stamps)) if stamps else np.array([], dtype='datetime64[ms]')
+    panel = {'ts': ts, 'symbols': symbols}
+    for field in fields:
+        panel[field] = np.full((len(ts), len(symbols)), np.nan)
+    for column, (frame, frame_ts) in enumerate(zip(frames.values(), stamps)):
+        rows = np.searchsorted(ts, frame_ts)
+        for field in fields:
+            if field in frame:
+                panel[field][rows, column] = np.asarray(frame[field], dtype='float64')
+    return panel
+
 
 class OqQuotes:
     """A class for interacting with OneQuant quotedatas."""
 
-    def __init__(self, wrapper=None):
+    def __init__(self, wrapper=None, store=None, output='pandas'):
         """Initializes an OqQuotes object.
 
         Args:
             wrapper (object, optional): An object containing the API and username. Defaults to None.
+            store (BarStore, optional): A local store of K-line data, `future_bars` then only fetches the
+                ranges it does not hold yet. Defaults to None.
+            output (str, optional): The backend of the data returned, 'pandas', 'numpy', 'columns' or 'arrow',
+                see `onequant.api.output`. Defaults to 'pandas'.
         """
         self.api = wrapper.api
         self.username = wrapper.username
+        self.store = store
+        self.output = check_output(output)
 
+    @_single_flight
     def _query(self, router, params=None):
         """Sends a GET request to the specified router with the given parameters.
 
@@ -30,6 +128,8 @@ class OqQuotes:
             raise Exception(f'An error occurred while retrieving tdegine data! code is {result["code"]}')
         return result['data']
 
+    @_cached
+    @_single_flight
     @_pd
     def _query_pd(self, params=None, router=None):
         """Sends a GET request and returns the data as a pandas DataFrame.
@@ -44,6 +144,8 @@ class OqQuotes:
         result = self.api.request(method='get', router=router, params=params)
         return result['data'], result['code']
 
+    @_cached
+    @_single_flight
     @_pd
     @_pagination
     def _query_pd_pg(self, params=None, router=None):
@@ -59,8 +161,9 @@ class OqQuotes:
         result = self.api.request(method='get', router=router, params=params)
         return result
 
+    @_single_flight
     @_pd
-    @tddata_2_list
+    @tddata_2_columns
     def _querytd_pd(self, router, params=None):
         """Sends a GET request and returns the data as a pandas DataFrame.
 
@@ -74,25 +177,118 @@ class OqQuotes:
         result = self.api.request(method='get', router=router, params=params)
         return result
 
-    def realtime_quote(self):
+    def _querytd_chunks(self, router, params=None, chunk_rows=DEFAULT_CHUNK_ROWS, output=None):
+        """Streams a GET request and yields the data as pandas DataFrames of at most chunk_rows rows.
+
+        Args:
+            router (str): The router to send the request to.
+            params (dict, optional): The parameters to include in the request. Defaults to None.
+            chunk_rows (int, optional): The maximum number of rows of each DataFrame. Defaults to 100000.
+            output (str, optional): The output backend of the chunks. Defaults to the output of the object.
+
+        Yields:
+            pandas.DataFrame: The next chunk of the data.
+        """
+        output = check_output(output or self.output)
+        pieces = self.api.stream(method='get', router=router, params=params)
+        for columns in _measured_chunks(self.api, pieces, chunk_rows=chunk_rows):
+            yield _measured(self.api, 'frame', _columns_output, columns, output)
+
+    @_single_flight
+    def _querytd_pd_stream(self, router, params=None, chunk_rows=DEFAULT_CHUNK_ROWS, output=None):
+        """Streams a GET request and returns the data as a pandas DataFrame.
+
+        The rows are decoded in chunks while the body arrives, so the whole body is never parsed
+        into python objects at once.
+
+        Args:
+            router (str): The router to send the request to.
+            params (dict, optional): The parameters to include in the request. Defaults to None.
+            chunk_rows (int, optional): The number of rows decoded at a time. Defaults to 100000.
+            output (str, optional): The output backend of the data. Defaults to the output of the object.
+
+        Returns:
+            pandas.DataFrame: The data from the response as a pandas DataFrame.
+        """
+        output = check_output(output or self.output)
+        pieces = self.api.stream(method='get', router=router, params=params)
+        columns = concat_chunks(_measured_chunks(self.api, pieces, chunk_rows=chunk_rows))
+        return _measured(self.api, 'frame', _columns_output, columns, output)
+
+    def realtime_quote(self, output=None):
         """Returns realtime quote data.
 
+        Args:
+            output (str, optional): The backend of the data returned. Defaults to the output of the object.
+
         Returns:
             pandas.DataFrame: The realtime quote data.
         """
-        return self._query_pd(router='/quote/future/realTime/quote')
+        return self._query_pd(router='/quote/future/realTime/quote', output=output)
 
-    def realtime_quotes(self):
+    def realtime_quotes(self, output=None):
         """Returns multiple realtime quote data.
 
+        Args:
+            output (str, optional): The backend of the data returned. Defaults to the output of the object.
+
         Returns:
             pandas.DataFrame: The multiple realtime quote data.
         """
-        return self._query_pd(router='/quote/future/realTime/quotes')
+        return self._query_pd(router='/quote/future/realTime/quotes', output=output)
+
+    def stream_quotes(self, key='symbol', interval=1.0, adaptive=False, max_interval=None):
+        """Polls the realtime quotes and streams the rows that changed.
+
+        The first delta holds the whole snapshot, the next ones only the new or changed rows.
+        Polls without any change are not yielded. The polling statistics are in `stats` of the stream.
 
-    def future_bars(self, code=None, interval=None, start_time=None, end_time=None, limit=None):
+        Args:
+            key (str, optional): The column identifying a quote across polls. Defaults to 'symbol'.
+            interval (float, optional): The seconds between two polls. Defaults to 1.0.
+            adaptive (bool, optional): Poll less often while nothing changes. Defaults to False.
+            max_interval (float, optional): The longest adaptive interval. Defaults to 10 times interval.
+
+        Returns:
+            QuoteStream: An endless iterator of pandas DataFrame deltas.
+        """
+        # the deltas are computed on DataFrames, whatever the output of the object
+        return QuoteStream(
+            functools.partial(self.realtime_quotes, output='pandas'), key, interval, adaptive, max_interval
+        )
+
+    @staticmethod
+    def _bars_params(code, interval, start_time, end_time, limit):
+        """Builds the parameters of a K-line request, converting date strings to ms timestamps."""
+        if not (isinstance(start_time, int) and isinstance(end_time, int)):
+            start_time = OqDateTime.string_to_ms_timestamp(start_time)
+            end_time = OqDateTime.string_to_ms_timestamp(end_time)
+        return {
+            'symbol': code,
+            'interval': interval,
+            'start': start_time,
+            'end': end_time,
+            'limit': limit,
+        }
+
+    def future_bars(
+        self,
+        code=None,
+        interval=None,
+        start_time=None,
+        end_time=None,
+        limit=None,
+        stream=False,
+        progress=None,
+        output=None,
+    ):
         """Fetches K-line (candlestick) data for futures.
 
+        Without a limit, a range longer than `KLINE_CHUNK_BARS` bars of the interval is split into chunks
+        fetched concurrently and stitched back together, de-duplicated on `ts`. A failed chunk is retried
+        `KLINE_RETRIES` times, then a `BarsFetchError` is raised; with a bar store the chunks already fetched
+        are kept, so calling again only fetches the rest.
+
         Args:
             code (str, optional): The code of the future to fetch data for. Defaults to None.
             interval (str, optional): The time interval for each K-line data point. Defaults to None.
@@ -100,28 +296,182 @@ class OqQuotes:
             end (uint or str, optional): The end time for the data fetch. Can be a timestamp or a date string.
             limit (int, optional): The maximum number of data points to fetch. Defaults to None.If set limit value,then
             start will discarded.
+            stream (bool, optional): Decode the response in chunks while it arrives instead of parsing it
+                as a whole, which bounds the memory used by long ranges. Defaults to False.
+            progress (callable, optional): Called as progress(done, total) each time a chunk is fetched.
+                Defaults to None.
+            output (str, optional): The backend of the data returned. Defaults to the output of the object.
 
         Returns:
             pandas.DataFrame: The K-line data as a pandas DataFrame.
         """
-        if isinstance(start_time, int) and isinstance(end_time, int):
-            params = {
-                'symbol': code,
-                'interval': interval,
-                'start': start_time,
-                'end': end_time,
-                'limit': limit,
-            }
-            return self._querytd_pd(router='/tvquote/kline_ascend', params=params)
-        else:
-            params = {
-                'symbol': code,
-                'interval': interval,
-                'start': OqDateTime.string_to_ms_timestamp(start_time),
-                'end': OqDateTime.string_to_ms_timestamp(end_time),
-                'limit': limit,
+        output = check_output(output or self.output)
+        params = self._bars_params(code, interval, start_time, end_time, limit)
+        if self.store is not None and limit is None:
+            return self._future_bars_stored(params, stream=stream, progress=progress, output=output)
+        if limit is None:
+            ranges = _split_range(params['start'], params['end'], _chunk_span(interval))
+            if len(ranges) > 1:
+                chunks, failed = self._fetch_bars(params, ranges, stream=stream, progress=progress)
+                bars = _columns_output(_stitch_bars(chunks.values()), output)
+                if failed:
+                    raise BarsFetchError(failed, bars)
+                return bars
+        if stream:
+            return self._querytd_pd_stream(router='/tvquote/kline_ascend', params=params, output=output)
+        return self._querytd_pd(router='/tvquote/kline_ascend', params=params, output=output)
+
+    def future_bars_batch(
+        self, codes, interval=None, start_time=None, end_time=None, layout='long', fields=PANEL_FIELDS, progress=None
+    ):
+        """Fetches the K-line data of several futures over the same interval and range.
+
+        The symbols are fetched concurrently by at most `pool_size` threads of the api.
+
+        Args:
+            codes (list): The codes of the futures to fetch data for.
+            interval (str, optional): The time interval for each K-line data point. Defaults to None.
+            start_time (uint or str, optional): The start time. Can be a timestamp or a date string.
+            end_time (uint or str, optional): The end time. Can be a timestamp or a date string.
+            layout (str, optional): 'long' returns one DataFrame indexed by (symbol, ts). 'wide' returns a
+                dict with the union of the timestamps under 'ts', the codes under 'symbols' and one
+                (ts x symbol) float array per field, NaN where a symbol has no bar. Both layouts ignore
+                the output of the object. Defaults to 'long'.
+            fields (tuple, optional): The fields of the wide layout. Defaults to open, high, low, close, volume.
+            progress (callable, optional): Called as progress(done, total) each time a symbol is fetched.
+
+        Raises:
+            BarsFetchError: If some symbols failed, with the panel of the others as its data.
+
+        Returns:
+            The K-line panel in the requested layout.
+        """
+        codes = list(dict.fromkeys(codes))
+        # the wide panel is built from the columns, not from DataFrames
+        output = 'pandas' if layout == 'long' else 'columns'
+        frames, failed = {}, {}
+        with ThreadPoolExecutor(max_workers=max(1, min(self.api.pool_size, len(codes)))) as pool:
+            futures = {
+                pool.submit(self.future_bars, code, interval, start_time, end_time, output=output): code
+                for code in codes
             }
-            return self._querytd_pd(router='/tvquote/kline_ascend', params=params)
+            for done, future in enumerate(as_completed(futures), start=1):
+                try:
+                    frames[futures[future]] = future.result()
+                except Exception as e:
+                    failed[futures[future]] = e
+                if progress is not None:
+                    progress(done, len(codes))
+        panel = _bars_panel({code: frames[code] for code in codes if code in frames}, layout, fields)
+        if failed:
+            raise BarsFetchError(failed, panel)
+        return panel
+
+    def _fetch_bars(self, params, ranges, stream=False, progress=None):
+        """Fetches the K-line data of several ranges concurrently, retrying the failed ones.
+
+        Args:
+            params (dict): The parameters of the K-line request.
+            ranges (list): The [start, end] ranges to fetch.
+            stream (bool, optional): Decode the responses in chunks. Defaults to False.
+            progress (callable, optional): Called as progress(done, total) each time a range is fetched.
+
+        Returns:
+            tuple: The columns of the fetched ranges keyed by (start, end) in range order, and
+            the exception of the last attempt of each failed range keyed the same way.
+        """
+        fetch = self._querytd_pd_stream if stream else self._querytd_pd
+
+        def fetch_range(bounds):
+            error = None
+            for attempt in range(KLINE_RETRIES + 1):
+                if attempt:
+                    time.sleep(KLINE_RETRY_DELAY * 2 ** (attempt - 1))
+                try:
+                    return fetch(
+                        router='/tvquote/kline_ascend',
+                        params=dict(params, start=bounds[0], end=bounds[1]),
+                        output='columns',
+                    )
+                except Exception as e:
+                    error = e
+            raise error
+
+        frames, failed = {}, {}
+        with ThreadPoolExecutor(max_workers=min(self.api.pool_size, len(ranges))) as pool:
+            futures = {pool.submit(fetch_range, bounds): tuple(bounds) for bounds in ranges}
+            for done, future in enumerate(as_completed(futures), start=1):
+                try:
+                    frames[futures[future]] = future.result()
+                except Exception as e:
+                    failed[futures[future]] = e
+                if progress is not None:
+                    progress(done, len(ranges))
+        return {bounds: frames[bounds] for bounds in sorted(frames)}, failed
+
+    def _future_bars_stored(self, params, stream=False, progress=None, output='pandas'):
+        """Reads K-line data from the bar store after fetching the ranges it does not hold yet.
+
+        Args:
+            params (dict): The parameters of the K-line request.
+            stream (bool, optional): Decode the fetched ranges in chunks. Defaults to False.
+            progress (callable, optional): Called as progress(done, total) each time a chunk is fetched.
+            output (str, optional): The backend of the data returned. Defaults to 'pandas'.
+
+        Raises:
+            BarsFetchError: If some chunks still fail after retrying, the others are stored.
+
+        Returns:
+            pandas.DataFrame: The K-line data as a pandas DataFrame.
+        """
+        import numpy as np
+
+        code, interval = params['symbol'], params['interval']
+        span = _chunk_span(interval)
+        ranges = [
+            bounds
+            for gap in self.store.missing(code, interval, params['start'], params['end'])
+            for bounds in _split_range(gap[0], gap[1], span)
+        ]
+        if ranges:
+            chunks, failed = self._fetch_bars(params, ranges, stream=stream, progress=progress)
+            # the last bar may still be forming, so it is stored but its time is not recorded as fetched
+            settled = int(time.time() * 1000) - (OqDateTime.interval_to_ms(interval) or 0)
+            self.store.write(
+                code, interval, _stitch_bars(chunks.values()), [[start, min(end, settled)] for start, end in chunks]
+            )
+            if failed:
+                raise BarsFetchError(failed, None)
+        # the decoder reads ts as naive times whose ms are the epoch ms of the bars, slice on the same convention
+        first, last = (np.datetime64(int(params[key]), 'ms') for key in ('start', 'end'))
+        return _columns_output(self.store.read(code, interval, first, last) or {}, output)
+
+    def future_bars_chunks(
+        self,
+        code=None,
+        interval=None,
+        start_time=None,
+        end_time=None,
+        limit=None,
+        chunk_rows=DEFAULT_CHUNK_ROWS,
+        output=None,
+    ):
+        """Fetches K-line data for futures as a stream of DataFrames, for out-of-core processing.
+
+        Args:
+            code (str, optional): The code of the future to fetch data for. Defaults to None.
+            interval (str, optional): The time interval for each K-line data point. Defaults to None.
+            start_time (uint or str, optional): The start time. Can be a timestamp or a date string.
+            end_time (uint or str, optional): The end time. Can be a timestamp or a date string.
+            limit (int, optional): The maximum number of data points to fetch. Defaults to None.
+            chunk_rows (int, optional): The maximum number of rows of each DataFrame. Defaults to 100000.
+            output (str, optional): The backend of the chunks. Defaults to the output of the object.
+
+        Yields:
+            pandas.DataFrame: The next chunk of the K-line data.
+        """
+        params = self._bars_params(code, interval, start_time, end_time, limit)
+        return self._querytd_chunks(router='/tvquote/kline_ascend', params=params, chunk_rows=chunk_rows, output=output)
 
     def symbols(self):
         """Returns symbols data."""
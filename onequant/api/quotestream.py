@@ -0,0 +1,193 @@
+"""Delta stream of realtime quotes.
+
+`QuoteStream` polls a realtime quotes snapshot and yields only the rows that changed since the
+previous poll. It is both an iterator and an async iterator:
+
+    for delta in quotes.stream_quotes(interval=0.5, adaptive=True):
+        ...
+
+    async for delta in async_quotes.stream_quotes(interval=0.5):
+        ...
+"""
+import time
+
+
+class _Timing:
+    """Running count, mean, max and last value of a duration."""
+
+    __slots__ = ('count', 'total', 'max', 'last')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.last = None
+
+    def add(self, value):
+        """Records a duration in seconds."""
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+        self.last = value
+
+    def as_dict(self):
+        """Returns the statistics as a dict."""
+        return {
+            'count': self.count,
+            'mean': self.total / self.count if self.count else None,
+            'max': self.max if self.count else None,
+            'last': self.last,
+        }
+
+
+def _changed(new, old):
+    """Returns the mask of the values that differ, NaN being equal to NaN."""
+    import numpy as np
+
+    ne = np.asarray(new != old, dtype=bool)
+    if new.dtype.kind == 'f' and old.dtype.kind == 'f':
+        ne &= ~(np.isnan(new) & np.isnan(old))
+    return ne
+
+
+class QuoteDiffer:
+    """Keeps the previous snapshot as keyed column arrays and finds the rows that changed."""
+
+    def __init__(self, key='symbol'):
+        """Initializes the QuoteDiffer.
+
+        Args:
+            key (str or list, optional): The column, or columns, identifying a row across snapshots.
+                Defaults to 'symbol'.
+        """
+        self.key = key
+        self.removed = []
+        self._index = None
+        self._values = None
+
+    def diff(self, snapshot):
+        """Compares a snapshot with the previous one and keeps it as the new reference.
+
+        Args:
+            snapshot (pandas.DataFrame): The new snapshot.
+
+        Raises:
+            ValueError: If the key is not unique in the snapshot.
+
+        Returns:
+            pandas.DataFrame: The rows of the snapshot that are new or changed. The keys that disappeared
+            are left in `removed`.
+        """
+        import numpy as np
+        import pandas as pd
+
+        keys = [self.key] if isinstance(self.key, str) else list(self.key)
+        if len(snapshot.columns) == 0:
+            # an empty table comes without any column
+            index = pd.Index([])
+        elif len(keys) == 1:
+            index = pd.Index(snapshot[keys[0]].to_numpy())
+        else:
+            index = pd.MultiIndex.from_arrays([snapshot[key].to_numpy() for key in keys])
+        if not index.is_unique:
+            raise ValueError(f'Duplicated {self.key} in the snapshot')
+        values = {name: snapshot[name].to_numpy() for name in snapshot.columns}
+
+        if self._values is None or list(values) != list(self._values):
+            changed = np.ones(len(snapshot), dtype=bool)
+            self.removed = [] if self._index is None else list(self._index.difference(index))
+        else:
+            positions = self._index.get_indexer(index)
+            known = positions >= 0
+            changed = ~known
+            old_rows = positions[known]
+            known_changed = np.zeros(len(old_rows), dtype=bool)
+            for name, column in values.items():
+                known_changed |= _changed(column[known], self._values[name][old_rows])
+            changed[known] = known_changed
+            self.removed = list(self._index.difference(index))
+
+        self._index = index
+        self._values = values
+        return snapshot[changed]
+
+
+class QuoteStream:
+    """Polls a quotes snapshot and yields the rows that changed, with tick to tick timing stats.
+
+    With `adaptive` the polling interval grows by half after every poll without changes, up to
+    `max_interval`, and drops back to `interval` as soon as something changes.
+    """
+
+    def __init__(self, fetch, key='symbol', interval=1.0, adaptive=False, max_interval=None):
+        """Initializes the QuoteStream.
+
+        Args:
+            fetch (callable): Returns the snapshot, or an awaitable of it for async iteration.
+            key (str, optional): The column identifying a row across snapshots. Defaults to 'symbol'.
+            interval (float, optional): The seconds between the start of two polls. Defaults to 1.0.
+            adaptive (bool, optional): Poll less often while nothing changes. Defaults to False.
+            max_interval (float, optional): The longest adaptive interval. Defaults to 10 times interval.
+        """
+        self.fetch = fetch
+        self.differ = QuoteDiffer(key)
+        self.interval = interval
+        self.adaptive = adaptive
+        self.max_interval = interval * 10 if max_interval is None else max_interval
+        self.delay = interval
+        self.latency = _Timing()
+        self.tick = _Timing()
+        self.rows = 0
+        self.changed_rows = 0
+        self._last_poll = None
+
+    @property
+    def stats(self):
+        """Returns the polling statistics.
+
+        Returns:
+            dict: The fetch latency and tick to tick interval (count, mean, max, last, in seconds), the
+            rows polled and changed, and the current polling interval.
+        """
+        return {
+            'latency': self.latency.as_dict(),
+            'tick': self.tick.as_dict(),
+            'rows': self.rows,
+            'changed_rows': self.changed_rows,
+            'interval': self.delay,
+        }
+
+    def _record(self, snapshot, started):
+        """Diffs a snapshot, updates the stats and returns the delta and the seconds to wait."""
+        now = time.monotonic()
+        self.latency.add(now - started)
+        if self._last_poll is not None:
+            self.tick.add(started - self._last_poll)
+        self._last_poll = started
+
+        delta = self.differ.diff(snapshot)
+        self.rows += len(snapshot)
+        self.changed_rows += len(delta)
+        if self.adaptive:
+            self.delay = self.interval if len(delta) else min(self.delay * 1.5, self.max_interval)
+        return delta, max(0.0, started + self.delay - now)
+
+    def __iter__(self):
+        """Polls forever, yielding the non-empty deltas."""
+        while True:
+            started = time.monotonic()
+            delta, wait = self._record(self.fetch(), started)
+            if len(delta):
+                yield delta
+            time.sleep(wait)
+
+    async def __aiter__(self):
+        """Polls forever from asyncio code, yielding the non-empty deltas."""
+        import asyncio
+
+        while True:
+            started = time.monotonic()
+            delta, wait = self._record(await self.fetch(), started)
+            if len(delta):
+                yield delta
+            await asyncio.sleep(wait)
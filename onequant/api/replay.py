@@ -0,0 +1,221 @@
+"""Record and replay the responses of the API server.
+
+`RecordAdapter` is mounted on the session of `ApiRequest` in place of the pooled HTTP adapter: it
+sends the requests to the server as usual and saves every response to a fixture file. `ReplayAdapter`
+answers the requests from those files without any network, so the api can be tested and benchmarked
+offline. `StandInServer` of `onequant.api.standin` serves the same files over HTTP.
+
+Example:
+    api = ApiRequest(url, transport=RecordAdapter('fixtures'))   # against the live server
+    api = ApiRequest(url, transport=ReplayAdapter('fixtures'))   # offline, same responses
+
+A fixture is found by the method, router, query parameters and body of the request. Fixtures are
+meant to be committed, so the login exchange and the cookie headers are never recorded: a replayed
+login always succeeds, without a token.
+"""
+import base64
+import hashlib
+import io
+import json
+import os
+import re
+import threading
+from urllib.parse import parse_qsl, urlsplit
+
+from requests.adapters import BaseAdapter, HTTPAdapter  # type: ignore
+
+LOGIN_ROUTER = '/system/login/login'
+# the body is decoded and sized again on replay, the cookies hold the session token
+DROPPED_HEADERS = ('content-encoding', 'content-length', 'set-cookie', 'cookie')
+
+
+class FixtureNotFound(Exception):
+    """Raised when a replayed request was never recorded."""
+
+
+def fixture_key(method, router, params=None, body=None):
+    """Returns the key identifying a request among the fixtures.
+
+    Args:
+        method (str): The HTTP method.
+        router (str): The path of the request.
+        params (dict or list, optional): The query parameters, in any order. Defaults to None.
+        body (bytes or str, optional): The body of the request. Defaults to None.
+
+    Returns:
+        str: The key.
+    """
+    if isinstance(body, str):
+        body = body.encode()
+    query = sorted((str(k), str(v)) for k, v in (params.items() if isinstance(params, dict) else params or ()))
+    digest = hashlib.sha1(json.dumps([method.upper(), router, query]).encode())
+    if body:
+        digest.update(hashlib.sha1(body).digest())
+    return digest.hexdigest()
+
+
+def _split(request):
+    """Returns the router and the query parameters of a prepared request."""
+    url = urlsplit(request.url)
+    return url.path, parse_qsl(url.query, keep_blank_values=True)
+
+
+class FixtureStore:
+    """Directory of recorded responses, one json file per request."""
+
+    def __init__(self, path):
+        """Initializes the FixtureStore.
+
+        Args:
+            path (str): The directory of the fixture files.
+        """
+        self.path = os.path.expanduser(path)
+        self._lock = threading.Lock()
+        os.makedirs(self.path, exist_ok=True)
+
+    def _file(self, router, key):
+        # the router in the name keeps the directory readable
+        return os.path.join(self.path, re.sub(r'[^\w.-]', '_', router.strip('/')) + '-' + key[:16] + '.json')
+
+    def get(self, method, router, params=None, body=None):
+        """Returns the fixture of a request.
+
+        Args:
+            method (str): The HTTP method.
+            router (str): The path of the request.
+            params (dict or list, optional): The query parameters. Defaults to None.
+            body (bytes or str, optional): The body of the request. Defaults to None.
+
+        Returns:
+            dict: The `status`, `headers` and `body` (bytes) of the response, or None if not recorded.
+        """
+        try:
+            with open(self._file(router, fixture_key(method, router, params, body))) as f:
+                fixture = json.load(f)
+        except OSError:
+            return None
+        fixture['body'] = base64.b64decode(fixture['body']) if fixture.get('base64') else fixture['body'].encode()
+        return fixture
+
+    def put(self, method, router, params, body, status, headers, content):
+        """Saves the response of a request, except the login holding the credentials and the token.
+
+        Args:
+            method (str): The HTTP method.
+            router (str): The path of the request.
+            params (dict or list): The query parameters.
+            body (bytes or str): The body of the request.
+            status (int): The HTTP status of the response.
+            headers (dict): The headers of the response.
+            content (bytes): The body of the response.
+        """
+        if router == LOGIN_ROUTER:
+            return
+        try:
+            text, encoded = content.decode(), False
+        except UnicodeDecodeError:
+            text, encoded = base64.b64encode(content).decode(), True
+        headers = {k: v for k, v in headers.items() if k.lower() not in DROPPED_HEADERS}
+        query = params.items() if isinstance(params, dict) else params or ()
+        fixture = {
+            'method': method.upper(),
+            'router': router,
+            'params': [[str(k), str(v)] for k, v in query],
+            'status': status,
+            'headers': headers,
+            'base64': encoded,
+            'body': text,
+        }
+        file = self._file(router, fixture_key(method, router, params, body))
+        with self._lock:
+            with open(file + '.tmp', 'w') as f:
+                json.dump(fixture, f)
+            os.replace(file + '.tmp', file)
+
+    def __iter__(self):
+        """Yields every fixture of the store, with its body as bytes."""
+        for name in sorted(os.listdir(self.path)):
+            if name.endswith('.json'):
+                with open(os.path.join(self.path, name)) as f:
+                    fixture = json.load(f)
+                fixture['body'] = (
+                    base64.b64decode(fixture['body']) if fixture.get('base64') else fixture['body'].encode()
+                )
+                yield fixture
+
+
+def _store(store):
+    """Returns a FixtureStore from a store or a directory."""
+    return store if isinstance(store, FixtureStore) else FixtureStore(store)
+
+
+class RecordAdapter(HTTPAdapter):
+    """Pooled HTTP adapter saving every response it receives to a `FixtureStore`."""
+
+    def __init__(self, store, pool_maxsize=10, pool_block=True, **kwargs):
+        """Initializes the RecordAdapter.
+
+        Args:
+            store (FixtureStore or str): The store, or its directory.
+            pool_maxsize (int, optional): The size of the connection pool. Defaults to 10.
+            pool_block (bool, optional): Wait for a free connection instead of opening more. Defaults to True.
+            **kwargs: The other arguments of `requests.adapters.HTTPAdapter`.
+        """
+        self.store = _store(store)
+        super().__init__(pool_connections=1, pool_maxsize=pool_maxsize, pool_block=pool_block, **kwargs)
+
+    def send(self, request, **kwargs):
+        """Sends a request to the server and records its response."""
+        response = super().send(request, **kwargs)
+        # read the whole body, a streamed response is then served from memory
+        content = response.content
+        router, params = _split(request)
+        self.store.put(
+            request.method, router, params, request.body, response.status_code, dict(response.headers), content
+        )
+        return response
+
+
+class ReplayAdapter(BaseAdapter):
+    """Adapter answering the requests with the responses of a `FixtureStore`, without any network."""
+
+    def __init__(self, store):
+        """Initializes the ReplayAdapter.
+
+        Args:
+            store (FixtureStore or str): The store, or its directory.
+        """
+        super().__init__()
+        self.store = _store(store)
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        """Returns the recorded response of a request.
+
+        Raises:
+            FixtureNotFound: If the request was not recorded.
+        """
+        from requests.models import Response
+        from requests.structures import CaseInsensitiveDict
+        from requests.utils import get_encoding_from_headers
+
+        router, params = _split(request)
+        fixture = self.store.get(request.method, router, params, request.body)
+        if fixture is None and router == LOGIN_ROUTER:
+            fixture = {'status': 200, 'headers': {}, 'body': b'{"code": 200, "data": {}}'}
+        if fixture is None:
+            raise FixtureNotFound(f'No fixture for {request.method} {request.url}')
+
+        response = Response()
+        response.status_code = fixture['status']
+        response.headers = CaseInsensitiveDict(fixture['headers'])
+        response.headers['Content-Length'] = str(len(fixture['body']))
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.raw = io.BytesIO(fixture['body'])
+        response.reason = 'OK' if fixture['status'] < 400 else 'Error'
+        response.url = request.url
+        response.request = request
+        response.connection = self
+        return response
+
+    def close(self):
+        """Nothing to release."""
@@ -2,27 +2,102 @@
 
 Basic function of fetching data from API server.
 """
+import threading
+import time
+
 import requests  # type: ignore
+from requests.adapters import HTTPAdapter  # type: ignore
+
+from onequant.api.singleflight import SingleFlight
+from onequant.api.throttle import NO_SLOT, AdaptiveConcurrency, RateLimiter
+
+DEFAULT_POOL_SIZE = 10
+DEFAULT_TIMEOUT = (5, 60)
+STREAM_CHUNK_SIZE = 1 << 20
 
 
 class ApiRequest:
     """Class for connecting to trading server.
 
-    Basic function of fetching data from API server.
+    Basic function of fetching data from API server. All requests go through one
+    `requests.Session`, so connections to the server are kept alive and reused
+    from a pool shared by every thread using this object.
     """
 
-    def __init__(self, url):
+    def __init__(
+        self,
+        url,
+        pool_size=DEFAULT_POOL_SIZE,
+        timeout=DEFAULT_TIMEOUT,
+        cache=None,
+        metrics=None,
+        rate_limit=None,
+        adaptive=True,
+        single_flight=True,
+        transport=None,
+    ):
         """Initializes the ApiRequest class with a given url.
 
         Args:
             url (str): The url to be used for the API request.
+            pool_size (int, optional): The maximum number of keep-alive connections kept in the pool.
+                Should match the number of worker threads sharing this object. Defaults to 10.
+            timeout (float or tuple, optional): The default (connect, read) timeout in seconds for
+                each request. Defaults to (5, 60).
+            cache (ApiCache, optional): The cache of reference data shared by the Oq* classes. Defaults to None.
+            metrics (ApiMetrics, optional): Collects per-router metrics of the requests. Defaults to None, off.
+            rate_limit (float or RateLimiter, optional): The maximum number of requests per second, or a
+                limiter shared with other objects. Defaults to None, no limit.
+            adaptive (bool or AdaptiveConcurrency, optional): Adapt the number of requests in flight to the
+                health of the server, up to pool_size. Defaults to True.
+            single_flight (bool, optional): Let concurrent identical queries of the Oq* classes share one
+                request and its decoded result. Defaults to True.
+            transport (requests.adapters.BaseAdapter, optional): The adapter sending the requests, e.g. a
+                `RecordAdapter` or a `ReplayAdapter`. Defaults to None, a pooled HTTP adapter.
         """
         self.url = url
         self.token = None
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.cache = cache
+        self.metrics = metrics
+        if rate_limit is None or isinstance(rate_limit, RateLimiter):
+            self.rate_limiter = rate_limit
+        else:
+            self.rate_limiter = RateLimiter(rate_limit)
+        if isinstance(adaptive, AdaptiveConcurrency):
+            self.concurrency_limiter = adaptive
+        else:
+            self.concurrency_limiter = AdaptiveConcurrency(pool_size) if adaptive else None
+        self.flights = SingleFlight() if single_flight else None
+        self.transport = transport
         self.headers = {
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 \
             (KHTML, like Gecko) Chrome/71.0.3578.98 Safari/537.36"
         }
+        self._lock = threading.Lock()
+        self._session = None
+
+    @property
+    def session(self):
+        """Returns the pooled session, creating it on first use.
+
+        Returns:
+            requests.Session: The session shared by all requests of this object.
+        """
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    session = requests.Session()
+                    adapter = self.transport
+                    if adapter is None:
+                        # pool_block keeps the number of open connections bounded by pool_size
+                        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size, pool_block=True)
+                    session.mount('http://', adapter)
+                    session.mount('https://', adapter)
+                    session.headers.update(self.headers)
+                    self._session = session
+        return self._session
 
     def login(self, username, password):
         """Logs in to the API with the given username and password.
@@ -36,7 +111,7 @@ class ApiRequest:
         """
         data = {'username': username, 'password': password, 'autoLogin': False, 'type': 'pc'}
 
-        response = requests.post(url=self.url + '/system/login/login', json=data, headers=self.headers)
+        response = self.session.post(url=self.url + '/system/login/login', json=data, timeout=self.timeout)
         if 'Set-Cookie' in response.headers:
             import re
 
@@ -44,10 +119,13 @@ class ApiRequest:
             if match:
                 self.token = 'satoken=' + match.group(1)
                 self.headers['Cookie'] = self.token
+                # replace the cookie stored from the response by one sent to every path of the server
+                self.session.cookies.set('satoken', None)
+                self.session.cookies.set('satoken', match.group(1))
 
         return self.token
 
-    def request(self, method, router, params=None, data=None, json=None):
+    def request(self, method, router, params=None, data=None, json=None, timeout=None):
         """Sends a request to the API with the given parameters.
 
         Args:
@@ -56,6 +134,7 @@ class ApiRequest:
             params (dict, optional): The parameters to be used for the request. Defaults to None.
             data (dict, optional): The data to be used for the request. Defaults to None.
             json (dict, optional): The json to be used for the request. Defaults to None.
+            timeout (float or tuple, optional): Overrides the default timeout for this request. Defaults to None.
 
         Raises:
             AssertionError: If an unsupported request method is used.
@@ -65,24 +144,178 @@ class ApiRequest:
         """
         assert method in ['get', 'post', 'put', 'delete'], 'Unsupported request method'
 
-        response = requests.request(
-            method=method, url=self.url + router, params=params, data=data, json=json, headers=self.headers
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire()
+        with self._slot() as outcome:
+            metrics = self.metrics
+            if metrics is None:
+                response = self._send(method, router, params, data, json, timeout)
+                result = response.json()
+            else:
+                result, response = self._measured_request(metrics, method, router, params, data, json, timeout)
+            outcome.report(response, result)
+            return result
+
+    def _slot(self):
+        """Returns the context holding a slot of the adaptive concurrency limiter for one request."""
+        return NO_SLOT if self.concurrency_limiter is None else self.concurrency_limiter.slot()
+
+    def _measured_request(self, metrics, method, router, params, data, json, timeout):
+        """Sends a request, observing its network and decode phases, and returns the result and the response."""
+        metrics.start(router)
+        started = time.perf_counter()
+        try:
+            response = self._send(method, router, params, data, json, timeout)
+        except Exception as e:
+            metrics.add_error(type(e).__name__, router)
+            raise
+        metrics.observe('network', time.perf_counter() - started, router)
+        metrics.add_bytes(len(response.content), router)
+        started = time.perf_counter()
+        try:
+            result = response.json()
+        except ValueError as e:
+            metrics.add_error(
+                type(e).__name__ if response.status_code < 400 else f'http_{response.status_code}', router
+            )
+            raise
+        metrics.observe('decode', time.perf_counter() - started, router)
+        metrics.check_response(result, response.status_code, router)
+        return result, response
+
+    def _send(self, method, router, params, data, json, timeout, stream=False):
+        """Sends a request through the pooled session and returns the `requests.Response`."""
+        return self.session.request(
+            method=method,
+            url=self.url + router,
+            params=params,
+            data=data,
+            json=json,
+            timeout=self.timeout if timeout is None else timeout,
+            stream=stream,
         )
 
-        return response.json()
+    def stream(self, method, router, params=None, data=None, json=None, timeout=None, chunk_size=STREAM_CHUNK_SIZE):
+        """Sends a request to the API and yields the body of the response as it arrives.
+
+        The connection goes back to the pool once the body is exhausted or the generator is closed.
+
+        Args:
+            method (str): The HTTP method to be used for the request.
+            router (str): The router to be used for the request.
+            params (dict, optional): The parameters to be used for the request. Defaults to None.
+            data (dict, optional): The data to be used for the request. Defaults to None.
+            json (dict, optional): The json to be used for the request. Defaults to None.
+            timeout (float or tuple, optional): Overrides the default timeout for this request. Defaults to None.
+            chunk_size (int, optional): The number of bytes read at a time. Defaults to 1 MB.
+
+        Raises:
+            AssertionError: If an unsupported request method is used.
+
+        Yields:
+            bytes: The next piece of the body.
+        """
+        assert method in ['get', 'post', 'put', 'delete'], 'Unsupported request method'
+
+        metrics = self.metrics
+        if metrics is None:
+            with self._open_stream(method, router, params, data, json, timeout) as response:
+                yield from response.iter_content(chunk_size=chunk_size)
+            return
+
+        metrics.start(router)
+        network = 0.0
+        started = time.perf_counter()
+        try:
+            with self._open_stream(method, router, params, data, json, timeout) as response:
+                if response.status_code >= 400:
+                    metrics.add_error(f'http_{response.status_code}', router)
+                # only the time spent waiting for the body is network time, not the time of the consumer
+                pieces = response.iter_content(chunk_size=chunk_size)
+                while True:
+                    piece = next(pieces, None)
+                    waited = time.perf_counter() - started
+                    network += waited
+                    metrics.waited(waited)
+                    if piece is None:
+                        break
+                    metrics.add_bytes(len(piece), router)
+                    yield piece
+                    started = time.perf_counter()
+        except Exception as e:
+            metrics.add_error(type(e).__name__, router)
+            raise
+        finally:
+            metrics.observe('network', network, router)
+
+    def _open_stream(self, method, router, params, data, json, timeout):
+        """Sends a streamed request once the limiters allow it and returns the response before its body.
+
+        The concurrency slot is released as soon as the headers arrive, so a consumer sending other requests
+        while reading the body cannot wait on itself.
+        """
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire()
+        with self._slot() as outcome:
+            response = self._send(method, router, params, data, json, timeout, stream=True)
+            outcome.report(response)
+        return response
+
+    def close(self):
+        """Closes the pooled session and all of its connections."""
+        with self._lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
 
 
 class ApiWrapper:
-    """Wrapper for keep using ApiRequest."""
+    """Wrapper for keep using ApiRequest.
+
+    `OqQuotes`, `OqStrategies` and `OqTrades` built from the same wrapper share its
+    `ApiRequest`, and therefore the same connection pool.
+    """
 
-    def __init__(self, url, username, password):
+    def __init__(
+        self,
+        url,
+        username,
+        password,
+        pool_size=DEFAULT_POOL_SIZE,
+        timeout=DEFAULT_TIMEOUT,
+        cache=None,
+        metrics=None,
+        rate_limit=None,
+        adaptive=True,
+        single_flight=True,
+        transport=None,
+    ):
         """Initializes the ApiWrapper class with a given url, username, and password.
 
         Args:
             url (str): The url to be used for the API request.
             username (str): The username to be used for the login.
             password (str): The password to be used for the login.
+            pool_size (int, optional): The size of the shared connection pool. Defaults to 10.
+            timeout (float or tuple, optional): The default timeout of each request. Defaults to (5, 60).
+            cache (ApiCache, optional): The cache of reference data. Defaults to None.
+            metrics (ApiMetrics, optional): Collects per-router metrics of the requests. Defaults to None.
+            rate_limit (float or RateLimiter, optional): The maximum number of requests per second. Defaults to None.
+            adaptive (bool or AdaptiveConcurrency, optional): Adapt the requests in flight to the health of the
+                server. Defaults to True.
+            single_flight (bool, optional): Share concurrent identical queries. Defaults to True.
+            transport (requests.adapters.BaseAdapter, optional): The adapter sending the requests. Defaults to None.
         """
-        self.api = ApiRequest(url)
+        self.api = ApiRequest(
+            url,
+            pool_size=pool_size,
+            timeout=timeout,
+            cache=cache,
+            metrics=metrics,
+            rate_limit=rate_limit,
+            adaptive=adaptive,
+            single_flight=single_flight,
+            transport=transport,
+        )
         self.api.login(username, password)
         self.username = username
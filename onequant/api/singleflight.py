@@ -0,0 +1,100 @@
+"""Coalescing of identical requests running at the same time.
+
+When several threads ask for the same data at the same moment, only the first one sends the
+request and decodes the response, the others wait for it. Every caller then gets its own copy of the
+result, the result itself being kept private, so a caller modifying its frame does not change the
+frames of the others.
+
+Example:
+    api = ApiRequest(url)  # single_flight=True by default
+    with ThreadPoolExecutor(8) as pool:
+        # one request for the 8 calls
+        frames = list(pool.map(lambda _: oqs.strategy_netvalue('s1'), range(8)))
+"""
+import copy
+import threading
+
+
+class _Flight:
+    """A call in progress and, once done, its result or exception."""
+
+    __slots__ = ('done', 'result', 'error', 'waiters')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        # callers waiting for the result besides the one running the call
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Runs at most one call per key at a time, sharing its result with the callers of the same key."""
+
+    def __init__(self):
+        """Initializes the SingleFlight."""
+        self.calls = 0
+        self.shared = 0
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, func):
+        """Calls func, unless a call of the same key is in progress, then waits for its result.
+
+        Args:
+            key (hashable): Identifies the call.
+            func (callable): The call, without arguments.
+
+        Raises:
+            Exception: The exception raised by the call, for every caller waiting on it.
+
+        Returns:
+            The result of func, or a copy of it when the call was shared with other callers.
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                self.calls += 1
+            else:
+                flight.waiters += 1
+                self.shared += 1
+
+        if leader:
+            try:
+                flight.result = func()
+            except BaseException as e:
+                flight.error = e
+                raise
+            finally:
+                with self._lock:
+                    del self._flights[key]
+                flight.done.set()
+            # no caller can join once the flight is removed, the result is only shared if one was waiting
+            return _copy(flight.result) if flight.waiters else flight.result
+
+        flight.done.wait()
+        if flight.error is not None:
+            raise flight.error
+        return _copy(flight.result)
+
+    def stats(self):
+        """Returns the number of calls run and of calls served by another call in progress.
+
+        Returns:
+            dict: The calls run, the calls shared and the calls in progress.
+        """
+        with self._lock:
+            return {'calls': self.calls, 'shared': self.shared, 'in_flight': len(self._flights)}
+
+
+def _copy(result):
+    """Copies a shared result, so that every caller is free to modify what it gets."""
+    if type(result).__module__.startswith('pyarrow'):
+        # arrow tables are immutable
+        return result
+    if hasattr(result, 'copy') and hasattr(result, 'columns'):
+        # a DataFrame, copying its buffers is much cheaper than a deep copy
+        return result.copy()
+    return copy.deepcopy(result)
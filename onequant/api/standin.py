@@ -0,0 +1,236 @@
+"""Local stand-in for the API server.
+
+`StandInServer` answers on localhost with the responses recorded by `onequant.api.replay.RecordAdapter`,
+and with synthetic responses of `onequant.api.synthetic` for the routers it knows, so the whole api can
+run offline at any data size:
+
+- POST /system/login/login: sets the satoken cookie,
+- /tvquote/kline_ascend: one bar per interval of the range asked, for any symbol,
+- /strategy/analyse/netequity/query: `netequity_days` daily net values for any strategy,
+- /strategy/analyse/report/querypro: `reports` strategy reports,
+- /quote/futureBase/*: `symbols` rows, paginated by at most `max_page_size` rows,
+- /quote/future/realTime/quote(s): `quotes` quotes, a few of them changing at every call.
+
+Example:
+    with StandInServer(fixtures='fixtures', latency=0.005) as server:
+        wrapper = ApiWrapper(server.url, 'user', 'password')
+        OqStrategies(wrapper).strategy_netvalue('s1')
+"""
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+from onequant.api import synthetic
+from onequant.api.replay import FixtureStore, fixture_key
+from onequant.util.datetime import OqDateTime
+
+LOGIN_TOKEN = 'standin-token'
+# the server shares the process of the client it serves, keep its cpu out of the measures
+BODY_CACHE_SIZE = 4096
+
+
+class StandInServer:
+    """Threaded HTTP server standing in for the API server."""
+
+    def __init__(
+        self,
+        fixtures=None,
+        host='127.0.0.1',
+        port=0,
+        latency=0.0,
+        max_in_flight=None,
+        netequity_days=2500,
+        reports=200,
+        symbols=1000,
+        max_page_size=10000,
+        quotes=50,
+    ):
+        """Initializes the StandInServer.
+
+        Args:
+            fixtures (FixtureStore or str, optional): The recorded responses served first. Defaults to None.
+            host (str, optional): The address to listen on. Defaults to '127.0.0.1'.
+            port (int, optional): The port to listen on. Defaults to 0, any free port.
+            latency (float, optional): The seconds added to every response. Defaults to 0.0.
+            max_in_flight (int, optional): Answer code 500 to the requests beyond this many at once, like an
+                overloaded server. Defaults to None, no limit.
+            netequity_days (int, optional): The number of daily net values of a strategy. Defaults to 2500.
+            reports (int, optional): The number of strategy reports. Defaults to 200.
+            symbols (int, optional): The number of rows of the paginated futureBase routers. Defaults to 1000.
+            max_page_size (int, optional): The largest page served. Defaults to 10000.
+            quotes (int, optional): The number of realtime quotes. Defaults to 50.
+        """
+        if fixtures is not None and not isinstance(fixtures, FixtureStore):
+            fixtures = FixtureStore(fixtures)
+        self.fixtures = fixtures
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.max_in_flight = max_in_flight
+        self.netequity_days = netequity_days
+        self.reports = reports
+        self.symbols = symbols
+        self.max_page_size = max_page_size
+        self.quotes = quotes
+        self.requests = 0
+        self.errors = 0
+        self.in_flight = 0
+        self._quote_calls = 0
+        self._fixtures = {}
+        self._bodies = {}
+        self._rows = None
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+    @property
+    def url(self):
+        """Returns the base url of the running server."""
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self):
+        """Starts serving in a background thread.
+
+        Returns:
+            str: The base url of the server.
+        """
+        if self.fixtures is not None:
+            # index the fixtures once, they are then served from memory
+            for fixture in self.fixtures:
+                key = fixture_key(fixture['method'], fixture['router'], fixture['params'], None)
+                self._fixtures.setdefault(key, fixture)
+        handler = type('StandInHandler', (_Handler,), {'standin': self})
+        self._server = ThreadingHTTPServer((self.host, self.port), handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self.url
+
+    def stop(self):
+        """Stops the server."""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        """Starts the server when entering the context."""
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        """Stops the server when leaving the context."""
+        self.stop()
+
+    def respond(self, method, router, params):
+        """Returns the status, headers and body answering a request.
+
+        Args:
+            method (str): The HTTP method.
+            router (str): The path of the request.
+            params (list): The query parameters as (name, value) pairs.
+
+        Returns:
+            tuple: The HTTP status, a dict of headers and the body as bytes.
+        """
+        if router == '/system/login/login':
+            return 200, {'Set-Cookie': f'satoken={LOGIN_TOKEN}; Path=/'}, synthetic.encode({'code': 200, 'data': {}})
+
+        if self._fixtures:
+            fixture = self._fixtures.get(fixture_key(method, router, params))
+            if fixture is not None:
+                return fixture['status'], fixture['headers'], fixture['body']
+
+        query = dict(params)
+        key = (router, tuple(sorted(query.items())))
+        body = self._bodies.get(key)
+        if body is None:
+            payload = self._synthetic(router, query)
+            if payload is None:
+                return 404, {}, synthetic.encode({'code': 404, 'data': None, 'msg': f'Unknown router {router}'})
+            body = synthetic.encode(payload)
+            # the synthetic responses are deterministic, except the realtime quotes
+            if not router.startswith('/quote/future/realTime/') and len(self._bodies) < BODY_CACHE_SIZE:
+                self._bodies[key] = body
+        return 200, {}, body
+
+    def _synthetic(self, router, query):
+        """Returns the synthetic payload of a router, None if it is not known."""
+        if router == '/tvquote/kline_ascend':
+            symbol = query.get('symbol', 'rb000')
+            limit = int(query['limit']) if query.get('limit') else None
+            if 'start' not in query or 'end' not in query:
+                return synthetic.kline_payload(limit or 1000, symbol)
+            interval_ms = OqDateTime.interval_to_ms(query.get('interval', '1m')) or 60000
+            return synthetic.kline_range_payload(symbol, int(query['start']), int(query['end']), interval_ms, limit)
+        if router == '/strategy/analyse/netequity/query':
+            return synthetic.netequity_payload(self.netequity_days, query.get('strategy_id', 's1'))
+        if router == '/strategy/analyse/report/querypro':
+            return {'code': 200, 'data': synthetic.report_rows(self.reports)}
+        if router.startswith('/quote/futureBase/'):
+            if self._rows is None:
+                self._rows = [{'symbol': f'sym{i}', 'code': f'sym{i}', 'exchange': 'SHFE'} for i in range(self.symbols)]
+            rows = self._rows
+            page_size = min(int(query.get('pageSize', self.max_page_size)), self.max_page_size)
+            return synthetic.page_payload(rows, int(query.get('current', 1)), page_size)
+        if router.startswith('/quote/future/realTime/quote'):
+            with self._lock:
+                self._quote_calls += 1
+                calls = self._quote_calls
+            # a few quotes tick at every call
+            rows = [
+                {'symbol': f'sym{i}', 'last': 3800.0 + (calls if i % 10 == calls % 10 else 0), 'volume': i}
+                for i in range(self.quotes)
+            ]
+            return {'code': 200, 'data': rows[:1] if router.endswith('/quote') else rows}
+        return None
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """Request handler of `StandInServer`, keeping connections alive like the real server."""
+
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+    standin = None
+
+    def _handle(self):
+        """Answers a request of any method."""
+        standin = self.standin
+        length = int(self.headers.get('Content-Length') or 0)
+        if length:
+            self.rfile.read(length)
+        url = urlsplit(self.path)
+        with standin._lock:
+            standin.requests += 1
+            standin.in_flight += 1
+            overloaded = standin.max_in_flight is not None and standin.in_flight > standin.max_in_flight
+        try:
+            if standin.latency:
+                time.sleep(standin.latency)
+            if overloaded:
+                status, headers, body = 200, {}, synthetic.encode({'code': 500, 'data': None, 'msg': 'Server busy'})
+            else:
+                params = parse_qsl(url.query, keep_blank_values=True)
+                status, headers, body = standin.respond(self.command, url.path, params)
+            if overloaded or status >= 400:
+                with standin._lock:
+                    standin.errors += 1
+        finally:
+            with standin._lock:
+                standin.in_flight -= 1
+        headers = dict(headers)
+        headers.setdefault('Content-Type', 'application/json;charset=UTF-8')
+        headers['Content-Length'] = str(len(body))
+        self.send_response(status)
+        for name, value in headers.items():
+            if name.lower() not in ('connection', 'transfer-encoding', 'date', 'server'):
+                self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = do_POST = do_PUT = do_DELETE = _handle
+
+    def log_message(self, format, *args):
+        """Keeps the server quiet."""
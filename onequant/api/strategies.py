@@ -1,19 +1,25 @@
 """This module provides methods for interacting with OneQuant strategies."""
-from onequant.api.wrapper import _pagination, _pd, tddata_2_list
+from onequant.api.output import check_output
+from onequant.api.tdstream import DEFAULT_CHUNK_ROWS, _columns_output, _measured_chunks, concat_chunks
+from onequant.api.wrapper import _cached, _measured, _pagination, _pd, _single_flight, tddata_2_columns
 
 
 class OqStrategies:
     """A class for interacting with OneQuant strategies."""
 
-    def __init__(self, wrapper=None):
+    def __init__(self, wrapper=None, output='pandas'):
         """Initializes an OqStrategies object.
 
         Args:
             wrapper (object, optional): An object containing the API and username. Defaults to None.
+            output (str, optional): The backend of the data returned, 'pandas', 'numpy', 'columns' or 'arrow',
+                see `onequant.api.output`. Defaults to 'pandas'.
         """
         self.api = wrapper.api
         self.username = wrapper.username
+        self.output = check_output(output)
 
+    @_single_flight
     def _query(self, router, params=None):
         """Sends a GET request to the specified router with the given parameters.
 
@@ -29,6 +35,8 @@ class OqStrategies:
             raise Exception(f'An error occurred while retrieving tdegine data! code is {result["code"]}')
         return result['data']
 
+    @_cached
+    @_single_flight
     @_pd
     def _query_pd(self, params=None, router=None):
         """Sends a GET request and returns the data as a pandas DataFrame.
@@ -43,6 +51,8 @@ class OqStrategies:
         result = self.api.request(method='get', router=router, params=params)
         return result['data'], result['code']
 
+    @_cached
+    @_single_flight
     @_pd
     @_pagination
     def _query_pd_pg(self, params=None, router=None):
@@ -58,8 +68,9 @@ class OqStrategies:
         result = self.api.request(method='get', router=router, params=params)
         return result
 
+    @_single_flight
     @_pd
-    @tddata_2_list
+    @tddata_2_columns
     def _querytd_pd(self, router, params=None):
         """Sends a GET request and returns the data as a pandas DataFrame.
 
@@ -73,6 +84,44 @@ class OqStrategies:
         result = self.api.request(method='get', router=router, params=params)
         return result
 
+    def _querytd_chunks(self, router, params=None, chunk_rows=DEFAULT_CHUNK_ROWS, output=None):
+        """Streams a GET request and yields the data as pandas DataFrames of at most chunk_rows rows.
+
+        Args:
+            router (str): The router to send the request to.
+            params (dict, optional): The parameters to include in the request. Defaults to None.
+            chunk_rows (int, optional): The maximum number of rows of each DataFrame. Defaults to 100000.
+            output (str, optional): The output backend of the chunks. Defaults to the output of the object.
+
+        Yields:
+            pandas.DataFrame: The next chunk of the data.
+        """
+        output = check_output(output or self.output)
+        pieces = self.api.stream(method='get', router=router, params=params)
+        for columns in _measured_chunks(self.api, pieces, chunk_rows=chunk_rows):
+            yield _measured(self.api, 'frame', _columns_output, columns, output)
+
+    @_single_flight
+    def _querytd_pd_stream(self, router, params=None, chunk_rows=DEFAULT_CHUNK_ROWS, output=None):
+        """Streams a GET request and returns the data as a pandas DataFrame.
+
+        The rows are decoded in chunks while the body arrives, so the whole body is never parsed
+        into python objects at once.
+
+        Args:
+            router (str): The router to send the request to.
+            params (dict, optional): The parameters to include in the request. Defaults to None.
+            chunk_rows (int, optional): The number of rows decoded at a time. Defaults to 100000.
+            output (str, optional): The output backend of the data. Defaults to the output of the object.
+
+        Returns:
+            pandas.DataFrame: The data from the response as a pandas DataFrame.
+        """
+        output = check_output(output or self.output)
+        pieces = self.api.stream(method='get', router=router, params=params)
+        columns = concat_chunks(_measured_chunks(self.api, pieces, chunk_rows=chunk_rows))
+        return _measured(self.api, 'frame', _columns_output, columns, output)
+
     def strategy_base(self):
         """Returns the base information for all strategies.
 
@@ -146,17 +195,38 @@ class OqStrategies:
         }
         return self._query_pd(router='/strategy/analyse/report/querypro', params=params)
 
-    def strategy_netvalue(self, strategy_id=None):
+    def strategy_netvalue(self, strategy_id=None, stream=False, output=None):
         """Returns the net value for the specified strategy.
 
         Args:
             strategy_id (str, optional): The ID of the strategy to retrieve the net value for. Defaults to None.
+            stream (bool, optional): Decode the response in chunks while it arrives instead of parsing it
+                as a whole. Defaults to False.
+            output (str, optional): The backend of the data returned. Defaults to the output of the object.
 
         Returns:
             pandas.DataFrame: The net value for the specified strategy.
         """
         params = {'strategy_id': strategy_id}
-        return self._querytd_pd(router='/strategy/analyse/netequity/query', params=params)
+        if stream:
+            return self._querytd_pd_stream(router='/strategy/analyse/netequity/query', params=params, output=output)
+        return self._querytd_pd(router='/strategy/analyse/netequity/query', params=params, output=output)
+
+    def strategy_netvalue_chunks(self, strategy_id=None, chunk_rows=DEFAULT_CHUNK_ROWS, output=None):
+        """Returns the net value for the specified strategy as a stream of DataFrames.
+
+        Args:
+            strategy_id (str, optional): The ID of the strategy to retrieve the net value for. Defaults to None.
+            chunk_rows (int, optional): The maximum number of rows of each DataFrame. Defaults to 100000.
+            output (str, optional): The backend of the chunks. Defaults to the output of the object.
+
+        Yields:
+            pandas.DataFrame: The next chunk of the net value.
+        """
+        params = {'strategy_id': strategy_id}
+        return self._querytd_chunks(
+            router='/strategy/analyse/netequity/query', params=params, chunk_rows=chunk_rows, output=output
+        )
 
     def strategy_record(self, strategy_id=None):
         """Returns the record for the specified strategy.
@@ -0,0 +1,176 @@
+"""Synthetic responses shaped like the ones of the API server, of any size.
+
+The payloads are deterministic for a given seed, so benchmarks and tests built on them are
+reproducible. They are served by `onequant.api.standin.StandInServer`.
+
+Example:
+    payload = kline_payload(1000000)           # one million 1m bars in a TDengine response
+    body = encode(netequity_payload(2500, 's1'))
+"""
+import json
+import zlib
+
+KLINE_COLUMNS = [
+    ['ts', 'TIMESTAMP', 8],
+    ['open', 'FLOAT', 4],
+    ['high', 'FLOAT', 4],
+    ['low', 'FLOAT', 4],
+    ['close', 'FLOAT', 4],
+    ['volume', 'BIGINT', 8],
+    ['symbol', 'NCHAR', 16],
+]
+NETEQUITY_COLUMNS = [['ts', 'TIMESTAMP', 8], ['net_value', 'DOUBLE', 8]]
+
+
+def _seed(*values):
+    """Returns a stable seed derived from values, e.g. a symbol, so that each one gets its own series."""
+    return zlib.crc32(json.dumps(values, default=str).encode())
+
+
+def _timestamps(start, count, step_ms):
+    """Returns count TDengine timestamp strings from start, step_ms apart."""
+    import numpy as np
+
+    ts = np.datetime64(start, 'ms') + np.arange(count) * np.timedelta64(step_ms, 'ms')
+    return [str(t).replace('T', ' ') for t in ts]
+
+
+def tdengine_payload(column_meta, rows):
+    """Wraps rows in a TDengine REST response.
+
+    Args:
+        column_meta (list): The [name, type, length] of every column.
+        rows (list): The rows, one list of values per row.
+
+    Returns:
+        dict: The json response.
+    """
+    return {'code': 200, 'data': {'code': 0, 'column_meta': column_meta, 'data': rows, 'rows': len(rows)}}
+
+
+def kline_rows(n_rows, symbol='rb000', start='2020-01-02 09:00:00', interval_ms=60000, seed=None):
+    """Returns a random walk of K-line bars.
+
+    Args:
+        n_rows (int): The number of bars.
+        symbol (str, optional): The symbol of the bars. Defaults to 'rb000'.
+        start (str, optional): The time of the first bar. Defaults to '2020-01-02 09:00:00'.
+        interval_ms (int, optional): The time between two bars in ms. Defaults to 60000.
+        seed (int, optional): The seed of the walk. Defaults to None, derived from the symbol.
+
+    Returns:
+        list: The rows of `KLINE_COLUMNS`.
+    """
+    import numpy as np
+
+    rng = np.random.default_rng(_seed(symbol) if seed is None else seed)
+    close = np.round(3800 + rng.standard_normal(n_rows).cumsum(), 1) + 0.5
+    volume = rng.integers(1, 10000, n_rows)
+    return [
+        [t, c - 1.0, c + 2.0, c - 2.0, c, int(v), symbol]
+        for t, c, v in zip(_timestamps(start, n_rows, interval_ms), close.tolist(), volume)
+    ]
+
+
+def kline_payload(n_rows, symbol='rb000', start='2020-01-02 09:00:00', interval_ms=60000, seed=None):
+    """Returns a `/tvquote/kline_ascend` response of n_rows bars, see `kline_rows`.
+
+    Returns:
+        dict: The json response.
+    """
+    return tdengine_payload(KLINE_COLUMNS, kline_rows(n_rows, symbol, start, interval_ms, seed))
+
+
+def kline_range_payload(symbol, start_ms, end_ms, interval_ms=60000, limit=None):
+    """Returns a `/tvquote/kline_ascend` response for a request range.
+
+    The bars fall on the multiples of interval_ms in [start_ms, end_ms] and are the same whatever the
+    range asked, as if read from one series per symbol. Their `ts` is the UTC wall time.
+
+    Args:
+        symbol (str): The symbol of the bars.
+        start_ms (int): The start of the range in ms timestamp.
+        end_ms (int): The end of the range in ms timestamp, included.
+        interval_ms (int, optional): The time between two bars in ms. Defaults to 60000.
+        limit (int, optional): The maximum number of bars. Defaults to None.
+
+    Returns:
+        dict: The json response.
+    """
+    import numpy as np
+
+    first = -(-start_ms // interval_ms)
+    count = max(0, end_ms // interval_ms - first + 1)
+    if limit is not None:
+        count = min(count, limit)
+    # a cheap counter based series, so that any slice of it can be built without the bars before it
+    index = np.arange(first, first + count)
+    close = np.round(3800 + 50 * np.sin(index / 97.0 + _seed(symbol) % 628 / 100.0), 1) + 0.5
+    volume = (index * 2654435761 + _seed(symbol)) % 9999 + 1
+    start = np.datetime64(int(first * interval_ms), 'ms')
+    rows = [
+        [t, c - 1.0, c + 2.0, c - 2.0, c, int(v), symbol]
+        for t, c, v in zip(_timestamps(start, count, interval_ms), close.tolist(), volume.tolist())
+    ]
+    return tdengine_payload(KLINE_COLUMNS, rows)
+
+
+def netequity_payload(n_days, strategy_id='s1', start='2015-01-05', seed=None):
+    """Returns a `/strategy/analyse/netequity/query` response of n_days daily net values.
+
+    Args:
+        n_days (int): The number of days.
+        strategy_id (str, optional): The strategy, each one gets its own series. Defaults to 's1'.
+        start (str, optional): The first day. Defaults to '2015-01-05'.
+        seed (int, optional): The seed of the series. Defaults to None, derived from the strategy.
+
+    Returns:
+        dict: The json response.
+    """
+    import numpy as np
+
+    rng = np.random.default_rng(_seed(strategy_id) if seed is None else seed)
+    net_value = np.round(np.cumprod(1 + rng.normal(0.0004, 0.01, n_days)), 6)
+    rows = [[t, v] for t, v in zip(_timestamps(f'{start} 15:00:00', n_days, 86400000), net_value.tolist())]
+    return tdengine_payload(NETEQUITY_COLUMNS, rows)
+
+
+def page_payload(rows, current=1, page_size=10000):
+    """Returns one page of a paginated response.
+
+    Args:
+        rows (list): All the rows of the query.
+        current (int, optional): The page, from 1. Defaults to 1.
+        page_size (int, optional): The number of rows of a page. Defaults to 10000.
+
+    Returns:
+        dict: The json response.
+    """
+    start = (current - 1) * page_size
+    return {'code': 200, 'data': rows[start : start + page_size], 'total': len(rows), 'pageSize': page_size}
+
+
+def report_rows(n_rows, seed=0):
+    """Returns rows shaped like the strategy reports of `/strategy/analyse/report/query`.
+
+    Args:
+        n_rows (int): The number of reports.
+        seed (int, optional): The seed of the values. Defaults to 0.
+
+    Returns:
+        list: The reports as dicts.
+    """
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    sharpe = np.round(rng.normal(0.8, 0.5, n_rows), 4).tolist()
+    annual = np.round(rng.normal(0.2, 0.15, n_rows), 4).tolist()
+    return [
+        {'strategy': f's{i}', 'base_ea': 'ea', 'test_codes': 'rb000', 'sharpe': s, 'annual_returns': a}
+        for i, s, a in zip(range(n_rows), sharpe, annual)
+    ]
+
+
+def encode(payload):
+    """Serializes a payload to the bytes of a response body."""
+    return json.dumps(payload, separators=(',', ':')).encode()
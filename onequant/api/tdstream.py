@@ -0,0 +1,184 @@
+"""Streaming decoder of TDengine responses.
+
+A TDengine response holds its rows in one json array:
+
+    {"code": 200, "data": {"code": 0, "column_meta": [...], "data": [[...], [...], ...], "rows": n}}
+
+Instead of parsing the whole body into python objects, `iter_tddata_chunks` reads the body
+piece by piece, decodes the rows one at a time and copies every `chunk_rows` of them into
+typed numpy columns, so only one chunk of python rows is alive at any time.
+"""
+import codecs
+import json
+import re
+
+from onequant.api.output import convert
+from onequant.api.wrapper import _td_column, _tddata_columns
+
+DEFAULT_CHUNK_ROWS = 100000
+# the header before the rows is small, give up streaming if it is not found in the first MB
+_HEADER_LIMIT = 1 << 20
+
+_COLUMN_META_KEY = re.compile(r'"column_meta"\s*:\s*')
+_ROWS_KEY = re.compile(r'"data"\s*:\s*\[')
+_SEPARATOR = re.compile(r'[\s,]*')
+_decoder = json.JSONDecoder()
+
+
+def _checked_columns(document):
+    """Decodes a whole TDengine response, raising if its outer or TDengine code is an error."""
+    data, code = _tddata_columns(document)
+    if data is None or code != 200:
+        raise Exception(f'An error occurred while retrieving tdegine data! code is {code}')
+    return data
+
+
+class _TextReader:
+    """Decodes an iterable of utf-8 byte pieces into a text buffer filled on demand."""
+
+    def __init__(self, pieces):
+        self._pieces = iter(pieces)
+        self._decoder = codecs.getincrementaldecoder('utf-8')()
+        self.buf = ''
+
+    def fill(self, pos=0):
+        """Drops the first `pos` characters of the buffer and appends the next piece.
+
+        Returns:
+            bool: False if the body is exhausted.
+        """
+        self.buf = self.buf[pos:]
+        for piece in self._pieces:
+            text = self._decoder.decode(piece) if isinstance(piece, bytes) else piece
+            if text:
+                self.buf += text
+                return True
+        self.buf += self._decoder.decode(b'', final=True)
+        return False
+
+    def read_all(self, pos=0):
+        """Returns the rest of the body from `pos` of the buffer."""
+        texts = [self.buf[pos:]]
+        for piece in self._pieces:
+            texts.append(self._decoder.decode(piece) if isinstance(piece, bytes) else piece)
+        texts.append(self._decoder.decode(b'', final=True))
+        self.buf = ''.join(texts)
+        return self.buf
+
+
+def iter_tddata_chunks(pieces, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """Decodes a TDengine response incrementally.
+
+    Args:
+        pieces (iterable): The body of the response as bytes or str pieces, e.g. `response.iter_content()`.
+        chunk_rows (int, optional): The maximum number of rows of each chunk. Defaults to 100000.
+
+    Raises:
+        Exception: If the response has an error code.
+
+    Yields:
+        dict: The columns of the next chunk of rows as numpy arrays keyed by column name.
+    """
+    reader = _TextReader(pieces)
+
+    # locate column_meta and the start of the rows array
+    column_meta = None
+    meta_end = rows_start = None
+    while rows_start is None:
+        if column_meta is None:
+            match = _COLUMN_META_KEY.search(reader.buf)
+            if match:
+                try:
+                    column_meta, meta_end = _decoder.raw_decode(reader.buf, match.end())
+                except json.JSONDecodeError:
+                    pass
+        if column_meta is not None:
+            match = _ROWS_KEY.search(reader.buf, meta_end)
+            if match:
+                rows_start = match.end()
+                break
+        if len(reader.buf) > _HEADER_LIMIT or not reader.fill():
+            # not a TDengine result (or an unexpected key order), decode it as a whole
+            yield _checked_columns(json.loads(reader.read_all()))
+            return
+
+    prefix = reader.buf[:rows_start]
+    names = [meta[0] for meta in column_meta]
+    types = [meta[1] for meta in column_meta]
+
+    rows = []
+    yielded = False
+    pos = rows_start
+    while True:
+        pos = _SEPARATOR.match(reader.buf, pos).end()
+        if pos == len(reader.buf):
+            if not reader.fill(pos):
+                raise Exception('Truncated TDengine response')
+            pos = 0
+            continue
+        if reader.buf[pos] == ']':
+            break
+        try:
+            row, pos = _decoder.raw_decode(reader.buf, pos)
+        except json.JSONDecodeError:
+            if not reader.fill(pos):
+                raise
+            pos = 0
+            continue
+        rows.append(row)
+        if len(rows) == chunk_rows:
+            yield _rows_to_columns(rows, names, types)
+            rows = []
+            yielded = True
+
+    # the document without its rows tells the codes of the response
+    _checked_columns(json.loads(prefix + reader.read_all(pos)))
+    if rows or not yielded:
+        yield _rows_to_columns(rows, names, types)
+
+
+def _rows_to_columns(rows, names, types):
+    """Copies a chunk of rows to typed numpy columns."""
+    columns = zip(*rows) if rows else [()] * len(names)
+    return {name: _td_column(values, td_type) for name, td_type, values in zip(names, types, columns)}
+
+
+def _measured_chunks(api, pieces, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """Decodes a TDengine response body, observing the decode phase in the metrics of the api if they are on."""
+    chunks = iter_tddata_chunks(pieces, chunk_rows=chunk_rows)
+    return chunks if api.metrics is None else api.metrics.decoded(chunks)
+
+
+def _columns_pd(columns):
+    """Wraps decoded columns in a pandas DataFrame without copying them."""
+    import pandas as pd
+
+    return pd.DataFrame(columns, copy=False)
+
+
+def _columns_output(columns, output='pandas'):
+    """Returns decoded columns in an output backend, a DataFrame or the columns themselves are not copied."""
+    return _columns_pd(columns) if output == 'pandas' else convert(columns, output)
+
+
+def concat_chunks(chunks):
+    """Concatenates column chunks into one dict of columns.
+
+    The columns are joined one at a time and the chunks are released as they are consumed,
+    so the peak memory stays close to the size of the result.
+
+    Args:
+        chunks (iterable): The dicts of columns yielded by `iter_tddata_chunks`.
+
+    Returns:
+        dict: The joined columns keyed by column name.
+    """
+    import numpy as np
+
+    chunks = list(chunks)
+    if len(chunks) == 1:
+        return chunks[0]
+    columns = {}
+    for name in list(chunks[0]):
+        columns[name] = np.concatenate([chunk.pop(name) for chunk in chunks])
+    return columns
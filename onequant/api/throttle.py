@@ -0,0 +1,223 @@
+"""Client-side throttling of the requests sent to the API server.
+
+`RateLimiter` is a token bucket capping the request rate. `AdaptiveConcurrency` caps the number of
+requests in flight with an AIMD rule: the limit grows by one every `limit` healthy responses and is
+halved on an error code, a failed request or a latency spike, at most once per round trip.
+
+`ApiRequest` uses both, so every bulk helper fetching with a thread pool backs off as soon as the
+server struggles:
+
+    api = ApiRequest(url, pool_size=32, rate_limit=50)  # at most 50 requests/s, up to 32 in flight
+"""
+import threading
+import time
+
+
+class RateLimiter:
+    """Thread-safe token bucket: `rate` requests per second with bursts of up to `burst` requests."""
+
+    def __init__(self, rate, burst=None):
+        """Initializes the RateLimiter.
+
+        Args:
+            rate (float): The number of requests allowed per second.
+            burst (int, optional): The number of requests allowed at once after a quiet period.
+                Defaults to max(1, rate).
+        """
+        self.rate = float(rate)
+        self.burst = max(1.0, self.rate) if burst is None else float(burst)
+        self.waits = 0
+        self.waited = 0.0
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Takes a token, waiting until one is available.
+
+        Returns:
+            float: The seconds waited.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            # the token is taken right away, a negative balance queues the callers in order
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+            if wait:
+                self.waits += 1
+                self.waited += wait
+        if wait:
+            time.sleep(wait)
+        return wait
+
+    def stats(self):
+        """Returns the number of requests that waited and the total seconds waited.
+
+        Returns:
+            dict: The rate, the burst, the waits and the seconds waited.
+        """
+        with self._lock:
+            return {'rate': self.rate, 'burst': self.burst, 'waits': self.waits, 'waited': self.waited}
+
+
+class _Outcome:
+    """The result of a request, reported to `AdaptiveConcurrency` when its slot is released."""
+
+    __slots__ = ('ok', 'latency')
+
+    def __init__(self):
+        self.ok = False
+        self.latency = None
+
+    def report(self, response, result=None):
+        """Records whether a response is healthy and how long the server took to answer.
+
+        Args:
+            response (requests.Response): The response.
+            result (optional): The decoded json response, its code must be 200.
+        """
+        self.ok = response.status_code < 400 and not (isinstance(result, dict) and result.get('code', 200) != 200)
+        self.latency = response.elapsed.total_seconds()
+
+
+class _Slot:
+    """Context manager holding a slot of an `AdaptiveConcurrency` for one request."""
+
+    __slots__ = ('limiter', 'outcome', 'started')
+
+    def __init__(self, limiter):
+        self.limiter = limiter
+        self.outcome = _Outcome()
+        self.started = None
+
+    def __enter__(self):
+        """Waits for a free slot."""
+        self.limiter.acquire()
+        self.started = time.monotonic()
+        return self.outcome
+
+    def __exit__(self, *exc):
+        """Releases the slot, reporting the outcome of the request."""
+        outcome = self.outcome
+        latency = time.monotonic() - self.started if outcome.latency is None else outcome.latency
+        self.limiter.release(outcome.ok, latency)
+        return False
+
+
+class _NoSlot:
+    """Stand-in for `_Slot` when adaptive concurrency is off."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        """Returns an outcome ignoring reports."""
+        return self
+
+    def __exit__(self, *exc):
+        """Does nothing."""
+        return False
+
+    def report(self, response, result=None):
+        """Ignores the outcome."""
+
+
+NO_SLOT = _NoSlot()
+
+
+class AdaptiveConcurrency:
+    """Limits the requests in flight, adapting the limit with additive increase, multiplicative decrease.
+
+    A response is healthy if its HTTP status is below 400, its code is 200 and the server answered in
+    less than `latency_factor` times the moving average of the latencies (and `min_spike`).
+    """
+
+    def __init__(self, maximum, minimum=1, initial=None, backoff=0.5, latency_factor=4.0, min_spike=0.1, smoothing=0.1):
+        """Initializes the AdaptiveConcurrency.
+
+        Args:
+            maximum (int): The highest limit, e.g. the size of the connection pool.
+            minimum (int, optional): The lowest limit. Defaults to 1.
+            initial (int, optional): The limit to start with. Defaults to maximum.
+            backoff (float, optional): The factor applied to the limit after an unhealthy response. Defaults to 0.5.
+            latency_factor (float, optional): How many times the average latency makes a spike. Defaults to 4.0.
+            min_spike (float, optional): The shortest latency in seconds counted as a spike, so that the jitter
+                of a fast server is not. Defaults to 0.1.
+            smoothing (float, optional): The weight of a new latency in the moving average. Defaults to 0.1.
+        """
+        self.maximum = maximum
+        self.minimum = minimum
+        self.limit = float(maximum if initial is None else initial)
+        self.backoff = backoff
+        self.latency_factor = latency_factor
+        self.min_spike = min_spike
+        self.smoothing = smoothing
+        self.in_flight = 0
+        self.latency = None
+        self.increases = 0
+        self.decreases = 0
+        self._decreased_at = 0.0
+        self._cond = threading.Condition()
+
+    def slot(self):
+        """Returns a context manager holding a slot for one request.
+
+        The context gives an outcome whose `report(response, result)` must be called once the
+        response is received, a request that raises or never reports counts as unhealthy.
+
+        Returns:
+            _Slot: The context manager.
+        """
+        return _Slot(self)
+
+    def acquire(self):
+        """Waits until fewer requests than the limit are in flight and takes a slot."""
+        with self._cond:
+            while self.in_flight >= int(self.limit):
+                self._cond.wait()
+            self.in_flight += 1
+
+    def release(self, ok, latency):
+        """Releases a slot and adapts the limit to the outcome of its request.
+
+        Args:
+            ok (bool): Whether the response was healthy.
+            latency (float): The seconds the server took to answer.
+        """
+        with self._cond:
+            self.in_flight -= 1
+            spike = self.latency is not None and latency > max(self.latency * self.latency_factor, self.min_spike)
+            if ok:
+                # spikes are averaged too, so the limit recovers once the server is durably slower
+                self.latency = (
+                    latency if self.latency is None else self.latency + self.smoothing * (latency - self.latency)
+                )
+            if ok and not spike:
+                if self.limit < self.maximum:
+                    self.limit = min(self.maximum, self.limit + 1 / self.limit)
+                    self.increases += 1
+            else:
+                now = time.monotonic()
+                # the requests of one round trip fail together, back off once for all of them
+                if now - self._decreased_at > (self.latency or latency):
+                    self.limit = max(self.minimum, self.limit * self.backoff)
+                    self.decreases += 1
+                    self._decreased_at = now
+            self._cond.notify_all()
+
+    def stats(self):
+        """Returns the state of the limiter.
+
+        Returns:
+            dict: The current limit, the requests in flight, the average latency and the number of
+            increases and decreases of the limit.
+        """
+        with self._cond:
+            return {
+                'limit': int(self.limit),
+                'in_flight': self.in_flight,
+                'latency': self.latency,
+                'increases': self.increases,
+                'decreases': self.decreases,
+            }
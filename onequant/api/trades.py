@@ -1,21 +1,33 @@
 """Get trades information from server."""
+import datetime
+import functools
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from onequant.api.output import check_output
+from onequant.api.poller import RecordPoller
 from onequant.api.wrapper import _pd
 
+SNAPSHOT_TABLES = ('account', 'position', 'orders', 'unfill_orders', 'rsptrades')
+
 
 class OqTrades:
     """Api for get trades information from server."""
 
-    def __init__(self, wrapper=None):
+    def __init__(self, wrapper=None, output='pandas'):
         """Initializes the OqTrades class.
 
         Args:
             wrapper: An object that wraps the OneQuant API.
+            output: The backend of the data returned, 'pandas', 'numpy', 'columns' or 'arrow',
+                see `onequant.api.output`.
 
         Returns:
             None.
         """
         self.api = wrapper.api
         self.username = wrapper.username
+        self.output = check_output(output)
 
     def _query(self, router=None, params=None):
         """Sends a GET request to the OneQuant API.
@@ -199,3 +211,53 @@ class OqTrades:
         """
         params = {'user': self.username}
         return self._query_pd('/trade/accFollow/query', params)
+
+    def _snapshot_methods(self, virtual):
+        """Returns the methods fetching the tables of a snapshot, keyed by table name."""
+        return {name: getattr(self, name + '_virtual' if virtual else name) for name in SNAPSHOT_TABLES}
+
+    def snapshot(self, virtual=False):
+        """Fetches the account, positions, orders, unfilled orders and trades concurrently.
+
+        The five requests are sent at once by at most `pool_size` threads of the api, so the tables
+        are captured at nearly the same time.
+
+        Args:
+            virtual: Fetch the tables of the virtual account.
+
+        Returns:
+            A dict of the tables keyed by `SNAPSHOT_TABLES`, with the datetime the requests were sent
+            at under 'ts' and the seconds they took under 'elapsed'.
+        """
+        methods = self._snapshot_methods(virtual)
+        ts, started = datetime.datetime.now(), time.monotonic()
+        with ThreadPoolExecutor(max_workers=max(1, min(self.api.pool_size, len(methods)))) as pool:
+            futures = {name: pool.submit(method) for name, method in methods.items()}
+            tables = {name: future.result() for name, future in futures.items()}
+        return dict(tables, ts=ts, elapsed=time.monotonic() - started)
+
+    def order_poller(self, key, virtual=False):
+        """Returns a poller of the orders returning only the orders new or changed since its last poll.
+
+        Args:
+            key: The column, or columns, identifying an order.
+            virtual: Poll the orders of the virtual account.
+
+        Returns:
+            A RecordPoller of pandas DataFrames.
+        """
+        params = {'is_virtual': int(virtual)}
+        return RecordPoller(functools.partial(self._query_pd, '/trade/order/query', params, output='pandas'), key)
+
+    def rsptrade_poller(self, key, virtual=False):
+        """Returns a poller of the trades returning only the trades new or changed since its last poll.
+
+        Args:
+            key: The column, or columns, identifying a trade.
+            virtual: Poll the trades of the virtual account.
+
+        Returns:
+            A RecordPoller of pandas DataFrames.
+        """
+        params = {'is_virtual': int(virtual)}
+        return RecordPoller(functools.partial(self._query_pd, '/trade/rsptrade/query', params, output='pandas'), key)
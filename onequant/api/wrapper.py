@@ -1,4 +1,13 @@
 """Decorator to convert the data returned by the API to a list."""
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from onequant.api.output import check_output, convert, num_rows
+
+PAGE_SIZE = 10000
+PAGE_RETRIES = 2
+PAGE_RETRY_DELAY = 0.5
 
 
 def tddata_2_list(func):
@@ -12,23 +21,138 @@ def tddata_2_list(func):
     """
 
     def wrapper(self, *args, **kwargs):
-        data = func(self, *args, **kwargs)
-        if data is None or data['data'] is None:
-            return None, 400
-        if data['data']['code'] != 0:
-            return None, data['code']
-        column_meta = data['data']['column_meta']
-        data_list = data['data']['data']
-        result = list(map(lambda row: {column_meta[i][0]: row[i] for i in range(len(column_meta))}, data_list))
-        return result, data['code']
+        return _measured(self.api, 'decode', _tddata_rows, func(self, *args, **kwargs))
+
+    return wrapper
+
+
+def _tddata_rows(data):
+    """Converts a TDengine response to a list of row dicts.
+
+    Args:
+        data (dict): The json response of the API.
+
+    Returns:
+        tuple: The list of rows and the code of the response.
+    """
+    if data is None or data['data'] is None:
+        return None, 400
+    if data['data']['code'] != 0:
+        return None, data['code']
+    column_meta = data['data']['column_meta']
+    data_list = data['data']['data']
+    result = list(map(lambda row: {column_meta[i][0]: row[i] for i in range(len(column_meta))}, data_list))
+    return result, data['code']
+
+
+# numpy dtypes of the TDengine column types, by name (REST api 3.x) and by type code (REST api 2.x).
+# FLOAT columns arrive as json doubles, so they are kept as float64 like the row path does.
+_TD_DTYPES = {
+    'BOOL': 'bool',
+    'TINYINT': 'int8',
+    'SMALLINT': 'int16',
+    'INT': 'int32',
+    'BIGINT': 'int64',
+    'FLOAT': 'float64',
+    'DOUBLE': 'float64',
+    'TIMESTAMP': 'datetime64[ms]',
+    'TINYINT UNSIGNED': 'uint8',
+    'SMALLINT UNSIGNED': 'uint16',
+    'INT UNSIGNED': 'uint32',
+    'BIGINT UNSIGNED': 'uint64',
+    1: 'bool',
+    2: 'int8',
+    3: 'int16',
+    4: 'int32',
+    5: 'int64',
+    6: 'float64',
+    7: 'float64',
+    9: 'datetime64[ms]',
+    11: 'uint8',
+    12: 'uint16',
+    13: 'uint32',
+    14: 'uint64',
+}
+
+
+def tddata_2_columns(func):
+    """Decorator to convert the data returned by the API to a dict of numpy arrays.
+
+    Unlike `tddata_2_list` no per-row dict is built: every column is copied once from the
+    rows into an array of the numpy dtype matching its TDengine type.
+
+    Args:
+        func: The function to be decorated
+
+    Returns:
+        A wrapper function that converts the data to a dict of columns
+    """
+
+    def wrapper(self, *args, **kwargs):
+        return _measured(self.api, 'decode', _tddata_columns, func(self, *args, **kwargs))
 
     return wrapper
 
 
+def _tddata_columns(data):
+    """Converts a TDengine response to a dict of numpy arrays keyed by column name.
+
+    Args:
+        data (dict): The json response of the API.
+
+    Returns:
+        tuple: The dict of columns and the code of the response.
+    """
+    if data is None or data['data'] is None:
+        return None, 400
+    if data['data']['code'] != 0:
+        return None, data['code']
+    column_meta = data['data']['column_meta']
+    data_list = data['data']['data']
+    columns = zip(*data_list) if data_list else [()] * len(column_meta)
+    result = {meta[0]: _td_column(values, meta[1]) for meta, values in zip(column_meta, columns)}
+    return result, data['code']
+
+
+def _td_column(values, td_type):
+    """Copies the values of one TDengine column to a numpy array.
+
+    Args:
+        values (tuple): The values of the column.
+        td_type (str or int): The TDengine type of the column.
+
+    Returns:
+        numpy.ndarray: The column, NULL values become NaN or NaT.
+    """
+    import numpy as np
+
+    dtype = _TD_DTYPES.get(td_type)
+    if dtype == 'datetime64[ms]':
+        first = values[0] if values else None
+        if isinstance(first, str) and (first.endswith('Z') or '+' in first or first.count('-') > 2):
+            # RFC 3339 timestamps with a utc offset, keep their wall time like `tz_localize(None)` does
+            import pandas as pd
+
+            return pd.to_datetime(list(values)).tz_localize(None).to_numpy(dtype=dtype)
+        return np.array(values, dtype=dtype)
+    if dtype is not None and not (dtype == 'bool' and None in values):
+        try:
+            return np.array(values, dtype=dtype)
+        except TypeError:
+            # NULL in an integer column
+            return np.array(values, dtype='float64')
+    column = np.empty(len(values), dtype=object)
+    column[:] = values
+    return column
+
+
 # Decorator to convert the data returned by the API to a pandas DataFrame
 def _pd(func):
     """Decorator to convert the data returned by the API to a pandas DataFrame.
 
+    The decorated function takes an `output` keyword selecting another backend of
+    `onequant.api.output`, it defaults to the `output` of the Oq* object.
+
     Args:
         func: The function to be decorated
 
@@ -36,20 +160,61 @@ def _pd(func):
         A wrapper function that converts the data to a pandas DataFrame
     """
 
-    def convert(self, *args, **kwargs):
-        import pandas as pd
+    def wrapper(self, *args, output=None, **kwargs):
+        return _measured(self.api, 'frame', _to_output, *func(self, *args, **kwargs), output or self.output)
+
+    return wrapper
+
+
+def _measured(api, phase, convert, *args):
+    """Calls a conversion, observing its duration in a phase of the metrics of the api if they are on.
 
-        data, code = func(self, *args, **kwargs)
-        if code != 200:
-            raise Exception(f'An error occurred while retrieving tdegine data! code is {code}')
-        return pd.DataFrame(data)
+    Args:
+        api: The api the data was fetched with.
+        phase (str): The phase of the conversion, 'decode' or 'frame'.
+        convert: The conversion.
+        *args: The arguments of the conversion.
 
-    return convert
+    Returns:
+        The result of the conversion, the rows of a 'frame' are counted.
+    """
+    metrics = api.metrics
+    if metrics is None:
+        return convert(*args)
+    started = time.perf_counter()
+    result = convert(*args)
+    metrics.observe(phase, time.perf_counter() - started)
+    if phase == 'frame':
+        metrics.add_rows(num_rows(result))
+    return result
+
+
+def _to_output(data, code, output='pandas'):
+    """Converts decoded data to an output backend.
+
+    Args:
+        data: The decoded data.
+        code (int): The code of the response.
+        output (str, optional): One of `onequant.api.output.OUTPUTS`. Defaults to 'pandas'.
+
+    Raises:
+        Exception: If the code is not 200.
+
+    Returns:
+        The data in the requested backend.
+    """
+    if code != 200:
+        raise Exception(f'An error occurred while retrieving tdegine data! code is {code}')
+    return convert(data, output)
 
 
 def _pagination(func):
     """Decorator to handle pagination of API data.
 
+    The first page tells the number of pages, the remaining pages are fetched concurrently
+    by at most `pool_size` threads of the api and joined back in page order. A failed page
+    is retried `PAGE_RETRIES` times before a `PaginationError` is raised.
+
     Args:
         func: The function to be decorated
 
@@ -58,26 +223,134 @@ def _pagination(func):
     """
 
     def wrapper(self, *args, **kwargs):
-        kwargs['params']['current'] = 1
-        kwargs['params']['pageSize'] = 10000
+        params = kwargs.get('params') or {}
+        kwargs['params'] = dict(params, current=1, pageSize=PAGE_SIZE)
         data = func(self, *args, **kwargs)
 
-        if 'total' in data and 'pageSize' in data:
-            total = data['total']
-            page_size = data['pageSize']
+        num_pages, page_size = _page_count(data)
+        if num_pages > 1:
 
-            num_pages = (total + page_size - 1) // page_size
+            def fetch(page):
+                page_kwargs = dict(kwargs, params=dict(params, current=page, pageSize=page_size))
+                error = None
+                for attempt in range(PAGE_RETRIES + 1):
+                    if attempt:
+                        time.sleep(PAGE_RETRY_DELAY * 2 ** (attempt - 1))
+                    try:
+                        page_data = func(self, *args, **page_kwargs)
+                    except Exception as e:
+                        error = e
+                        continue
+                    if page_data['code'] == 200:
+                        return page_data['data'], None
+                    error = page_data['code']
+                return None, error
 
-            for page in range(2, num_pages + 1):
-                if 'params' in kwargs:
-                    kwargs['params']['current'] = page
-                    kwargs['params']['pageSize'] = page_size
-                page_data = func(self, *args, **kwargs)
-                if page_data['code'] != 200:
-                    print(f'Error: {page}')
-                    continue
-                data['data'].extend(page_data['data'])
+            pages = range(2, num_pages + 1)
+            with ThreadPoolExecutor(max_workers=min(self.api.pool_size, len(pages))) as pool:
+                results = list(pool.map(fetch, pages))
+            _join_pages(data, pages, results)
 
         return data['data'], data['code']
 
     return wrapper
+
+
+class PaginationError(Exception):
+    """Raised when some pages of a paginated query still fail after retrying.
+
+    Attributes:
+        failed (dict): The error code or exception of the last attempt of every failed page.
+        data (list): The rows of all pages that were fetched.
+    """
+
+    def __init__(self, failed, data):
+        """Initializes the PaginationError with the failed pages and the partial data."""
+        super().__init__(f'Failed to fetch pages {sorted(failed)}: {failed}')
+        self.failed = failed
+        self.data = data
+
+
+def _page_count(data):
+    """Returns the number of pages and the page size of the first page of a paginated response."""
+    if 'total' in data and 'pageSize' in data:
+        page_size = data['pageSize']
+        return (data['total'] + page_size - 1) // page_size, page_size
+    return 1, None
+
+
+def _join_pages(data, pages, results):
+    """Appends the rows of the pages to the first page in page order.
+
+    Args:
+        data (dict): The response of the first page.
+        pages (iterable): The numbers of the remaining pages.
+        results (list): The (rows, error) tuples of the remaining pages.
+
+    Raises:
+        PaginationError: If any page failed.
+    """
+    failed = {}
+    for page, (rows, error) in zip(pages, results):
+        if rows is None:
+            failed[page] = error
+        else:
+            data['data'].extend(rows)
+    if failed:
+        raise PaginationError(failed, data['data'])
+
+
+def _cached(func):
+    """Decorator to serve the results of slow-changing routers from the cache of the api.
+
+    Nothing is cached unless an `ApiCache` is set on the api and has a TTL for the router.
+
+    Args:
+        func: The function to be decorated
+
+    Returns:
+        A wrapper function that looks up the cache before calling the function
+    """
+
+    def wrapper(self, *args, **kwargs):
+        cache = self.api.cache
+        router = kwargs.get('router')
+        if cache is None or not cache.caches(router):
+            return func(self, *args, **kwargs)
+        params = kwargs.get('params')
+        output = check_output(kwargs.get('output') or self.output)
+        if output != 'pandas':
+            # the results of other backends are cached apart from the DataFrames
+            params = dict(params or {}, output=output)
+        result = cache.get(router, params)
+        if result is None:
+            result = func(self, *args, **kwargs)
+            cache.set(router, params, result)
+        return result
+
+    return wrapper
+
+
+def _single_flight(func):
+    """Decorator to share one call between the threads querying the same data at the same time.
+
+    Concurrent calls with the same arguments wait for the first one and get a copy of its result.
+    Nothing is shared unless the api has a `SingleFlight`.
+
+    Args:
+        func: The function to be decorated
+
+    Returns:
+        A wrapper function that coalesces concurrent identical calls
+    """
+
+    def wrapper(self, *args, **kwargs):
+        flights = self.api.flights
+        if flights is None:
+            return func(self, *args, **kwargs)
+        # the output of the object is part of the key, objects of several outputs may share the api
+        output = kwargs.get('output') or self.output
+        key = (func.__qualname__, output, json.dumps([args, kwargs], sort_keys=True, default=str))
+        return flights.do(key, lambda: func(self, *args, **kwargs))
+
+    return wrapper
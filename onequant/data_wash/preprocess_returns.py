@@ -7,8 +7,8 @@ import pandas as pd
 def fill_date(
     strategy_id=None,
     data=None,
-    need_start=pd.Timestamp('2015-01-01', tz='UTC'),
-    need_end=pd.Timestamp.now(tz='UTC'),
+    need_start=None,
+    need_end=None,
     time_column='ts',
     netvalue_column='net_value',
 ):
@@ -17,14 +17,18 @@ def fill_date(
     Args:
         strategy_id (int): The ID of the strategy.
         data (pandas.DataFrame): The DataFrame to fill missing dates in.
-        need_start (pandas.Timestamp): The start date to fill missing dates from.
-        need_end (pandas.Timestamp): The end date to fill missing dates to.
+        need_start (pandas.Timestamp): The start date to fill missing dates from. Defaults to 2015-01-01 UTC.
+        need_end (pandas.Timestamp): The end date to fill missing dates to. Defaults to the current time.
         time_column (str): The name of the column containing the timestamps.
         netvalue_column (str): The name of the column containing the net values.
 
     Returns:
         pandas.DataFrame: The DataFrame with missing dates filled in.
     """
+    if need_start is None:
+        need_start = pd.Timestamp('2015-01-01', tz='UTC')
+    if need_end is None:
+        need_end = pd.Timestamp.now(tz='UTC')
 
     def _fill_date(data, start, end, fill_data, is_pre=False, freq=None):
         """Fills missing dates in a pandas DataFrame with specified values.
@@ -180,8 +184,6 @@ def filter_returns_by_corr(corr, cutoff=0.9, exact=None):
 
 
 if __name__ == '__main__':
-    import pandas as pd
-
     # create a date range from '2022-01-01' to '2023-01-01'
     dates = pd.date_range(start='2022-01-01', end='2023-01-01', freq='D')
     # create a dataframe with a date index and a constant net value of 1 for each day
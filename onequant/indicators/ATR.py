@@ -0,0 +1,52 @@
+"""Average True Range - ATR indicator."""
+import numpy as np
+
+from onequant.indicators.base import Indicator
+from onequant.indicators.rolling import RollingSum, rolling_sum
+
+
+class ATR(Indicator):
+    """Average True Range - ATR indicator, the mean true range of the last n bars.
+
+    The true range is the largest of high - low and the distances of the high and low to the
+    previous close, high - low for the first bar.
+    """
+
+    PARAMS = ('n',)
+    INPUTS = ('high', 'low', 'close')
+    OUTPUTS = ('ATR',)
+    STATE = ('last_close', 'sum')
+
+    def __init__(self, n=14):
+        """Initialize ATR indicator with default parameters."""
+        self.n = n
+        self.last_close = None
+        self.sum = RollingSum(n)
+
+    @property
+    def count(self):
+        """Returns the number of bars seen."""
+        return self.sum.count
+
+    def update(self, high, low, close):
+        """Calculate the ATR value for the given high, low and close prices, NaN for the first n - 1 bars."""
+        true_range = high - low
+        if self.last_close is not None:
+            true_range = max(true_range, abs(high - self.last_close), abs(low - self.last_close))
+        self.last_close = close
+        total = self.sum.update(true_range)
+        return total / self.n if total is not None else float('nan')
+
+    def _compute(self, high, low, close):
+        """Returns the ATR array of high, low and close series and the state after their last bar."""
+        high, low, close = (np.asarray(values, dtype='float64') for values in (high, low, close))
+        true_range = high - low
+        previous = close[:-1]
+        true_range[1:] = np.maximum(np.maximum(true_range[1:], np.abs(high[1:] - previous)), np.abs(low[1:] - previous))
+        sums = rolling_sum(true_range, self.n)
+        atr = np.full(len(close), np.nan)
+        atr[self.n - 1 :] = sums / self.n
+        state = ATR(self.n)
+        state.sum.warm(true_range, sums)
+        state.last_close = float(close[-1]) if len(close) else None
+        return atr, state.get_state()
@@ -0,0 +1,64 @@
+"""Bollinger Bands - BOLL indicator."""
+import math
+
+import numpy as np
+
+from onequant.indicators.base import Indicator
+from onequant.indicators.rolling import RollingMoments, RollingSum, rolling_moments, rolling_sum
+
+
+class BOLL(Indicator):
+    """Bollinger Bands - BOLL indicator.
+
+    BOLL is the mean of the last n closes, UB and LB are k sample standard deviations above and
+    below it. The variance comes from the rolling sums of the deviations of the closes from an
+    anchor inside the window and of their squares, which stay accurate at any price level.
+    """
+
+    PARAMS = ('n', 'k')
+    OUTPUTS = ('BOLL', 'UB', 'LB')
+    STATE = ('sum', 'moments')
+
+    def __init__(self, n=20, k=2):
+        """Initialize BOLL indicator with default parameters."""
+        assert n > 1, 'BOLL needs n > 1'
+        self.n = n
+        self.k = k
+        self.sum = RollingSum(n)
+        self.moments = RollingMoments(n)
+
+    @property
+    def count(self):
+        """Returns the number of bars seen."""
+        return self.sum.count
+
+    def update(self, close):
+        """Calculate the BOLL, UB and LB values for the given close price, NaN for the first n - 1 bars."""
+        total = self.sum.update(close)
+        moments = self.moments.update(close)
+        if total is None:
+            return float('nan'), float('nan'), float('nan')
+
+        mid = total / self.n
+        deviations, squares = moments
+        variance = (squares - deviations * deviations / self.n) / (self.n - 1)
+        # rounding can still make the variance of a nearly flat window slightly negative
+        std = math.sqrt(variance) if variance > 0 else 0.0
+        return mid, mid + self.k * std, mid - self.k * std
+
+    def _compute(self, close):
+        """Returns the BOLL, UB and LB arrays of a close series and the state after its last bar."""
+        close = np.asarray(close, dtype='float64')
+        sums = rolling_sum(close, self.n)
+        moments = rolling_moments(close, self.n)
+        deviations, squares, _ = moments
+        variance = (squares - deviations * deviations / self.n) / (self.n - 1)
+        std = np.sqrt(np.where(variance > 0, variance, 0.0))
+        mid, upper, lower = (np.full(len(close), np.nan) for _ in range(3))
+        mid[self.n - 1 :] = sums / self.n
+        upper[self.n - 1 :] = mid[self.n - 1 :] + self.k * std
+        lower[self.n - 1 :] = mid[self.n - 1 :] - self.k * std
+        state = BOLL(self.n, self.k)
+        state.sum.warm(close, sums)
+        state.moments.warm(close, moments)
+        return (mid, upper, lower), state.get_state()
@@ -0,0 +1,43 @@
+"""Exponential Moving Average - EMA indicator."""
+import numpy as np
+
+from onequant.indicators.base import Indicator
+
+
+def _ema(values, n, ema=None):
+    """Returns the EMA array of a series and its last value, continuing from ema if given.
+
+    The first value starts the average, then EMA = (2 * X + (n - 1) * EMA') / (n + 1), each value
+    depending on the previous one so it runs as a plain loop over floats, the same operations as
+    `EMA.update`.
+    """
+    result = []
+    for value in values.tolist():
+        ema = value if ema is None else (2 * value + (n - 1) * ema) / (n + 1)
+        result.append(ema)
+    return np.array(result, dtype='float64'), ema
+
+
+class EMA(Indicator):
+    """Exponential Moving Average - EMA indicator."""
+
+    PARAMS = ('n',)
+    OUTPUTS = ('EMA',)
+    STATE = ('count', 'ema')
+
+    def __init__(self, n=12):
+        """Initialize EMA indicator with default parameters."""
+        self.n = n
+        self.count = 0
+        self.ema = None
+
+    def update(self, close):
+        """Calculate the EMA value for the given close price."""
+        self.count += 1
+        self.ema = float(close) if self.ema is None else (2 * close + (self.n - 1) * self.ema) / (self.n + 1)
+        return self.ema
+
+    def _compute(self, close):
+        """Returns the EMA array of a close series and the state after its last bar."""
+        ema, last = _ema(np.asarray(close, dtype='float64'), self.n)
+        return ema, dict(self.params, count=len(ema), ema=last)
@@ -1,10 +1,21 @@
 """Stochastic Oscillator - KDJ indicator."""
+from collections import deque
+
+import numpy as np
 import pandas as pd
 
+from onequant.indicators.base import Indicator
+from onequant.indicators.rolling import rolling_max, rolling_min
+
 
-class KDJ:
+class KDJ(Indicator):
     """Stochastic Oscillator - KDJ indicator."""
 
+    PARAMS = ('n', 'm1', 'm2')
+    INPUTS = ('high', 'low', 'close')
+    OUTPUTS = ('K', 'D', 'J')
+    STATE = ('high_list', 'low_list', 'rsv_list', 'k_list', 'd_list', 'j_list')
+
     def __init__(self, n=9, m1=3, m2=3):
         """Initialize KDJ indicator with default parameters."""
         self.n = n
@@ -51,14 +62,261 @@ class KDJ:
 
         return round(k, 2), round(d, 2), round(j, 2)
 
-    def apply_to_df(self, df, suffix=''):
-        """Apply KDJ calculation to a DataFrame and return it with K, D, J columns added."""
-        df[['K' + suffix, 'D' + suffix, 'J' + suffix]] = df.apply(
-            lambda x: pd.Series(self.calcKDJ(x['high'], x['low'], x['close'])), axis=1
+    def update(self, high, low, close):
+        """Calculate the KDJ values for a new bar, see `calcKDJ`."""
+        return self.calcKDJ(high, low, close)
+
+    def compute(self, high, low, close):
+        """Calculate the KDJ values of whole high, low and close series at once.
+
+        The result is the one of calling `calcKDJ` on every bar of a new KDJ, warm-up and rounding
+        included, but the highest highs and lowest lows are rolled in O(N) and only the K and D
+        smoothing runs bar by bar. The state of this object is left untouched.
+
+        Args:
+            high (array-like): The high prices.
+            low (array-like): The low prices.
+            close (array-like): The close prices.
+
+        Returns:
+            tuple: The K, D and J numpy arrays.
+        """
+        k, d, j, _ = self._values(high, low, close)
+        return _round2(k), _round2(d), _round2(j)
+
+    def _values(self, high, low, close):
+        """Returns the unrounded K, D and J arrays, 50 during the warm-up, and the RSV array of the full windows."""
+        rsv = _rsv(close, rolling_max(high, self.n), rolling_min(low, self.n), self.n)
+        first = self.n - 1 + max(self.m1 - 1, 0)
+        k = _smooth(rsv, self.m1, first)
+        d = _smooth(k, self.m2, first)
+        return k, d, 3 * k - 2 * d, rsv[self.n - 1 :]
+
+    def _compute(self, high, low, close):
+        """Returns the K, D and J arrays and the state calcKDJ would have after the last bar."""
+        k, d, j, rsv = self._values(high, low, close)
+        first = self.n - 1 + max(self.m1 - 1, 0)
+        state = dict(
+            self.params,
+            high_list=np.asarray(high)[-self.n :].tolist(),
+            low_list=np.asarray(low)[-self.n :].tolist(),
+            rsv_list=rsv[-self.m1 :].tolist() if self.m1 > 0 else [],
+            k_list=k[first:].tolist(),
+            d_list=d[first:].tolist(),
+            j_list=(3 * k[first:] - 2 * d[first:]).tolist(),
         )
+        return (_round2(k), _round2(d), _round2(j)), state
+
+    def apply_to_df(self, df, suffix=''):
+        """Apply KDJ calculation to a DataFrame and return it with K, D, J columns added.
+
+        A KDJ that has not seen any bar computes the columns at once with `apply`, then continues
+        from the last bar of the DataFrame like after calling `calcKDJ` on every row.
+        """
+        if self.high_list:
+            df[['K' + suffix, 'D' + suffix, 'J' + suffix]] = df.apply(
+                lambda x: pd.Series(self.calcKDJ(x['high'], x['low'], x['close'])), axis=1
+            )
+            return df
+
+        df['K' + suffix], df['D' + suffix], df['J' + suffix] = self.apply(df['high'], df['low'], df['close'])
         return df
 
 
+class StreamingKDJ(Indicator):
+    """KDJ indicator for long-running processes, with a fixed-size state and O(1) updates.
+
+    `calcKDJ` returns the values of `KDJ.calcKDJ`, but the highest high and lowest low of the window
+    come from monotonic deques of at most n bars and only the last K and D are kept, so memory and
+    update cost do not grow with the number of bars. `get_state` returns the whole state as a
+    JSON-serializable dict and `set_state` restores it, so a restarted process resumes where it stopped:
+
+        kdj = StreamingKDJ(43, 9, 3)
+        kdj.apply_to_df(history)
+        state = kdj.get_state()
+        ...
+        kdj = StreamingKDJ.from_state(state)
+        k, d, j = kdj.calcKDJ(high, low, close)
+    """
+
+    PARAMS = ('n', 'm1', 'm2')
+    INPUTS = ('high', 'low', 'close')
+    OUTPUTS = ('K', 'D', 'J')
+    STATE = ('count', 'rsv_count', 'highs', 'lows', 'k', 'd', 'j')
+
+    def __init__(self, n=9, m1=3, m2=3):
+        """Initialize the streaming KDJ indicator with default parameters."""
+        self.n = n
+        self.m1 = m1
+        self.m2 = m2
+        self.reset()
+
+    def reset(self):
+        """Forgets all the bars seen."""
+        # bars seen, RSV values computed, capped at m1 as only the warm-up depends on it
+        self.count = 0
+        self.rsv_count = 0
+        # (bar number, price) with decreasing highs and increasing lows, the front is the extreme of the window
+        self.highs = deque()
+        self.lows = deque()
+        self.k = None
+        self.d = None
+        self.j = None
+
+    def _push(self, high, low):
+        """Adds a bar to the window deques and drops the ones out of the window."""
+        index = self.count
+        self.count += 1
+        highs, lows = self.highs, self.lows
+        while highs and highs[-1][1] <= high:
+            highs.pop()
+        highs.append((index, high))
+        while lows and lows[-1][1] >= low:
+            lows.pop()
+        lows.append((index, low))
+        start = index - self.n + 1
+        if highs[0][0] < start:
+            highs.popleft()
+        if lows[0][0] < start:
+            lows.popleft()
+
+    def calcKDJ(self, high, low, close):
+        """Calculate the KDJ values for the given high, low, and close prices, see `KDJ.calcKDJ`."""
+        self._push(high, low)
+        if self.count < self.n:
+            return 50, 50, 50
+
+        highest_high = self.highs[0][1]
+        lowest_low = self.lows[0][1]
+        rsv = (close - lowest_low) / (highest_high - lowest_low) * 100 if (highest_high - lowest_low) != 0 else 50
+
+        if self.rsv_count < self.m1:
+            self.rsv_count += 1
+            if self.rsv_count < self.m1:
+                return 50, 50, 50
+
+        k = (self.k * (self.m1 - 1) + rsv) / self.m1 if self.k is not None else 50
+        d = (self.d * (self.m2 - 1) + k) / self.m2 if self.d is not None else 50
+        j = 3 * k - 2 * d
+        self.k, self.d, self.j = k, d, j
+
+        return round(k, 2), round(d, 2), round(j, 2)
+
+    def update(self, high, low, close):
+        """Calculate the KDJ values for a new bar, see `calcKDJ`."""
+        return self.calcKDJ(high, low, close)
+
+    def _compute(self, high, low, close):
+        """Returns the K, D and J arrays of `KDJ.compute` and the state after the last bar."""
+        high, low = np.asarray(high), np.asarray(low)
+        k, d, j, _ = KDJ(self.n, self.m1, self.m2)._values(high, low, close)
+
+        # replay the extremes of the last window, the RSV count and K/D carry follow from the bar count
+        size = len(k)
+        kdj = StreamingKDJ(self.n, self.m1, self.m2)
+        kdj.count = max(size - self.n, 0)
+        for bar_high, bar_low in zip(high[-self.n :].tolist(), low[-self.n :].tolist()):
+            kdj._push(bar_high, bar_low)
+        kdj.rsv_count = min(max(size - self.n + 1, 0), self.m1)
+        if size > self.n - 1 + max(self.m1 - 1, 0):
+            kdj.k, kdj.d, kdj.j = float(k[-1]), float(d[-1]), float(j[-1])
+        return (_round2(k), _round2(d), _round2(j)), kdj.get_state()
+
+
+def _rsv(close, highest_high, lowest_low, n):
+    """Returns the RSV of every bar, the one of calcKDJ from the n - 1 bar and 50 before.
+
+    Args:
+        close (array-like): The close prices, or a 2-D array of them as columns.
+        highest_high (numpy.ndarray): The highest high of every full window, see `rolling_max`.
+        lowest_low (numpy.ndarray): The lowest low of every full window, see `rolling_min`.
+        n (int): The window length.
+
+    Returns:
+        numpy.ndarray: The RSV values, of the shape of close.
+    """
+    close = np.asarray(close, dtype='float64')
+    rsv = np.full(close.shape, 50.0)
+    spread = highest_high - lowest_low
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rsv[n - 1 :] = np.where(spread != 0, (close[n - 1 :] - lowest_low) / spread * 100, 50.0)
+    return rsv
+
+
+def _smooth(values, m, first):
+    """Returns the K or D recurrence x = (x * (m - 1) + value) / m of calcKDJ, 50 up to the first bar.
+
+    It runs the same float operations as calcKDJ, in the same order, so the values are identical.
+    """
+    smoothed = np.full(len(values), 50.0)
+    result = []
+    value_prev = 50.0
+    for value in values[first + 1 :].tolist():
+        value_prev = (value_prev * (m - 1) + value) / m
+        result.append(value_prev)
+    smoothed[first + 1 :] = result
+    return smoothed
+
+
+def _smooth_columns(values, m, first):
+    """Returns the recurrences of `_smooth` of every column of a 2-D array, stepping all columns at once.
+
+    Args:
+        values (numpy.ndarray): The (bars, columns) values.
+        m (numpy.ndarray): The m of every column.
+        first (numpy.ndarray): The first bar of every column.
+
+    Returns:
+        numpy.ndarray: The (bars, columns) recurrences, equal to `_smooth` of every column.
+    """
+    size, columns = values.shape
+    if columns < 8:
+        # a numpy step costs more than the python one of a few columns
+        smoothed = np.empty((size, columns))
+        for column in range(columns):
+            smoothed[:, column] = _smooth(values[:, column], m[column], first[column])
+        return smoothed
+
+    # columns ordered by first bar, the ones running at a bar are then a prefix
+    order = np.argsort(first, kind='stable')
+    values = values[:, order]
+    m = np.asarray(m, dtype='float64')[order]
+    weight = m - 1
+    running = np.searchsorted(np.asarray(first)[order], np.arange(size), side='left')
+    smoothed = np.full((size, columns), 50.0)
+    state = np.full(columns, 50.0)
+    for bar in range(size):
+        count = running[bar]
+        if count == columns:
+            state *= weight
+            state += values[bar]
+            state /= m
+            smoothed[bar] = state
+        elif count:
+            part = state[:count]
+            part *= weight[:count]
+            part += values[bar, :count]
+            part /= m[:count]
+            smoothed[bar, :count] = part
+    result = np.empty_like(smoothed)
+    result[:, order] = smoothed
+    return result
+
+
+def _round2(values):
+    """Rounds to 2 decimals like the builtin round, which rounds the exact binary value half to even.
+
+    np.round rounds the value scaled by 100, which can differ from round when the scaled value lands
+    on a half, those few values are rounded by round itself.
+    """
+    rounded = np.round(values, 2)
+    scaled = values * 100
+    ties = np.flatnonzero(np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6)
+    if len(ties):
+        rounded.ravel()[ties] = [round(value, 2) for value in values.ravel()[ties].tolist()]
+    return rounded
+
+
 if __name__ == '__main__':
     # 读取CSV文件并转换为DataFrame
     df = pd.read_csv(r'E:\SC000_SAR.csv', index_col='DateTime')
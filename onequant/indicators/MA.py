@@ -0,0 +1,38 @@
+"""Moving Average - MA indicator."""
+import numpy as np
+
+from onequant.indicators.base import Indicator
+from onequant.indicators.rolling import RollingSum, rolling_sum
+
+
+class MA(Indicator):
+    """Moving Average - MA indicator, the mean of the last n closes."""
+
+    PARAMS = ('n',)
+    OUTPUTS = ('MA',)
+    STATE = ('sum',)
+
+    def __init__(self, n=5):
+        """Initialize MA indicator with default parameters."""
+        self.n = n
+        self.sum = RollingSum(n)
+
+    @property
+    def count(self):
+        """Returns the number of bars seen."""
+        return self.sum.count
+
+    def update(self, close):
+        """Calculate the MA value for the given close price, NaN for the first n - 1 bars."""
+        total = self.sum.update(close)
+        return total / self.n if total is not None else float('nan')
+
+    def _compute(self, close):
+        """Returns the MA array of a close series and the state after its last bar."""
+        close = np.asarray(close, dtype='float64')
+        sums = rolling_sum(close, self.n)
+        ma = np.full(len(close), np.nan)
+        ma[self.n - 1 :] = sums / self.n
+        state = MA(self.n)
+        state.sum.warm(close, sums)
+        return ma, state.get_state()
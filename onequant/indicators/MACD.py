@@ -0,0 +1,51 @@
+"""Moving Average Convergence Divergence - MACD indicator."""
+import numpy as np
+
+from onequant.indicators.base import Indicator
+from onequant.indicators.EMA import _ema
+
+
+class MACD(Indicator):
+    """Moving Average Convergence Divergence - MACD indicator.
+
+    DIF is the fast EMA minus the slow EMA of the closes, DEA the signal EMA of DIF and MACD
+    twice their difference.
+    """
+
+    PARAMS = ('fast', 'slow', 'signal')
+    OUTPUTS = ('DIF', 'DEA', 'MACD')
+    STATE = ('count', 'fast_ema', 'slow_ema', 'dea')
+
+    def __init__(self, fast=12, slow=26, signal=9):
+        """Initialize MACD indicator with default parameters."""
+        self.fast = fast
+        self.slow = slow
+        self.signal = signal
+        self.count = 0
+        self.fast_ema = None
+        self.slow_ema = None
+        self.dea = None
+
+    @staticmethod
+    def _next(ema, value, n):
+        """Returns the EMA after a new value, see `onequant.indicators.EMA`."""
+        return float(value) if ema is None else (2 * value + (n - 1) * ema) / (n + 1)
+
+    def update(self, close):
+        """Calculate the DIF, DEA and MACD values for the given close price."""
+        self.count += 1
+        self.fast_ema = self._next(self.fast_ema, close, self.fast)
+        self.slow_ema = self._next(self.slow_ema, close, self.slow)
+        dif = self.fast_ema - self.slow_ema
+        self.dea = self._next(self.dea, dif, self.signal)
+        return dif, self.dea, (dif - self.dea) * 2
+
+    def _compute(self, close):
+        """Returns the DIF, DEA and MACD arrays of a close series and the state after its last bar."""
+        close = np.asarray(close, dtype='float64')
+        fast, fast_ema = _ema(close, self.fast)
+        slow, slow_ema = _ema(close, self.slow)
+        dif = fast - slow
+        dea, last_dea = _ema(dif, self.signal)
+        state = dict(self.params, count=len(close), fast_ema=fast_ema, slow_ema=slow_ema, dea=last_dea)
+        return (dif, dea, (dif - dea) * 2), state
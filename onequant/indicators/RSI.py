@@ -0,0 +1,68 @@
+"""Relative Strength Index - RSI indicator."""
+import numpy as np
+
+from onequant.indicators.base import Indicator
+
+
+class RSI(Indicator):
+    """Relative Strength Index - RSI indicator.
+
+    The rises and absolute changes of the closes are smoothed with SMA(X, n, 1), started at the
+    first change, and RSI is their ratio in percent, 50 while the closes did not move.
+    """
+
+    PARAMS = ('n',)
+    OUTPUTS = ('RSI',)
+    STATE = ('count', 'last_close', 'rise', 'change')
+
+    def __init__(self, n=14):
+        """Initialize RSI indicator with default parameters."""
+        self.n = n
+        self.count = 0
+        self.last_close = None
+        self.rise = None
+        self.change = None
+
+    def update(self, close):
+        """Calculate the RSI value for the given close price, NaN for the first bar."""
+        self.count += 1
+        last_close, self.last_close = self.last_close, close
+        if last_close is None:
+            return float('nan')
+
+        change = close - last_close
+        rise = change if change > 0 else 0.0
+        change = abs(change)
+        if self.rise is None:
+            self.rise, self.change = float(rise), float(change)
+        else:
+            self.rise = (rise + (self.n - 1) * self.rise) / self.n
+            self.change = (change + (self.n - 1) * self.change) / self.n
+        return self.rise / self.change * 100 if self.change != 0 else 50.0
+
+    def _compute(self, close):
+        """Returns the RSI array of a close series and the state after its last bar."""
+        close = np.asarray(close, dtype='float64')
+        changes = close[1:] - close[:-1]
+        rises = np.where(changes > 0, changes, 0.0).tolist()
+        changes = np.abs(changes).tolist()
+
+        # each value depends on the previous one, a plain loop over floats like update
+        rise_values, change_values = [], []
+        rise = change = None
+        n = self.n
+        for rise_value, change_value in zip(rises, changes):
+            if rise is None:
+                rise, change = rise_value, change_value
+            else:
+                rise = (rise_value + (n - 1) * rise) / n
+                change = (change_value + (n - 1) * change) / n
+            rise_values.append(rise)
+            change_values.append(change)
+
+        rsi = np.full(len(close), np.nan)
+        rise_values, change_values = np.array(rise_values), np.array(change_values)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rsi[1:] = np.where(change_values != 0, rise_values / change_values * 100, 50.0)
+        last_close = float(close[-1]) if len(close) else None
+        return rsi, dict(self.params, count=len(close), last_close=last_close, rise=rise, change=change)
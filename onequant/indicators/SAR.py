@@ -1,14 +1,38 @@
 """Parabolic Stop and Reverse (SAR) indicator."""
+from collections import deque
 
+import numpy as np
 
-class SAR:
+from onequant.indicators.base import Indicator
+
+
+class SAR(Indicator):
     """Parabolic Stop and Reverse (SAR) indicator."""
 
+    PARAMS = ('max_af', 'af_step')
+    INPUTS = ('high', 'low')
+    OUTPUTS = ('PSAR',)
+    STATE = (
+        'psar_list',
+        'af_list',
+        'high_list',
+        'low_list',
+        'trend_list',
+        'next_psar_list',
+        'high_price_trend',
+        'low_price_trend',
+        'trend',
+        'af',
+        'last_high',
+        'last_low',
+    )
+
     def __init__(self, max_af=0.2, af_step=0.02):
         """Initialize SAR indicator with default parameters."""
         self.max_af = max_af
         self.af = af_step
         self.af_step = af_step
+        self.trend = 0
         self.high_price_trend = []
         self.low_price_trend = []
 
@@ -105,6 +129,237 @@ class SAR:
 
         return psar
 
+    def compute(self, high, low):
+        """Calculate the SAR values of whole high and low series at once.
+
+        The result is the one of calling `calcPSAR` on every bar of a new SAR, but the recurrence runs
+        in one loop over floats, carrying the extremes of the current trend instead of rescanning them
+        at every reversal. The state of this object is left untouched.
+
+        Args:
+            high (array-like): The high prices.
+            low (array-like): The low prices.
+
+        Returns:
+            tuple: The psar, trend, af and next_psar numpy arrays, as psar_list, trend_list, af_list
+            and next_psar_list.
+        """
+        return self._values(high, low)[:4]
+
+    def update(self, high, low):
+        """Calculate the SAR value for a new bar, see `calcPSAR`."""
+        return self.calcPSAR(high, low)
+
+    def _values(self, high, low):
+        """Returns the psar, trend, af and next_psar arrays, and the first bar of the last trend."""
+        highs = np.asarray(high, dtype='float64').tolist()
+        lows = np.asarray(low, dtype='float64').tolist()
+        size = len(highs)
+        psar_values, af_values, next_psar_values = [0.0] * size, [0.0] * size, [0.0] * size
+        trend_values = [0] * size
+        start = 0
+        if size:
+            af_step, max_af = self.af_step, self.max_af
+            af, trend = af_step, 0
+            psar = next_psar = trend_high = last_high = highs[0]
+            trend_low = last_low = lows[0]
+            psar_values[0], af_values[0], next_psar_values[0] = psar, af, next_psar
+            for i in range(1, size):
+                high, low = highs[i], lows[i]
+                # same comparisons as max() and min() over the trend lists
+                if high > trend_high:
+                    trend_high = high
+                if low < trend_low:
+                    trend_low = low
+                af = min(af + af_step, max_af)
+                if trend == 1:
+                    psar = psar + af * (last_high - psar)
+                    next_psar = psar + af * (high - psar)
+                    if psar > low:
+                        trend, psar, af, start = 0, trend_high, af_step, i
+                        next_psar = psar - af_step * (psar - low)
+                        trend_high, trend_low = high, low
+                else:
+                    psar = psar - af * (psar - last_low)
+                    next_psar = psar - af * (psar - low)
+                    if psar < high:
+                        trend, psar, af, start = 1, trend_low, af_step, i
+                        next_psar = psar + af_step * (high - psar)
+                        trend_high, trend_low = high, low
+                psar_values[i], af_values[i], next_psar_values[i], trend_values[i] = psar, af, next_psar, trend
+                last_high, last_low = high, low
+        return (
+            np.array(psar_values),
+            np.array(trend_values, dtype='int64'),
+            np.array(af_values),
+            np.array(next_psar_values),
+            start,
+        )
+
+    def _compute(self, high, low):
+        """Returns the psar array and the state calcPSAR would have after the last bar."""
+        psar, trend, af, next_psar, start = self._values(high, low)
+        if not len(psar):
+            return psar, self.params
+        highs, lows = np.asarray(high).tolist(), np.asarray(low).tolist()
+        state = dict(
+            self.params,
+            psar_list=psar.tolist(),
+            af_list=af.tolist(),
+            high_list=highs,
+            low_list=lows,
+            trend_list=trend.tolist(),
+            next_psar_list=next_psar.tolist(),
+            high_price_trend=highs[start:],
+            low_price_trend=lows[start:],
+            trend=int(trend[-1]),
+            af=float(af[-1]),
+            last_high=highs[-1],
+            last_low=lows[-1],
+        )
+        return psar, state
+
+    def apply_to_df(self, df, suffix=''):
+        """Apply SAR calculation to a DataFrame and return it with a PSAR column added.
+
+        A SAR that has not seen any bar computes the column at once with `apply`, then continues
+        from the last bar of the DataFrame like after calling `calcPSAR` on every row.
+        """
+        if self.psar_list:
+            df['PSAR' + suffix] = [
+                self.calcPSAR(high, low) for high, low in zip(df['high'].tolist(), df['low'].tolist())
+            ]
+            return df
+
+        df['PSAR' + suffix] = self.apply(df['high'], df['low'])
+        return df
+
+
+class StreamingSAR(Indicator):
+    """Parabolic SAR indicator for long-running processes, with a state of a few scalars and O(1) updates.
+
+    `calcPSAR` returns the values of `SAR.calcPSAR`, but instead of the result lists and the price
+    lists of the current trend only the last psar, af, trend and next psar, the extremes of the
+    current trend and the last high and low are kept. The last `history_size` bars can optionally be kept
+    in a ring buffer. `get_state` returns the whole state as a JSON-serializable dict and `set_state`
+    restores it, so a restarted process resumes where it stopped:
+
+        sar = StreamingSAR(0.2, 0.02)
+        sar.apply_to_df(history)
+        state = sar.get_state()
+        ...
+        sar = StreamingSAR.from_state(state)
+        psar = sar.calcPSAR(high, low)
+    """
+
+    PARAMS = ('max_af', 'af_step', 'history_size')
+    INPUTS = ('high', 'low')
+    OUTPUTS = ('PSAR',)
+    STATE = (
+        'count',
+        'psar',
+        'next_psar',
+        'af',
+        'trend',
+        'trend_high',
+        'trend_low',
+        'last_high',
+        'last_low',
+        'history',
+    )
+
+    def __init__(self, max_af=0.2, af_step=0.02, history_size=0):
+        """Initialize the streaming SAR indicator with default parameters.
+
+        Args:
+            max_af (float, optional): The maximum acceleration factor. Defaults to 0.2.
+            af_step (float, optional): The acceleration factor step. Defaults to 0.02.
+            history_size (int, optional): The number of bars kept in `history`, as (psar, trend, af,
+                next_psar) tuples. Defaults to 0.
+        """
+        self.max_af = max_af
+        self.af_step = af_step
+        self.history_size = history_size
+        self.reset()
+
+    def reset(self):
+        """Forgets all the bars seen."""
+        self.count = 0
+        self.psar = None
+        self.next_psar = None
+        self.af = self.af_step
+        self.trend = 0
+        # the highest high and lowest low since the start of the current trend
+        self.trend_high = None
+        self.trend_low = None
+        self.last_high = 0
+        self.last_low = 0
+        self.history = deque(maxlen=self.history_size)
+
+    def calcPSAR(self, high, low):
+        """Calculate the Parabolic Stop and Reverse (SAR) value for the given high and low prices, see `SAR`."""
+        if self.psar is None:
+            self.trend, self.af = 0, self.af_step
+            psar = next_psar = self.trend_high = high
+            self.trend_low = low
+        else:
+            # same comparisons as max() and min() over the trend lists
+            if high > self.trend_high:
+                self.trend_high = high
+            if low < self.trend_low:
+                self.trend_low = low
+            self.af = min(self.af + self.af_step, self.max_af)
+            psar = self.psar
+            if self.trend == 1:
+                psar = psar + self.af * (self.last_high - psar)
+                next_psar = psar + self.af * (high - psar)
+                if psar > low:
+                    self.trend, psar, self.af = 0, self.trend_high, self.af_step
+                    next_psar = psar - self.af_step * (psar - low)
+                    self.trend_high, self.trend_low = high, low
+            else:
+                psar = psar - self.af * (psar - self.last_low)
+                next_psar = psar - self.af * (psar - low)
+                if psar < high:
+                    self.trend, psar, self.af = 1, self.trend_low, self.af_step
+                    next_psar = psar + self.af_step * (high - psar)
+                    self.trend_high, self.trend_low = high, low
+
+        self.psar, self.next_psar = psar, next_psar
+        self.count += 1
+        self.last_high = high
+        self.last_low = low
+        if self.history_size:
+            self.history.append((psar, self.trend, self.af, next_psar))
+
+        return psar
+
+    def update(self, high, low):
+        """Calculate the SAR value for a new bar, see `calcPSAR`."""
+        return self.calcPSAR(high, low)
+
+    def _compute(self, high, low):
+        """Returns the psar array of `SAR.compute` and the state after the last bar."""
+        psar, trend, af, next_psar, start = SAR(self.max_af, self.af_step)._values(high, low)
+        sar = StreamingSAR(self.max_af, self.af_step, self.history_size)
+        if len(psar):
+            highs, lows = np.asarray(high).tolist(), np.asarray(low).tolist()
+            sar.count = len(psar)
+            sar.psar, sar.trend, sar.af, sar.next_psar = (
+                float(psar[-1]),
+                int(trend[-1]),
+                float(af[-1]),
+                float(next_psar[-1]),
+            )
+            sar.trend_high, sar.trend_low = max(highs[start:]), min(lows[start:])
+            sar.last_high, sar.last_low = highs[-1], lows[-1]
+            if self.history_size:
+                recent = slice(-self.history_size, None)
+                sar.history.extend(
+                    zip(psar[recent].tolist(), trend[recent].tolist(), af[recent].tolist(), next_psar[recent].tolist())
+                )
+        return psar, sar.get_state()
+
 
 if __name__ == '__main__':
     import pandas as pd
@@ -112,4 +367,4 @@ if __name__ == '__main__':
     # 读取CSV文件并转换为DataFrame
     df = pd.read_csv(r'E:\SC000_SAR.csv', index_col='DateTime')
     indic = SAR(0.2, 0.2)
-    df['PSAR'] = df.apply(lambda x: indic.calcPSAR(x['High'], x['Low']), axis=1)
+    df['PSAR'] = indic.compute(df['High'], df['Low'])[0]
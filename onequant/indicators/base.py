@@ -0,0 +1,146 @@
+"""Common interface of the indicators.
+
+Every indicator has a batch and a streaming form giving the same values:
+
+    ma = MA(20)
+    values = ma.compute(close)          # whole arrays, the state is left untouched
+    values = ma.apply(close)            # whole arrays, then continues from the last bar
+    value = ma.update(last_close)       # one bar
+    state = ma.get_state()              # JSON types, see MA.from_state
+    df = MA(20).apply_to_df(df)         # adds the OUTPUTS columns from the INPUTS ones
+"""
+from collections import deque
+
+
+class Indicator:
+    """Base class of the indicators.
+
+    A subclass sets the class attributes, implements `update` and `_compute`, counts the bars seen
+    in `count` and keeps its streaming state in the `STATE` attributes. A state attribute can be
+    a JSON value, a deque or an object with `get_state` and `set_state`, like `RollingSum`.
+    """
+
+    # the __init__ arguments, kept as attributes of the same names
+    PARAMS = ()
+    # the DataFrame columns of the inputs of compute and update
+    INPUTS = ('close',)
+    # the DataFrame columns of the outputs of compute and update
+    OUTPUTS = ()
+    # the attributes of the streaming state
+    STATE = ()
+
+    @property
+    def params(self):
+        """Returns the parameters of the indicator as a dict."""
+        return {name: getattr(self, name) for name in self.PARAMS}
+
+    def reset(self):
+        """Forgets all the bars seen."""
+        self.__init__(**self.params)
+
+    def update(self, *values):
+        """Calculate the values of the indicator for a new bar.
+
+        Args:
+            *values: The INPUTS of the bar.
+
+        Returns:
+            float or tuple: The OUTPUTS of the bar, NaN until enough bars are seen.
+        """
+        raise NotImplementedError
+
+    def _compute(self, *inputs):
+        """Returns the OUTPUTS arrays of whole series and the state after their last bar."""
+        raise NotImplementedError
+
+    def compute(self, *inputs):
+        """Calculate the values of the indicator of whole series at once.
+
+        The result is the one of calling `update` on every bar of a new indicator. The state of
+        this object is left untouched.
+
+        Args:
+            *inputs (array-like): The INPUTS series.
+
+        Returns:
+            numpy.ndarray or tuple: The OUTPUTS arrays.
+        """
+        return self._compute(*inputs)[0]
+
+    def apply(self, *inputs):
+        """Calculate the values of the indicator of whole series like `compute`, then continue from their last bar.
+
+        Args:
+            *inputs (array-like): The INPUTS series.
+
+        Returns:
+            numpy.ndarray or tuple: The OUTPUTS arrays.
+        """
+        outputs, state = self._compute(*inputs)
+        self.set_state(state)
+        return outputs
+
+    def apply_to_df(self, df, suffix=''):
+        """Apply the indicator to a DataFrame and return it with the OUTPUTS columns added.
+
+        An indicator that has not seen any bar computes the columns at once with `apply`, otherwise
+        the rows are passed to `update` one by one.
+        """
+        inputs = [df[name] for name in self.INPUTS]
+        if self.count:
+            rows = [self.update(*bar) for bar in zip(*(column.tolist() for column in inputs))]
+            outputs = (list(zip(*rows)) or [[]] * len(self.OUTPUTS)) if len(self.OUTPUTS) > 1 else [rows]
+        else:
+            outputs = self.apply(*inputs)
+            if len(self.OUTPUTS) == 1:
+                outputs = [outputs]
+        for name, values in zip(self.OUTPUTS, outputs):
+            df[name + suffix] = values
+        return df
+
+    def get_state(self):
+        """Returns the state of the indicator.
+
+        Returns:
+            dict: The parameters and the state attributes, made of JSON types.
+        """
+        state = dict(self.params)
+        for name in self.STATE:
+            value = getattr(self, name)
+            if hasattr(value, 'get_state'):
+                value = value.get_state()
+            elif isinstance(value, (deque, list)):
+                value = list(value)
+            state[name] = value
+        return state
+
+    def set_state(self, state):
+        """Restores a state returned by `get_state`.
+
+        Args:
+            state (dict): The state.
+        """
+        for name in self.PARAMS:
+            setattr(self, name, state[name])
+        self.reset()
+        for name in self.STATE:
+            if name not in state:
+                continue
+            current = getattr(self, name)
+            if hasattr(current, 'set_state'):
+                current.set_state(state[name])
+            elif isinstance(current, deque):
+                # JSON turns the tuples of the deques into lists
+                items = (tuple(item) if isinstance(item, list) else item for item in state[name])
+                setattr(self, name, deque(items, maxlen=current.maxlen))
+            elif isinstance(current, list):
+                setattr(self, name, list(state[name]))
+            else:
+                setattr(self, name, state[name])
+
+    @classmethod
+    def from_state(cls, state):
+        """Returns an indicator restored from a state returned by `get_state`."""
+        indicator = cls(**{name: state[name] for name in cls.PARAMS})
+        indicator.set_state(state)
+        return indicator
@@ -0,0 +1,401 @@
+"""KDJ and SAR of many symbols at once on aligned (time, symbol) panels.
+
+The panels are 2-D arrays, or DataFrames, of the bars of every symbol as columns. Every column
+gets the values `KDJ.compute` and `SAR.compute` give for that symbol alone, but each step of the
+recurrences runs for all the symbols with one array operation:
+
+    kdj = PanelKDJ(43, 9, 3)
+    k, d, j = kdj.apply(high, low, close)
+    ...
+    # at every bar close, the rows of the new bar of all the symbols
+    k, d, j = kdj.update(high_row, low_row, close_row)
+
+A bar with a NaN input is missing for its symbol, like the bars `future_bars_batch` fills in a wide
+panel when the calendars of the symbols differ: its values are NaN and the state of the symbol goes
+on from its previous bar. Every symbol then gets the values of its own bars only, from its first one.
+
+The streaming form keeps one state vector per quantity, and `get_state` / `set_state` save and
+restore it as JSON types like `StreamingKDJ` and `StreamingSAR`.
+"""
+import numpy as np
+import pandas as pd
+
+from onequant.indicators.KDJ import _round2, _rsv, _smooth_columns
+from onequant.indicators.rolling import rolling_max, rolling_min
+
+
+def _frame_like(values, like):
+    """Returns values as a DataFrame with the index and columns of like if it is a DataFrame."""
+    if not hasattr(like, 'columns'):
+        return values
+    return pd.DataFrame(values, index=like.index, columns=like.columns)
+
+
+def _vector(values, dtype='float64'):
+    """Returns a restored state vector, None staying None and None items becoming NaN."""
+    return None if values is None else np.asarray(values, dtype=dtype)
+
+
+def _listed(values):
+    """Returns a state vector as a list of JSON types, NaN becoming None."""
+    if values is None:
+        return None
+    return [None if value != value else value for value in values.tolist()]
+
+
+def _valid(*values):
+    """Returns the mask of the bars without any NaN input."""
+    valid = ~np.isnan(values[0])
+    for other in values[1:]:
+        valid &= ~np.isnan(other)
+    return valid
+
+
+def _positions(valid):
+    """Returns the rows and columns of the valid bars and their position among the valid bars of their column."""
+    rows, columns = np.nonzero(valid)
+    return rows, columns, (np.cumsum(valid, axis=0) - 1)[rows, columns]
+
+
+def _packed(values, positions, sizes):
+    """Returns the valid values of every column moved up to the rows of their positions.
+
+    The rows below the last valid bar of a column repeat it, they are only there to keep the panel
+    rectangular and give no value.
+    """
+    rows, columns, ranks = positions
+    packed = np.zeros(values.shape)
+    packed[ranks, columns] = values[rows, columns]
+    if len(packed):
+        last = packed[np.maximum(sizes - 1, 0), np.arange(packed.shape[1])]
+        packed = np.where(np.arange(len(packed))[:, None] < sizes, packed, last)
+    return packed
+
+
+def _unpacked(packed, positions):
+    """Returns the packed values back at the rows of their bars, NaN at the missing bars."""
+    rows, columns, ranks = positions
+    values = np.full(packed.shape, np.nan)
+    values[rows, columns] = packed[ranks, columns]
+    return values
+
+
+class PanelKDJ:
+    """KDJ indicator of many symbols, see `KDJ`."""
+
+    STATE = ('count', 'rsv_count', 'highs', 'lows', 'k', 'd', 'j')
+
+    def __init__(self, n=9, m1=3, m2=3):
+        """Initialize the panel KDJ indicator with default parameters."""
+        self.n = n
+        self.m1 = m1
+        self.m2 = m2
+        self.reset()
+
+    def reset(self):
+        """Forgets all the bars seen."""
+        # bars seen and RSV values computed of every symbol, the latter capped at m1 as only the warm-up depends on it
+        self.count = None
+        self.rsv_count = None
+        # the highs and lows of the last n bars of every symbol, bar i of a symbol at row i % n
+        self.highs = None
+        self.lows = None
+        # the last K, D and J of every symbol, once its RSV count reached m1
+        self.k = None
+        self.d = None
+        self.j = None
+
+    def _start(self, symbols):
+        """Sets the state of symbols that have not seen any bar."""
+        self.count = np.zeros(symbols, dtype='int64')
+        self.rsv_count = np.zeros(symbols, dtype='int64')
+        self.highs = np.zeros((self.n, symbols))
+        self.lows = np.zeros((self.n, symbols))
+        self.k = np.full(symbols, 50.0)
+        self.d = np.full(symbols, 50.0)
+        self.j = np.full(symbols, 50.0)
+
+    def _compute(self, high, low, close):
+        """Returns the unrounded K, D and J of the valid bars of every symbol, packed, see `_packed`."""
+        rsv = _rsv(close, rolling_max(high, self.n), rolling_min(low, self.n), self.n)
+        symbols = rsv.shape[1]
+        first = self.n - 1 + max(self.m1 - 1, 0)
+        k = _smooth_columns(rsv, [self.m1] * symbols, [first] * symbols)
+        d = _smooth_columns(k, [self.m2] * symbols, [first] * symbols)
+        return k, d, 3 * k - 2 * d
+
+    def _panels(self, high, low, close):
+        """Returns the valid bars of the panels, packed if some are missing, and their positions."""
+        high, low, close = (np.asarray(values, dtype='float64') for values in (high, low, close))
+        valid = _valid(high, low, close)
+        sizes = valid.sum(axis=0)
+        if valid.all():
+            return (high, low, close), None, sizes
+        positions = _positions(valid)
+        return tuple(_packed(values, positions, sizes) for values in (high, low, close)), positions, sizes
+
+    def compute(self, high, low, close):
+        """Calculate the KDJ values of every symbol of the panels at once, see `KDJ.compute`.
+
+        The state of this object is left untouched.
+
+        Args:
+            high (array-like): The (bars, symbols) high prices.
+            low (array-like): The (bars, symbols) low prices.
+            close (array-like): The (bars, symbols) close prices.
+
+        Returns:
+            tuple: The K, D and J panels, NaN at the missing bars, DataFrames if close is one.
+        """
+        panels, positions, _ = self._panels(high, low, close)
+        values = self._compute(*panels)
+        if positions is not None:
+            values = (_unpacked(value, positions) for value in values)
+        return tuple(_frame_like(_round2(value), close) for value in values)
+
+    def apply(self, high, low, close):
+        """Calculate the KDJ values of the panels like `compute`, then continue from their last bar.
+
+        Args:
+            high (array-like): The (bars, symbols) high prices.
+            low (array-like): The (bars, symbols) low prices.
+            close (array-like): The (bars, symbols) close prices.
+
+        Returns:
+            tuple: The K, D and J panels, NaN at the missing bars, DataFrames if close is one.
+        """
+        (highs, lows, closes), positions, sizes = self._panels(high, low, close)
+        k, d, j = self._compute(highs, lows, closes)
+        symbols = len(sizes)
+        self._start(symbols)
+        self.count = sizes.astype('int64')
+        # the last n valid bars of every symbol, at the rows of their bar numbers
+        bars = sizes - self.n + np.arange(self.n)[:, None]
+        recent = bars >= 0
+        columns = np.broadcast_to(np.arange(symbols), bars.shape)[recent]
+        self.highs[bars[recent] % self.n, columns] = highs[bars[recent], columns]
+        self.lows[bars[recent] % self.n, columns] = lows[bars[recent], columns]
+        self.rsv_count = np.clip(sizes - self.n + 1, 0, self.m1).astype('int64')
+        if len(k):
+            last = np.maximum(sizes - 1, 0), np.arange(symbols)
+            self.k, self.d, self.j = k[last], d[last], j[last]
+        if positions is not None:
+            k, d, j = (_unpacked(values, positions) for values in (k, d, j))
+        return tuple(_frame_like(_round2(values), close) for values in (k, d, j))
+
+    def update(self, high, low, close):
+        """Calculate the KDJ values of every symbol for a new bar, see `KDJ.calcKDJ`.
+
+        Args:
+            high (array-like): The high price of every symbol, NaN if the symbol has no bar.
+            low (array-like): The low price of every symbol, NaN if the symbol has no bar.
+            close (array-like): The close price of every symbol, NaN if the symbol has no bar.
+
+        Returns:
+            tuple: The K, D and J numpy arrays, NaN for the symbols without a bar.
+        """
+        high, low, close = (np.asarray(values, dtype='float64') for values in (high, low, close))
+        if self.count is None:
+            self._start(len(high))
+        valid = _valid(high, low, close)
+        if valid.all() and (self.count == self.count[:1]).all():
+            # the symbols are at the same bar of their window
+            self.highs[self.count[0] % self.n] = high
+            self.lows[self.count[0] % self.n] = low
+            self.count += 1
+        else:
+            symbols = np.flatnonzero(valid)
+            self.highs[self.count[symbols] % self.n, symbols] = high[symbols]
+            self.lows[self.count[symbols] % self.n, symbols] = low[symbols]
+            self.count[symbols] += 1
+
+        # the symbols past the warm-up of their window, then of their RSV
+        active = valid & (self.count >= self.n)
+        highest_high = self.highs.max(axis=0)
+        lowest_low = self.lows.min(axis=0)
+        spread = highest_high - lowest_low
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rsv = np.where(spread != 0, (close - lowest_low) / spread * 100, 50.0)
+        counted = self.rsv_count
+        self.rsv_count = np.where(active & (counted < self.m1), counted + 1, counted)
+        ready = active & (self.rsv_count >= self.m1)
+        first = ready & (counted < self.m1)
+
+        k = np.where(first, 50.0, (self.k * (self.m1 - 1) + rsv) / self.m1)
+        d = np.where(first, 50.0, (self.d * (self.m2 - 1) + k) / self.m2)
+        if ready.all():
+            self.k, self.d, self.j = k, d, 3 * k - 2 * d
+            return _round2(self.k), _round2(self.d), _round2(self.j)
+
+        self.k = np.where(ready, k, self.k)
+        self.d = np.where(ready, d, self.d)
+        self.j = np.where(ready, 3 * k - 2 * d, self.j)
+
+        default = np.where(valid, 50.0, np.nan)
+        return tuple(np.where(ready, _round2(values), default) for values in (self.k, self.d, self.j))
+
+    def get_state(self):
+        """Returns the state of the indicator.
+
+        Returns:
+            dict: The parameters, counters, window rows and last K, D and J of every symbol, made of JSON types.
+        """
+        state = {name: None if getattr(self, name) is None else getattr(self, name).tolist() for name in self.STATE}
+        return dict(state, n=self.n, m1=self.m1, m2=self.m2)
+
+    def set_state(self, state):
+        """Restores a state returned by `get_state`.
+
+        Args:
+            state (dict): The state.
+        """
+        self.n, self.m1, self.m2 = state['n'], state['m1'], state['m2']
+        for name in self.STATE:
+            setattr(self, name, _vector(state[name], 'int64' if name.endswith('count') else 'float64'))
+
+    @classmethod
+    def from_state(cls, state):
+        """Returns a PanelKDJ restored from a state returned by `get_state`."""
+        kdj = cls(state['n'], state['m1'], state['m2'])
+        kdj.set_state(state)
+        return kdj
+
+
+class PanelSAR:
+    """Parabolic SAR indicator of many symbols, see `SAR`."""
+
+    STATE = ('psar', 'next_psar', 'af', 'trend', 'trend_high', 'trend_low', 'last_high', 'last_low')
+
+    def __init__(self, max_af=0.2, af_step=0.02):
+        """Initialize the panel SAR indicator with default parameters."""
+        self.max_af = max_af
+        self.af_step = af_step
+        self.reset()
+
+    def reset(self):
+        """Forgets all the bars seen."""
+        for name in self.STATE:
+            setattr(self, name, None)
+
+    def update(self, high, low):
+        """Calculate the SAR values of every symbol for a new bar, see `SAR.calcPSAR`.
+
+        The psar of a symbol is NaN until its first bar.
+
+        Args:
+            high (array-like): The high price of every symbol, NaN if the symbol has no bar.
+            low (array-like): The low price of every symbol, NaN if the symbol has no bar.
+
+        Returns:
+            numpy.ndarray: The psar of every symbol, NaN for the symbols without a bar, the trend, af and
+            next psar being in the attributes.
+        """
+        high, low = np.asarray(high, dtype='float64'), np.asarray(low, dtype='float64')
+        if self.psar is None:
+            for name in self.STATE:
+                setattr(self, name, np.full(len(high), np.nan))
+            self.af = np.full(len(high), float(self.af_step))
+            self.trend = np.zeros(len(high), dtype='int64')
+        valid = _valid(high, low)
+        start = valid & np.isnan(self.psar)
+        step = valid & ~start
+
+        # the scalar recurrence of SAR for every symbol, same comparisons and float operations
+        trend_high = np.where(high > self.trend_high, high, self.trend_high)
+        trend_low = np.where(low < self.trend_low, low, self.trend_low)
+        af = np.minimum(self.af + self.af_step, self.max_af)
+        up = self.trend == 1
+        psar = np.where(up, self.psar + af * (self.last_high - self.psar), self.psar - af * (self.psar - self.last_low))
+        next_psar = np.where(up, psar + af * (high - psar), psar - af * (psar - low))
+        down_reversal = up & (psar > low)
+        up_reversal = ~up & (psar < high)
+        psar = np.where(down_reversal, trend_high, np.where(up_reversal, trend_low, psar))
+        next_psar = np.where(
+            down_reversal,
+            psar - self.af_step * (psar - low),
+            np.where(up_reversal, psar + self.af_step * (high - psar), next_psar),
+        )
+        reversal = down_reversal | up_reversal
+        trend = np.where(down_reversal, 0, np.where(up_reversal, 1, self.trend))
+        af = np.where(reversal, float(self.af_step), af)
+        trend_high = np.where(reversal, high, trend_high)
+        trend_low = np.where(reversal, low, trend_low)
+
+        if step.all():
+            self.psar, self.next_psar, self.trend_high, self.trend_low = psar, next_psar, trend_high, trend_low
+            self.af, self.trend, self.last_high, self.last_low = af, trend, high, low
+            return self.psar
+
+        # the first bar of a symbol starts its state, a missing bar keeps it
+        self.psar = np.where(start, high, np.where(step, psar, self.psar))
+        self.next_psar = np.where(start, high, np.where(step, next_psar, self.next_psar))
+        self.trend_high = np.where(start, high, np.where(step, trend_high, self.trend_high))
+        self.trend_low = np.where(start, low, np.where(step, trend_low, self.trend_low))
+        self.af = np.where(start, float(self.af_step), np.where(step, af, self.af))
+        self.trend = np.where(start, 0, np.where(step, trend, self.trend))
+        self.last_high = np.where(valid, high, self.last_high)
+        self.last_low = np.where(valid, low, self.last_low)
+        return np.where(valid, self.psar, np.nan)
+
+    def apply(self, high, low):
+        """Calculate the SAR values of every symbol of the panels, then continue from their last bar.
+
+        Args:
+            high (array-like): The (bars, symbols) high prices.
+            low (array-like): The (bars, symbols) low prices.
+
+        Returns:
+            tuple: The psar, trend, af and next_psar panels, DataFrames if high is one. The psar, af
+            and next_psar are NaN at the missing bars, where the trend is the one of the previous bar.
+        """
+        highs, lows = np.asarray(high, dtype='float64'), np.asarray(low, dtype='float64')
+        valid = _valid(highs, lows)
+        panels = {
+            name: np.empty(highs.shape, dtype='int64' if name == 'trend' else 'float64') for name in self.STATE[:4]
+        }
+        for bar in range(len(highs)):
+            panels['psar'][bar] = self.update(highs[bar], lows[bar])
+            panels['trend'][bar] = self.trend
+            panels['af'][bar] = np.where(valid[bar], self.af, np.nan)
+            panels['next_psar'][bar] = np.where(valid[bar], self.next_psar, np.nan)
+        return tuple(_frame_like(panels[name], high) for name in ('psar', 'trend', 'af', 'next_psar'))
+
+    def compute(self, high, low):
+        """Calculate the SAR values of every symbol of the panels at once, see `SAR.compute`.
+
+        The state of this object is left untouched.
+
+        Args:
+            high (array-like): The (bars, symbols) high prices.
+            low (array-like): The (bars, symbols) low prices.
+
+        Returns:
+            tuple: The psar, trend, af and next_psar panels, DataFrames if high is one, see `apply`.
+        """
+        return PanelSAR(self.max_af, self.af_step).apply(high, low)
+
+    def get_state(self):
+        """Returns the state of the indicator.
+
+        Returns:
+            dict: The parameters and the state vectors, made of JSON types, None for the symbols without a bar yet.
+        """
+        state = {name: _listed(getattr(self, name)) for name in self.STATE}
+        return dict(state, max_af=self.max_af, af_step=self.af_step)
+
+    def set_state(self, state):
+        """Restores a state returned by `get_state`.
+
+        Args:
+            state (dict): The state.
+        """
+        self.max_af, self.af_step = state['max_af'], state['af_step']
+        for name in self.STATE:
+            setattr(self, name, _vector(state[name], 'int64' if name == 'trend' else 'float64'))
+
+    @classmethod
+    def from_state(cls, state):
+        """Returns a PanelSAR restored from a state returned by `get_state`."""
+        sar = cls(state['max_af'], state['af_step'])
+        sar.set_state(state)
+        return sar
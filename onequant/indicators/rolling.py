@@ -0,0 +1,294 @@
+"""Rolling window extrema, sums and moments over numpy arrays in O(N).
+
+The van Herk/Gil-Werman algorithm splits the series in blocks of the window length: the
+extremum of any window is the extremum of the suffix of one block and the prefix of the next,
+both computed with one cumulative pass, whatever the window length.
+
+The rolling sums and moments are the very floats of their streaming forms `RollingSum` and
+`RollingMoments`, so that an indicator gives the same values in batch and bar by bar.
+"""
+from collections import deque
+
+import numpy as np
+
+
+def _rolling(values, window, accumulate):
+    """Returns the extremum of every full window of values, accumulate being np.maximum or np.minimum.
+
+    Args:
+        values (numpy.ndarray): The series, or a 2-D array of series as columns.
+        window (int): The window length.
+        accumulate (numpy.ufunc): np.maximum or np.minimum.
+
+    Returns:
+        numpy.ndarray: The len(values) - window + 1 extrema, the one of values[i:i + window] at i.
+    """
+    values = np.asarray(values, dtype='float64')
+    size, rest = len(values), values.shape[1:]
+    if window < 1 or window > size:
+        return np.empty((0,) + rest, dtype='float64')
+    if window == 1:
+        return values.copy()
+    blocks = -(-size // window)
+    padded = np.empty((blocks * window,) + rest, dtype='float64')
+    padded[:size] = values
+    padded[size:] = values[-1]
+    padded = padded.reshape((blocks, window) + rest)
+    prefix = accumulate.accumulate(padded, axis=1).reshape((-1,) + rest)
+    suffix = accumulate.accumulate(padded[:, ::-1], axis=1)[:, ::-1].reshape((-1,) + rest)
+    count = size - window + 1
+    return accumulate(suffix[:count], prefix[window - 1 : window - 1 + count])
+
+
+def rolling_max(values, window):
+    """Returns the highest value of every full window of values, see `_rolling`."""
+    return _rolling(values, window, np.maximum)
+
+
+def rolling_min(values, window):
+    """Returns the lowest value of every full window of values, see `_rolling`."""
+    return _rolling(values, window, np.minimum)
+
+
+def _rolling_many(values, windows, accumulate):
+    """Returns the extrema of every full window for many window lengths from one sparse table.
+
+    Level k of the table holds the extremum of the 2**k values starting at every position, built
+    from level k - 1 in one pass, the extremum of a window of length n is the one of the two,
+    possibly overlapping, 2**k windows covering it, 2**k being the largest power of 2 up to n.
+
+    Args:
+        values (numpy.ndarray): The 1-D series.
+        windows (iterable): The window lengths.
+        accumulate (numpy.ufunc): np.maximum or np.minimum.
+
+    Returns:
+        dict: The extrema of `_rolling` by window length.
+    """
+    values = np.asarray(values, dtype='float64')
+    size = len(values)
+    levels = [values]
+    extrema = {}
+    for window in sorted(set(windows)):
+        if window < 1 or window > size:
+            extrema[window] = np.empty(0, dtype='float64')
+            continue
+        level = window.bit_length() - 1
+        while len(levels) <= level:
+            half = 1 << (len(levels) - 1)
+            previous = levels[-1]
+            levels.append(accumulate(previous[:-half], previous[half:]))
+        count = size - window + 1
+        table = levels[level]
+        extrema[window] = accumulate(table[:count], table[window - (1 << level) : window - (1 << level) + count])
+    return extrema
+
+
+def rolling_max_many(values, windows):
+    """Returns the highest values of every full window by window length, see `_rolling_many`."""
+    return _rolling_many(values, windows, np.maximum)
+
+
+def rolling_min_many(values, windows):
+    """Returns the lowest values of every full window by window length, see `_rolling_many`."""
+    return _rolling_many(values, windows, np.minimum)
+
+
+def rolling_sum(values, window):
+    """Returns the sum of every full window of values, the very floats `RollingSum` gives.
+
+    A running sum drifts and `RollingSum` starts it over from the window itself every window
+    bars: the sum is rebuilt left to right at the bars whose count is a multiple of window, and
+    moved by value - old value at the others. Both steps are accumulations along the rows of a
+    (windows, window) array here, done by numpy in the same order.
+
+    Args:
+        values (numpy.ndarray): The 1-D series.
+        window (int): The window length.
+
+    Returns:
+        numpy.ndarray: The len(values) - window + 1 sums, the one of values[i:i + window] at i.
+    """
+    values = np.asarray(values, dtype='float64')
+    size = len(values)
+    if window < 1 or window > size:
+        return np.empty(0, dtype='float64')
+    blocks = size // window
+    steps = np.empty((blocks, window), dtype='float64')
+    # the sums rebuilt from the window ending at bar k * window - 1
+    steps[:, 0] = np.add.accumulate(values[: blocks * window].reshape(blocks, window), axis=1)[:, -1]
+    # the moves of the bars after it
+    moves = np.zeros(blocks * window, dtype='float64')
+    count = min(size - window, blocks * window)
+    moves[:count] = values[window : window + count] - values[:count]
+    steps[:, 1:] = moves.reshape(blocks, window)[:, : window - 1]
+    return np.add.accumulate(steps, axis=1).ravel()[: size - window + 1]
+
+
+class RollingSum:
+    """Sum of the last window values, updated in amortized O(1), see `rolling_sum`."""
+
+    def __init__(self, window):
+        """Initializes the RollingSum.
+
+        Args:
+            window (int): The window length.
+        """
+        self.window = window
+        self.count = 0
+        self.total = 0.0
+        self.values = deque(maxlen=window)
+
+    def update(self, value):
+        """Adds a value and returns the sum of the last window values, None before window values."""
+        old = self.values[0] if len(self.values) == self.window else None
+        self.values.append(value)
+        self.count += 1
+        if self.count % self.window == 0:
+            total = 0.0
+            for item in self.values:
+                total += item
+            self.total = total
+        elif old is None:
+            self.total += value
+        else:
+            self.total += value - old
+        return self.total if self.count >= self.window else None
+
+    def warm(self, values, sums):
+        """Sets the state after a series, without updating value by value.
+
+        Args:
+            values (numpy.ndarray): The series.
+            sums (numpy.ndarray): The `rolling_sum` of the series.
+        """
+        self.__init__(self.window)
+        if len(sums):
+            self.values.extend(values[-self.window :].tolist())
+            self.count = len(values)
+            self.total = float(sums[-1])
+        else:
+            for value in values.tolist():
+                self.update(value)
+
+    def get_state(self):
+        """Returns the state as a dict of JSON types."""
+        return {'window': self.window, 'count': self.count, 'total': self.total, 'values': list(self.values)}
+
+    def set_state(self, state):
+        """Restores a state returned by `get_state`."""
+        self.window, self.count, self.total = state['window'], state['count'], state['total']
+        self.values = deque(state['values'], maxlen=self.window)
+
+
+def rolling_moments(values, window):
+    """Returns the sums of the deviations and of the squared deviations of every full window of values.
+
+    The deviations are taken from an anchor close to the window, so that the variance
+    (squares - sums * sums / window) / (window - 1) does not cancel at high price levels. Like
+    `rolling_sum`, both sums are rebuilt left to right every window bars, the first value of the
+    window becoming the anchor, and moved by the deviations of value and old value from that
+    anchor at the other bars. The rows of a (windows, 2 * window - 1) array hold the bars of each
+    anchor, the sums are accumulations along them, done by numpy in the order of `RollingMoments`.
+
+    Args:
+        values (numpy.ndarray): The 1-D series.
+        window (int): The window length.
+
+    Returns:
+        tuple: The len(values) - window + 1 sums of the deviations and sums of the squared
+        deviations, the ones of values[i:i + window] at i, and the anchor of each window.
+    """
+    values = np.asarray(values, dtype='float64')
+    size = len(values)
+    if window < 1 or window > size:
+        empty = np.empty(0, dtype='float64')
+        return empty, empty, empty
+    blocks = size // window
+    # the window rebuilt at the end of a block and the bars moving it after, for every block
+    length = blocks * window + window - 1
+    padded = np.zeros(length, dtype='float64')
+    padded[: min(size, length)] = values[:length]
+    rows = np.lib.stride_tricks.sliding_window_view(padded, 2 * window - 1)[::window]
+    anchors = rows[:, :1]
+    deviations = rows - anchors
+    squares = deviations * deviations
+    sums = []
+    for terms in (deviations, squares):
+        steps = np.empty((blocks, window), dtype='float64')
+        steps[:, 0] = np.add.accumulate(terms[:, :window], axis=1)[:, -1]
+        steps[:, 1:] = terms[:, window:] - terms[:, : window - 1]
+        sums.append(np.add.accumulate(steps, axis=1).ravel()[: size - window + 1])
+    return sums[0], sums[1], np.repeat(anchors[:, 0], window)[: size - window + 1]
+
+
+class RollingMoments:
+    """Sums of the deviations and squared deviations of the last window values, see `rolling_moments`."""
+
+    def __init__(self, window):
+        """Initializes the RollingMoments.
+
+        Args:
+            window (int): The window length.
+        """
+        self.window = window
+        self.count = 0
+        self.anchor = 0.0
+        self.total = 0.0
+        self.square_total = 0.0
+        self.values = deque(maxlen=window)
+
+    def update(self, value):
+        """Adds a value and returns the sums of the deviations and squared deviations, None before window values."""
+        old = self.values[0] if len(self.values) == self.window else None
+        self.values.append(value)
+        self.count += 1
+        if self.count % self.window == 0:
+            self.anchor = self.values[0]
+            total = square_total = 0.0
+            for item in self.values:
+                deviation = item - self.anchor
+                total += deviation
+                square_total += deviation * deviation
+            self.total, self.square_total = total, square_total
+        elif self.count > self.window:
+            deviation, old_deviation = value - self.anchor, old - self.anchor
+            self.total += deviation - old_deviation
+            self.square_total += deviation * deviation - old_deviation * old_deviation
+        return (self.total, self.square_total) if self.count >= self.window else None
+
+    def warm(self, values, moments):
+        """Sets the state after a series, without updating value by value.
+
+        Args:
+            values (numpy.ndarray): The series.
+            moments (tuple): The `rolling_moments` of the series.
+        """
+        self.__init__(self.window)
+        totals, square_totals, anchors = moments
+        if len(totals):
+            self.values.extend(values[-self.window :].tolist())
+            self.count = len(values)
+            self.anchor = float(anchors[-1])
+            self.total = float(totals[-1])
+            self.square_total = float(square_totals[-1])
+        else:
+            for value in values.tolist():
+                self.update(value)
+
+    def get_state(self):
+        """Returns the state as a dict of JSON types."""
+        return {
+            'window': self.window,
+            'count': self.count,
+            'anchor': self.anchor,
+            'total': self.total,
+            'square_total': self.square_total,
+            'values': list(self.values),
+        }
+
+    def set_state(self, state):
+        """Restores a state returned by `get_state`."""
+        self.window, self.count, self.anchor = state['window'], state['count'], state['anchor']
+        self.total, self.square_total = state['total'], state['square_total']
+        self.values = deque(state['values'], maxlen=self.window)
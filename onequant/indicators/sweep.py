@@ -0,0 +1,205 @@
+"""Parameter sweeps of the KDJ and SAR indicators over one series.
+
+A sweep runs an indicator for every parameter combination of a grid and returns a cube of
+parameters by bars for each output, the same values as `compute` of every combination:
+
+    import itertools
+
+    cube = sweep_kdj(high, low, close, itertools.product([9, 14, 21], [3, 5], [3, 5]))
+    cube['K'][cube['params'].index((14, 3, 5))]
+
+The work shared by several combinations is done once: the highest highs and lowest lows of all
+the window lengths come from one sparse table, the RSV of a window length is computed once for
+all its smoothings and the K of a (n, m1) pair once for all its m2, the recurrences of many
+combinations then run side by side, one numpy step per bar. The combinations are spread across a
+process pool, the bars and the results living in shared memory so that only the parameters go
+through the pool.
+"""
+import functools
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from onequant.indicators.KDJ import _round2, _rsv, _smooth_columns
+from onequant.indicators.rolling import rolling_max_many, rolling_min_many
+from onequant.indicators.SAR import SAR
+
+KDJ_OUTPUTS = ('K', 'D', 'J')
+SAR_OUTPUTS = ('psar', 'trend', 'af', 'next_psar')
+
+
+class _SharedArrays:
+    """Numpy arrays in shared memory, created by the parent and attached by the pool workers by spec."""
+
+    def __init__(self, specs, create=False):
+        """Initializes the _SharedArrays.
+
+        Args:
+            specs (dict): The (shared memory name, shape, dtype) of the arrays by name, the name
+                being None when creating them.
+            create (bool, optional): Whether to create the shared memory blocks. Defaults to False.
+        """
+        self.blocks = {}
+        self.arrays = {}
+        for name, (block_name, shape, dtype) in specs.items():
+            nbytes = max(int(np.prod(shape)) * np.dtype(dtype).itemsize, 1)
+            block = shared_memory.SharedMemory(name=block_name, create=create, size=nbytes if create else 0)
+            self.blocks[name] = block
+            self.arrays[name] = np.ndarray(shape, dtype=dtype, buffer=block.buf)
+
+    @classmethod
+    def create(cls, arrays):
+        """Returns new shared arrays, copies of the given numpy arrays by name."""
+        shared = cls({name: (None, array.shape, array.dtype.str) for name, array in arrays.items()}, create=True)
+        for name, array in arrays.items():
+            shared.arrays[name][...] = array
+        return shared
+
+    @property
+    def specs(self):
+        """Returns the specs attaching the arrays in another process."""
+        return {name: (self.blocks[name].name, array.shape, array.dtype.str) for name, array in self.arrays.items()}
+
+    def close(self, unlink=False):
+        """Releases the arrays, and frees the shared memory if unlink is True."""
+        self.arrays.clear()
+        for block in self.blocks.values():
+            block.close()
+            if unlink:
+                block.unlink()
+        self.blocks.clear()
+
+
+def _run_shared(worker, input_specs, output_specs, task):
+    """Runs a task in a pool worker on the shared input and output arrays."""
+    inputs = _SharedArrays(input_specs)
+    outputs = _SharedArrays(output_specs)
+    try:
+        worker(inputs.arrays, outputs.arrays, task)
+    finally:
+        inputs.close()
+        outputs.close()
+
+
+def _run(worker, inputs, outputs, tasks, processes):
+    """Runs the tasks in the current process or in a process pool, filling the output arrays.
+
+    Args:
+        worker (callable): Runs a task, called with the input arrays, the output arrays and the task.
+        inputs (dict): The input numpy arrays by name.
+        outputs (dict): The output numpy arrays by name.
+        tasks (list): The tasks.
+        processes (int): The number of processes, None for the number of CPUs.
+    """
+    processes = min(processes or os.cpu_count() or 1, len(tasks))
+    if processes <= 1:
+        for task in tasks:
+            worker(inputs, outputs, task)
+        return
+
+    shared_inputs = _SharedArrays.create(inputs)
+    shared_outputs = _SharedArrays.create(outputs)
+    try:
+        run = functools.partial(_run_shared, worker, shared_inputs.specs, shared_outputs.specs)
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            list(pool.map(run, tasks, chunksize=max(1, len(tasks) // (processes * 4))))
+        for name, array in outputs.items():
+            array[...] = shared_outputs.arrays[name]
+    finally:
+        shared_inputs.close(unlink=True)
+        shared_outputs.close(unlink=True)
+
+
+def _chunks(groups, count):
+    """Splits (weight, item) groups into at most count lists of items of about the same weight."""
+    chunks = [[0, []] for _ in range(max(1, min(count, len(groups))))]
+    for weight, item in sorted(groups, key=lambda group: -group[0]):
+        chunk = min(chunks, key=lambda chunk: chunk[0])
+        chunk[0] += weight
+        chunk[1].append(item)
+    return [items for _, items in chunks if items]
+
+
+def _kdj_worker(inputs, outputs, task):
+    """Computes the K, D and J of the combinations of some (n, m1) pairs, all the recurrences at once."""
+    firsts = [n - 1 + max(m1 - 1, 0) for n, m1, _, _ in task]
+    k = _smooth_columns(inputs['rsv'][[row for _, _, row, _ in task]].T, [m1 for _, m1, _, _ in task], firsts)
+    combinations = [(pair, index, m2) for pair, (_, _, _, rows) in enumerate(task) for index, m2 in rows]
+    pairs = [pair for pair, _, _ in combinations]
+    indices = [index for _, index, _ in combinations]
+    k = k[:, pairs]
+    d = _smooth_columns(k, [m2 for _, _, m2 in combinations], np.asarray(firsts)[pairs])
+    # rounded while contiguous
+    outputs['K'][indices] = _round2(k).T
+    outputs['D'][indices] = _round2(d).T
+    outputs['J'][indices] = _round2(3 * k - 2 * d).T
+
+
+def sweep_kdj(high, low, close, grid, processes=None):
+    """Computes the KDJ of a series for every parameter combination of a grid.
+
+    Args:
+        high (array-like): The high prices.
+        low (array-like): The low prices.
+        close (array-like): The close prices.
+        grid (iterable): The (n, m1, m2) combinations.
+        processes (int, optional): The number of processes, 1 to run in the current process.
+            Defaults to None, the number of CPUs.
+
+    Returns:
+        dict: The combinations as 'params' and the K, D and J arrays of shape (combinations, bars),
+        the rows being the ones of `KDJ.compute`.
+    """
+    params = [tuple(combination) for combination in grid]
+    high = np.asarray(high, dtype='float64')
+    low = np.asarray(low, dtype='float64')
+    close = np.asarray(close, dtype='float64')
+    windows = sorted({n for n, _, _ in params})
+    highest_highs = rolling_max_many(high, windows)
+    lowest_lows = rolling_min_many(low, windows)
+    rsv = np.empty((len(windows), len(close)))
+    for row, n in enumerate(windows):
+        rsv[row] = _rsv(close, highest_highs[n], lowest_lows[n], n)
+
+    groups = {}
+    for index, (n, m1, m2) in enumerate(params):
+        groups.setdefault((n, m1), []).append((index, m2))
+    pairs = [(len(rows), (n, m1, windows.index(n), rows)) for (n, m1), rows in groups.items()]
+    tasks = _chunks(pairs, processes or os.cpu_count() or 1)
+    outputs = {name: np.empty((len(params), len(close))) for name in KDJ_OUTPUTS}
+    _run(_kdj_worker, {'rsv': rsv}, outputs, tasks, processes)
+    return dict(outputs, params=params)
+
+
+def _sar_worker(inputs, outputs, task):
+    """Computes the SAR of one combination."""
+    index, (max_af, af_step) = task
+    values = SAR(max_af, af_step)._values(inputs['high'], inputs['low'])
+    for name, array in zip(SAR_OUTPUTS, values):
+        outputs[name][index] = array
+
+
+def sweep_sar(high, low, grid, processes=None):
+    """Computes the Parabolic SAR of a series for every parameter combination of a grid.
+
+    Args:
+        high (array-like): The high prices.
+        low (array-like): The low prices.
+        grid (iterable): The (max_af, af_step) combinations.
+        processes (int, optional): The number of processes, 1 to run in the current process.
+            Defaults to None, the number of CPUs.
+
+    Returns:
+        dict: The combinations as 'params' and the psar, trend, af and next_psar arrays of shape
+        (combinations, bars), the rows being the ones of `SAR.compute`.
+    """
+    params = [tuple(combination) for combination in grid]
+    inputs = {'high': np.asarray(high, dtype='float64'), 'low': np.asarray(low, dtype='float64')}
+    size = len(inputs['high'])
+    outputs = {
+        name: np.empty((len(params), size), dtype='int64' if name == 'trend' else 'float64') for name in SAR_OUTPUTS
+    }
+    _run(_sar_worker, inputs, outputs, list(enumerate(params)), processes)
+    return dict(outputs, params=params)
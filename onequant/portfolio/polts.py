@@ -1,7 +1,7 @@
-"""Provide plots function for data analyze."""
+"""Provide plots function for data analyze.
 
-import matplotlib.pyplot as plt
-from wordcloud import WordCloud
+matplotlib and wordcloud are imported when a plot is drawn, not with the module.
+"""
 
 
 def generate_cloud(data):
@@ -13,6 +13,9 @@ def generate_cloud(data):
     Returns:
         None.
     """
+    import matplotlib.pyplot as plt
+    from wordcloud import WordCloud
+
     text = ' '.join(data)
 
     wordcloud = WordCloud(width=800, height=800, background_color='white').generate(text)
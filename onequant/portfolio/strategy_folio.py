@@ -1,11 +1,25 @@
 """Fetch reports and returns for strategies."""
+import time
+import warnings
 from concurrent.futures import ThreadPoolExecutor
 
-import pandas as pd
+RETURNS_RETRIES = 2
+RETURNS_RETRY_DELAY = 0.5
 
-from onequant.api.request import ApiWrapper
-from onequant.api.strategies import OqStrategies
-from onequant.data_wash.preprocess_returns import fill_date, filter_returns_by_corr
+
+class ReturnsFetchError(Exception):
+    """Raised when the returns of some strategies still fail after retrying.
+
+    Attributes:
+        failed (dict): The exception of the last attempt of every failed strategy ID.
+        data (pandas.DataFrame): The returns of the strategies that were fetched.
+    """
+
+    def __init__(self, failed, data):
+        """Initializes the ReturnsFetchError with the failed strategies and the partial returns."""
+        super().__init__(f'Failed to get returns of {len(failed)} strategies: {failed}')
+        self.failed = failed
+        self.data = data
 
 
 def get_filter_reports(
@@ -61,6 +75,8 @@ def get_filter_reports(
     oqs: OqStrategies object.
         An object of the OqStrategies class.
     """
+    from onequant.api.strategies import OqStrategies
+
     oqs = OqStrategies(wrapper=wrapper)
     reports = oqs.strategy_report(
         strategy,
@@ -82,34 +98,60 @@ def get_filter_reports(
 def get_strategy_returns(
     oqs,
     strategy_list,
-    fill_start_date=pd.Timestamp('2015-01-01', tz='UTC'),
-    fill_end_date=pd.Timestamp.now(tz='UTC'),
+    fill_start_date=None,
+    fill_end_date=None,
     data_returns=True,
+    raise_errors=False,
 ):
     """This function retrieves the returns for a given strategy ID.
 
+    The net values are fetched by one thread per pooled connection, throttled by the limiters of the
+    api. A net value that fails to download is retried `RETURNS_RETRIES` times. The strategies still
+    failing are reported in a warning and listed in `returns_df.attrs['failed']`, or raised.
+
     Parameters:
     -----------
     oqs: OqStrategies object.
         An object of the OqStrategies class.
     strategy_list: list.
         A list of strategy IDs.
-    fill_start_date: pandas.Timestamp.
-        Filled start date.
-    fill_end_date: pandas.Timestamp.
-        Filled end date.
+    fill_start_date: pandas.Timestamp, default: None.
+        Filled start date, 2015-01-01 UTC if None.
+    fill_end_date: pandas.Timestamp, default: None.
+        Filled end date, the current time if None.
     data_returns: bool.
         False if use assets,True if use returns.
+    raise_errors: bool, default: False.
+        Raise a ReturnsFetchError instead of warning if some strategies fail.
 
     Returns:
     --------
     returns_df: pandas dataframe.
         A dataframe containing the returns.
     """
+    import pandas as pd
+
+    from onequant.data_wash.preprocess_returns import fill_date
+
+    if fill_start_date is None:
+        fill_start_date = pd.Timestamp('2015-01-01', tz='UTC')
+    if fill_end_date is None:
+        fill_end_date = pd.Timestamp.now(tz='UTC')
 
     def get_returns(id):
+        error = None
+        for attempt in range(RETURNS_RETRIES + 1):
+            if attempt:
+                time.sleep(RETURNS_RETRY_DELAY * 2 ** (attempt - 1))
+            try:
+                data = oqs.strategy_netvalue(id)
+                break
+            except Exception as e:
+                error = e
+        else:
+            return None, error
+
         try:
-            data = oqs.strategy_netvalue(id)
             data['ts'] = pd.to_datetime(data['ts'])
             data.set_index('ts', inplace=True)
 
@@ -125,17 +167,27 @@ def get_strategy_returns(
             if data_returns:
                 data[id] = data[id].pct_change()
                 data = data.dropna()
-            return data
+            return data, None
         except Exception as e:
-            print(f'{id} get returns error {e}')
-            return None
+            return None, e
 
     dfs = []
-    pool = ThreadPoolExecutor()
-    for res in pool.map(get_returns, strategy_list):
-        if res is not None:
-            dfs.append(res)
-    returns_df = pd.concat(dfs, axis=1)
+    failed = {}
+    # reports may list a strategy more than once, fetch it once
+    strategy_list = list(dict.fromkeys(strategy_list))
+    # one worker per pooled connection, so no worker waits for a free connection
+    with ThreadPoolExecutor(max_workers=oqs.api.pool_size) as pool:
+        for id, (res, error) in zip(strategy_list, pool.map(get_returns, strategy_list)):
+            if res is None:
+                failed[id] = error
+            else:
+                dfs.append(res)
+    returns_df = pd.concat(dfs, axis=1) if dfs else pd.DataFrame()
+    returns_df.attrs['failed'] = failed
+    if failed:
+        if raise_errors:
+            raise ReturnsFetchError(failed, returns_df)
+        warnings.warn(f'Failed to get returns of {len(failed)} of {len(strategy_list)} strategies: {failed}')
     return returns_df
 
 
@@ -154,6 +206,8 @@ def get_strategy_filter_corr(returns=None, max_corr=0.9):
     trimmed_df: pandas dataframe.
         A dataframe containing the filtered returns.
     """
+    from onequant.data_wash.preprocess_returns import filter_returns_by_corr
+
     corr_matrix = returns.corr()
     returns_by_corr = filter_returns_by_corr(corr_matrix, cutoff=max_corr)
     trimmed_df = returns.drop(columns=returns_by_corr)
@@ -162,8 +216,11 @@ def get_strategy_filter_corr(returns=None, max_corr=0.9):
 
 
 if __name__ == '__main__':
+    import pandas as pd
     from dynaconf import Dynaconf
 
+    from onequant.api.request import ApiWrapper
+
     settings = Dynaconf(
         envvar_prefix="DYNACONF",
         settings_files=['../settings.toml', '../.secrets.toml'],
@@ -175,7 +232,6 @@ if __name__ == '__main__':
     )
     reports.sort_values(by=['sharpe', 'annual_returns'], ascending=False, inplace=True)
     raw_returns = get_strategy_returns(oqs, reports['strategy'], data_returns=True)
-    import warnings
 
     pd.set_option('display.max_columns', None)
     pd.set_option('display.max_rows', None)
@@ -1,51 +1,217 @@
-"""Module for datetime utility functions."""
+"""Module for datetime utility functions.
+
+The scalar conversions read and write wall times in the local timezone unless a `tz` is given.
+Their array versions, `strings_to_timestamps`, `strings_to_ms_timestamps` and `timestamps_to_strings`,
+take lists, numpy arrays or pandas Series and convert them with datetime64 arithmetic:
+
+    OqDateTime.strings_to_ms_timestamps(['20230103', '2023-01-04', '2023-01-05 09:00:00'], tz='Asia/Shanghai')
+
+A `tz` is 'UTC', a utc offset such as '+08:00', a `datetime.tzinfo`, or an IANA name, which needs
+the `zoneinfo` module of Python 3.9.
+"""
 
 import datetime
+import functools
+import time
+
+_EPOCH = datetime.datetime(1970, 1, 1)
 
 
 class OqDateTime:
     """This class provides methods to convert timestamps to strings and vice versa."""
 
     @staticmethod
-    def timestamp_to_string(timestamp):
+    def timestamp_to_string(timestamp, tz=None):
         """Converts a timestamp to a string in the format 'YYYY-MM-DD HH:MM:SS'.
 
         Args:
             timestamp (int): The timestamp to convert.
+            tz (str or datetime.tzinfo, optional): The timezone of the string. Defaults to None, the local timezone.
 
         Returns:
             str: The formatted date and time string.
         """
-        return datetime.datetime.fromtimestamp(timestamp).strftime('%Y-%m-%d %H:%M:%S')
+        return datetime.datetime.fromtimestamp(timestamp, _tzinfo(tz)).strftime('%Y-%m-%d %H:%M:%S')
 
     @staticmethod
-    def string_to_timestamp(date_string):
+    def string_to_timestamp(date_string, tz=None):
         """Converts a date and time string in the format 'YYYY-MM-DD HH:MM:SS' to a timestamp.
 
+        'YYYY-MM-DD' and 'YYYYMMDD' dates are read as midnight.
+
         Args:
             date_string (str): The date and time string to convert.
+            tz (str or datetime.tzinfo, optional): The timezone of the string. Defaults to None, the local timezone.
 
         Returns:
             int: The timestamp.
         """
-        if len(date_string) == 10:
-            date_string += ' 00:00:00'
-        elif len(date_string) == 8:
-            date_string = date_string[:4] + '-' + date_string[4:6] + '-' + date_string[6:] + ' 00:00:00'
-        return int(datetime.datetime.strptime(date_string, '%Y-%m-%d %H:%M:%S').timestamp())
+        return int(_parse(date_string).replace(tzinfo=_tzinfo(tz)).timestamp())
 
     @staticmethod
-    def string_to_ms_timestamp(date_string):
+    def string_to_ms_timestamp(date_string, tz=None):
         """Converts a date and time string in the format 'YYYY-MM-DD HH:MM:SS' to a timestamp in milliseconds.
 
         Args:
             date_string (str): The date and time string to convert.
+            tz (str or datetime.tzinfo, optional): The timezone of the string. Defaults to None, the local timezone.
 
         Returns:
             int: The timestamp in milliseconds.
         """
-        if len(date_string) == 10:
-            date_string += ' 00:00:00'
-        elif len(date_string) == 8:
-            date_string = date_string[:4] + '-' + date_string[4:6] + '-' + date_string[6:] + ' 00:00:00'
-        return int(datetime.datetime.strptime(date_string, '%Y-%m-%d %H:%M:%S').timestamp() * 1000)
+        return int(_parse(date_string).replace(tzinfo=_tzinfo(tz)).timestamp() * 1000)
+
+    @staticmethod
+    def strings_to_timestamps(date_strings, tz=None):
+        """Converts date and time strings to timestamps, see `string_to_timestamp`.
+
+        Every distinct string is parsed once.
+
+        Args:
+            date_strings (list, numpy.ndarray or pandas.Series): The date and time strings to convert.
+            tz (str or datetime.tzinfo, optional): The timezone of the strings. Defaults to None, the local timezone.
+
+        Returns:
+            numpy.ndarray: The int64 timestamps, a pandas Series with the same index for a Series.
+        """
+        return _like(date_strings, _strings_to_epoch(date_strings, tz, 's'))
+
+    @staticmethod
+    def strings_to_ms_timestamps(date_strings, tz=None):
+        """Converts date and time strings to timestamps in milliseconds, see `string_to_ms_timestamp`.
+
+        Args:
+            date_strings (list, numpy.ndarray or pandas.Series): The date and time strings to convert.
+            tz (str or datetime.tzinfo, optional): The timezone of the strings. Defaults to None, the local timezone.
+
+        Returns:
+            numpy.ndarray: The int64 timestamps in milliseconds, a pandas Series with the same index for a Series.
+        """
+        return _like(date_strings, _strings_to_epoch(date_strings, tz, 'ms'))
+
+    @staticmethod
+    def timestamps_to_strings(timestamps, tz=None, unit='s'):
+        """Converts timestamps to strings in the format 'YYYY-MM-DD HH:MM:SS', see `timestamp_to_string`.
+
+        Args:
+            timestamps (list, numpy.ndarray or pandas.Series): The timestamps to convert.
+            tz (str or datetime.tzinfo, optional): The timezone of the strings. Defaults to None, the local timezone.
+            unit (str, optional): The unit of the timestamps, 's' or 'ms'. Defaults to 's'.
+
+        Returns:
+            numpy.ndarray: The strings, a pandas Series with the same index for a Series.
+        """
+        import numpy as np
+
+        assert unit in ['s', 'ms'], 'Unsupported unit'
+        instants = np.asarray(timestamps, dtype='int64').astype(f'datetime64[{unit}]').astype('datetime64[s]')
+        wall = instants + _offsets(instants, _tzinfo(tz), utc=True)
+        strings = np.datetime_as_string(wall.ravel(), unit='s')
+        # swap the 'T' separator for a space in place, the 11th code point of every string
+        if len(strings):
+            strings.view('uint32').reshape(len(strings), -1)[:, 10] = ord(' ')
+        return _like(timestamps, strings.reshape(wall.shape))
+
+    @staticmethod
+    def interval_to_ms(interval):
+        """Converts a K-line interval such as '1m', '15m', '1h' or '1d' to milliseconds.
+
+        Plain numbers are minutes and 'D'/'W' are one day/week, like TradingView resolutions.
+
+        Args:
+            interval (str): The interval to convert.
+
+        Returns:
+            int: The length of the interval in milliseconds, or None if the interval is not recognized.
+        """
+        units = {'s': 1000, 'm': 60000, 'h': 3600000, 'H': 3600000, 'd': 86400000, 'D': 86400000}
+        units.update({'w': 7 * units['d'], 'W': 7 * units['d']})
+        interval = str(interval).strip()
+        if interval.isdigit():
+            return int(interval) * units['m']
+        count, unit = interval[:-1], interval[-1:]
+        if unit not in units or not (count == '' or count.isdigit()):
+            return None
+        return int(count or 1) * units[unit]
+
+
+def _tzinfo(tz):
+    """Returns the tzinfo of a timezone name, a utc offset such as '+08:00', or a tzinfo. None stays None."""
+    if tz is None or isinstance(tz, datetime.tzinfo):
+        return tz
+    if tz.upper() in ('UTC', 'Z'):
+        return datetime.timezone.utc
+    if tz[:1] in '+-' and len(tz) == 6 and tz[3] == ':':
+        sign = -1 if tz[0] == '-' else 1
+        return datetime.timezone(sign * datetime.timedelta(hours=int(tz[1:3]), minutes=int(tz[4:6])))
+    from zoneinfo import ZoneInfo
+
+    return ZoneInfo(tz)
+
+
+@functools.lru_cache(maxsize=4096)
+def _parse(date_string):
+    """Parses a 'YYYY-MM-DD HH:MM:SS', 'YYYY-MM-DD' or 'YYYYMMDD' string to a naive datetime."""
+    if len(date_string) == 10:
+        date_string += ' 00:00:00'
+    elif len(date_string) == 8:
+        date_string = date_string[:4] + '-' + date_string[4:6] + '-' + date_string[6:] + ' 00:00:00'
+    return datetime.datetime.strptime(date_string, '%Y-%m-%d %H:%M:%S')
+
+
+def _strings_to_epoch(date_strings, tz, unit):
+    """Converts wall time strings of a timezone to int64 epoch timestamps in a unit."""
+    import numpy as np
+
+    strings = np.asarray(date_strings, dtype=str)
+    unique, inverse = np.unique(strings, return_inverse=True)
+    # numpy reads 'YYYYMMDD' as a year, spell those out
+    short = np.char.str_len(unique) == 8
+    if short.any():
+        unique = unique.astype(object)
+        unique[short] = [f'{s[:4]}-{s[4:6]}-{s[6:]}' for s in unique[short]]
+    wall = np.array(unique, dtype='datetime64[s]')
+    epoch = (wall - _offsets(wall, _tzinfo(tz), utc=False)).astype(f'datetime64[{unit}]').astype('int64')
+    return epoch[inverse.reshape(strings.shape)]
+
+
+def _offsets(times, tz, utc):
+    """Returns the utc offsets of a timezone at datetime64[s] times.
+
+    The offsets are looked up once per distinct hour, the timezones of the exchanges change their
+    offset on the hour.
+
+    Args:
+        times (numpy.ndarray): The datetime64[s] times.
+        tz (datetime.tzinfo): The timezone, None for the local timezone.
+        utc (bool): Whether the times are utc instants, otherwise they are wall times of the timezone.
+
+    Returns:
+        numpy.ndarray: The timedelta64[s] offsets.
+    """
+    import numpy as np
+
+    if isinstance(tz, datetime.timezone):
+        return np.full(times.shape, int(tz.utcoffset(None).total_seconds()), dtype='timedelta64[s]')
+    hours, inverse = np.unique(times.astype('datetime64[h]'), return_inverse=True)
+    seconds = hours.astype('datetime64[s]').astype('int64').tolist()
+    if tz is None and utc:
+        offsets = [time.localtime(t).tm_gmtoff for t in seconds]
+    elif tz is None:
+        # mktime reads a wall time of the local timezone, like datetime.timestamp() of a naive datetime
+        offsets = [t - int(time.mktime(time.gmtime(t)[:8] + (-1,))) for t in seconds]
+    elif utc:
+        offsets = [datetime.datetime.fromtimestamp(t, tz).utcoffset() for t in seconds]
+    else:
+        offsets = [tz.utcoffset(_EPOCH + datetime.timedelta(seconds=t)) for t in seconds]
+    offsets = [o if isinstance(o, int) else int(o.total_seconds()) for o in offsets]
+    return np.array(offsets, dtype='timedelta64[s]')[inverse.reshape(times.shape)]
+
+
+def _like(values, result):
+    """Returns result as a pandas Series with the index of values if values is a Series."""
+    if type(values).__module__.startswith('pandas') and hasattr(values, 'index'):
+        import pandas as pd
+
+        return pd.Series(result, index=values.index, name=values.name)
+    return result
@@ -0,0 +1,18 @@
+"""Fixtures shared by the tests, running the api against a local stand-in server."""
+import pytest
+
+from onequant.api.request import ApiWrapper
+from onequant.api.standin import StandInServer
+
+
+@pytest.fixture(scope='session')
+def standin():
+    """A stand-in server answering with synthetic responses."""
+    with StandInServer(symbols=25, max_page_size=10) as server:
+        yield server
+
+
+@pytest.fixture
+def wrapper(standin):
+    """A wrapper logged in to the stand-in server."""
+    return ApiWrapper(standin.url, 'user', 'password')
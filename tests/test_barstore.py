@@ -0,0 +1,80 @@
+"""Tests for `onequant.api.barstore` and the K-lines of `OqQuotes` read through it."""
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from onequant.api.barstore import BarStore
+from onequant.api.quotes import OqQuotes
+
+
+def _bars(start, count):
+    """Returns count 1m bars from start."""
+    ts = np.datetime64(start, 'ms') + np.arange(count) * np.timedelta64(60000, 'ms')
+    return {'ts': ts, 'close': np.arange(count, dtype='float64'), 'symbol': np.array(['rb000'] * count, dtype=object)}
+
+
+def test_missing_ranges(tmp_path):
+    """Only the parts of a range not fetched yet are missing."""
+    store = BarStore(str(tmp_path))
+    assert store.missing('rb000', '1m', 0, 100) == [[0, 100]]
+    store.write('rb000', '1m', {}, [[10, 20], [21, 30], [50, 60]])
+    assert store.ranges('rb000', '1m') == [[10, 30], [50, 60]]
+    assert store.missing('rb000', '1m', 0, 100) == [[0, 9], [31, 49], [61, 100]]
+    assert store.missing('rb000', '1m', 12, 28) == []
+
+
+def test_write_merges_and_reads_slices(tmp_path):
+    """Writes are merged on ts, the newly fetched bars winning, and read back by ts."""
+    store = BarStore(str(tmp_path))
+    store.write('rb000', '1m', _bars('2024-01-02T09:00', 10), [])
+    newer = _bars('2024-01-02T09:05', 10)
+    newer['close'] += 100
+    store.write('rb000', '1m', newer, [])
+
+    bars = store.read('rb000', '1m')
+    assert len(bars['ts']) == 15
+    assert bars['close'].tolist() == list(range(5)) + list(range(100, 110))
+    assert bars['symbol'].tolist() == ['rb000'] * 15
+    part = store.read('rb000', '1m', np.datetime64('2024-01-02T09:03'), np.datetime64('2024-01-02T09:06'))
+    assert part['ts'].tolist() == _bars('2024-01-02T09:03', 4)['ts'].tolist()
+
+
+def test_invalidate(tmp_path):
+    """Invalidating a symbol drops its bars and ranges only."""
+    store = BarStore(str(tmp_path))
+    store.write('rb000', '1m', _bars('2024-01-02T09:00', 3), [[0, 1]])
+    store.write('ag000', '1m', _bars('2024-01-02T09:00', 3), [[0, 1]])
+    store.invalidate('rb000')
+    assert store.read('rb000', '1m') is None
+    assert store.ranges('rb000', '1m') == []
+    assert len(store.read('ag000', '1m')['ts']) == 3
+
+
+@pytest.fixture(params=['UTC', 'Asia/Shanghai'])
+def timezone(request, monkeypatch):
+    """Runs a test in several local timezones."""
+    monkeypatch.setenv('TZ', request.param)
+    time.tzset()
+    yield request.param
+    monkeypatch.undo()
+    time.tzset()
+
+
+def test_stored_bars_match_direct_fetch(wrapper, tmp_path, timezone):
+    """The bars read through the store are the ones fetched directly, whatever the local timezone."""
+    stored = OqQuotes(wrapper, store=BarStore(str(tmp_path)))
+    direct = OqQuotes(wrapper)
+    ranges = [
+        ('2024-01-02 09:00:00', '2024-01-02 15:00:00'),
+        # inside the range already stored, read without fetching
+        ('2024-01-02 10:30:00', '2024-01-02 11:30:00'),
+        # overlapping it, only the gaps are fetched
+        ('2024-01-02 06:00:00', '2024-01-02 18:00:00'),
+    ]
+    for start, end in ranges:
+        expected = direct.future_bars('rb000', '1m', start, end)
+        assert len(expected)
+        # copied out of the memory-mapped columns
+        pd.testing.assert_frame_equal(stored.future_bars('rb000', '1m', start, end).copy(), expected)
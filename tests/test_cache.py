@@ -0,0 +1,95 @@
+"""Tests for `onequant.api.cache`."""
+import os
+
+import pytest
+
+from onequant.api import cache as cache_module
+from onequant.api.cache import ApiCache
+
+ROUTER = '/quote/futureBase/allCode'
+OTHER_ROUTER = '/quote/futureBase/symbol'
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """A clock of the cache moved by hand."""
+    now = [1000.0]
+    monkeypatch.setattr(cache_module.time, 'time', lambda: now[0])
+    return now
+
+
+def test_result_expires_after_ttl(clock):
+    """A result is served until the TTL of its router, then dropped."""
+    cache = ApiCache(ttl={ROUTER: 10})
+    cache.set(ROUTER, {'a': 1}, [1, 2])
+    clock[0] += 9.9
+    assert cache.get(ROUTER, {'a': 1}) == [1, 2]
+    clock[0] += 0.1
+    assert cache.get(ROUTER, {'a': 1}) is None
+    assert cache.stats()['routers'][ROUTER] == {'hits': 1, 'misses': 1}
+
+
+def test_routers_without_ttl_are_not_cached():
+    """Only the routers with a TTL are cached."""
+    cache = ApiCache(ttl={ROUTER: 10})
+    cache.set(OTHER_ROUTER, {}, 1)
+    assert not cache.caches(OTHER_ROUTER)
+    assert cache.get(OTHER_ROUTER, {}, default='missing') == 'missing'
+
+
+def test_results_are_copies():
+    """Modifying a returned result does not modify the cached one."""
+    cache = ApiCache()
+    value = {'rows': [1, 2]}
+    cache.set(ROUTER, {}, value)
+    value['rows'].append(3)
+    cache.get(ROUTER, {})['rows'].append(4)
+    assert cache.get(ROUTER, {}) == {'rows': [1, 2]}
+
+
+def test_lru_evicts_oldest():
+    """The least recently used result is dropped beyond maxsize."""
+    cache = ApiCache(maxsize=2)
+    for page in range(3):
+        cache.set(ROUTER, {'page': page}, page)
+    assert cache.get(ROUTER, {'page': 0}) is None
+    assert cache.get(ROUTER, {'page': 2}) == 2
+
+
+def test_disk_store_survives_restart(tmp_path, clock):
+    """A result stored on disk is served by a new cache, until it expires."""
+    ApiCache(path=str(tmp_path), ttl={ROUTER: 10}).set(ROUTER, {}, 'value')
+    assert ApiCache(path=str(tmp_path), ttl={ROUTER: 10}).get(ROUTER, {}) == 'value'
+    clock[0] += 10
+    assert ApiCache(path=str(tmp_path), ttl={ROUTER: 10}).get(ROUTER, {}) is None
+    assert os.listdir(tmp_path) == []
+
+
+def test_invalidate_router_and_params(tmp_path):
+    """Invalidating a router, or one of its requests, leaves the other results."""
+    cache = ApiCache(path=str(tmp_path))
+    cache.set(ROUTER, {'page': 1}, 1)
+    cache.set(ROUTER, {'page': 2}, 2)
+    cache.set(OTHER_ROUTER, {}, 3)
+
+    cache.invalidate(ROUTER, {'page': 1})
+    assert cache.get(ROUTER, {'page': 1}) is None
+    assert cache.get(ROUTER, {'page': 2}) == 2
+
+    cache.invalidate(ROUTER)
+    reloaded = ApiCache(path=str(tmp_path))
+    assert reloaded.get(ROUTER, {'page': 2}) is None
+    assert reloaded.get(OTHER_ROUTER, {}) == 3
+
+
+def test_invalidate_keeps_foreign_files(tmp_path):
+    """Invalidating everything only removes the files of the cache from a shared directory."""
+    (tmp_path / 'settings.toml').write_text('key = 1')
+    (tmp_path / 'bars').mkdir()
+    cache = ApiCache(path=str(tmp_path))
+    cache.set(ROUTER, {}, 1)
+    cache.set(OTHER_ROUTER, {}, 2)
+
+    cache.invalidate()
+    assert sorted(os.listdir(tmp_path)) == ['bars', 'settings.toml']
+    assert ApiCache(path=str(tmp_path)).get(ROUTER, {}) is None
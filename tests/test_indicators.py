@@ -0,0 +1,158 @@
+"""Tests for the MA, EMA, MACD, RSI, ATR and BOLL indicators and the common interface of the indicators."""
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from onequant.indicators.ATR import ATR
+from onequant.indicators.BOLL import BOLL
+from onequant.indicators.EMA import EMA
+from onequant.indicators.KDJ import KDJ, StreamingKDJ
+from onequant.indicators.MA import MA
+from onequant.indicators.MACD import MACD
+from onequant.indicators.rolling import RollingMoments, rolling_moments
+from onequant.indicators.RSI import RSI
+from onequant.indicators.SAR import StreamingSAR
+
+# SAR.compute returns the trends and factors too, it is tested against calcPSAR in test_sar
+INDICATORS = [
+    MA(20),
+    MA(1),
+    EMA(12),
+    EMA(1),
+    MACD(3, 7, 4),
+    MACD(1, 1, 1),
+    RSI(14),
+    RSI(1),
+    ATR(14),
+    ATR(1),
+    BOLL(20, 2),
+    BOLL(2, 2),
+    KDJ(9, 3, 3),
+    StreamingKDJ(9, 3, 3),
+    StreamingSAR(0.2, 0.02, 3),
+]
+
+
+def _walk(size, level, tick, seed=0):
+    """Returns a random walk of size closes moving by whole ticks around level."""
+    rng = np.random.default_rng(seed)
+    return level + np.cumsum(rng.integers(-2, 3, size)) * tick
+
+
+def _ids(indicator):
+    """Returns the name of an indicator and its parameters."""
+    return type(indicator).__name__ + repr(tuple(indicator.params.values()))
+
+
+def _frame(size, seed=0, flat=False):
+    """Returns size bars of high, low and close prices, all the same if flat."""
+    rng = np.random.default_rng(seed)
+    close = np.full(size, 100.0) if flat else 100 + np.cumsum(rng.normal(0, 1, size)).round(2)
+    spread = 0 if flat else rng.uniform(0, 2, size).round(2)
+    return pd.DataFrame({'high': close + spread, 'low': close - spread, 'close': close})
+
+
+def _outputs(indicator, values):
+    """Returns the OUTPUTS of compute, or of update rows, as a list of float arrays."""
+    if len(indicator.OUTPUTS) == 1:
+        values = [values]
+    return [np.asarray(column, dtype='float64') for column in values]
+
+
+def _stream(indicator, df, restore=None):
+    """Returns the update rows of every bar of df, restoring the indicator from JSON at restore."""
+    rows = []
+    for index, bar in enumerate(zip(*(df[name].tolist() for name in indicator.INPUTS))):
+        if index == restore:
+            indicator = type(indicator).from_state(json.loads(json.dumps(indicator.get_state())))
+        rows.append(indicator.update(*bar))
+    return (list(zip(*rows)) or [[]] * len(indicator.OUTPUTS)) if len(indicator.OUTPUTS) > 1 else rows, indicator
+
+
+def _state(indicator):
+    """Returns the state of an indicator as JSON types."""
+    return json.loads(json.dumps(indicator.get_state()))
+
+
+@pytest.mark.parametrize('indicator', INDICATORS, ids=_ids)
+@pytest.mark.parametrize('size, flat', [(300, False), (300, True), (0, False), (1, False), (5, False)])
+def test_compute_matches_update(indicator, size, flat):
+    """Compute gives the values of update on every bar, restored from a JSON state or not."""
+    df = _frame(size, flat=flat)
+    expected = _outputs(indicator, indicator.compute(*(df[name] for name in indicator.INPUTS)))
+    for restore in (None, 0, size // 3):
+        streamed = _outputs(indicator, _stream(type(indicator)(**indicator.params), df, restore)[0])
+        for name, values, rows in zip(indicator.OUTPUTS, expected, streamed):
+            np.testing.assert_array_equal(rows, values, err_msg=f'{name} restored at {restore}')
+
+
+@pytest.mark.parametrize('indicator', INDICATORS, ids=_ids)
+@pytest.mark.parametrize('cut', [0, 1, 4, 150])
+def test_apply_leaves_streamed_state(indicator, cut):
+    """Apply leaves the state of update on the same bars, to stream on from."""
+    df = _frame(300, seed=1)
+    inputs = [df[name] for name in indicator.INPUTS]
+    applied = type(indicator)(**indicator.params)
+    applied.apply(*(column[:cut] for column in inputs))
+    rows, streamed = _stream(type(indicator)(**indicator.params), df[:cut])
+    assert _state(applied) == _state(streamed)
+    expected = _outputs(indicator, indicator.compute(*inputs))
+    continued = _outputs(indicator, _stream(applied, df[cut:])[0])
+    for values, rows in zip(expected, continued):
+        np.testing.assert_array_equal(rows, values[cut:])
+
+
+@pytest.mark.parametrize('indicator', INDICATORS, ids=_ids)
+def test_apply_to_df(indicator):
+    """apply_to_df adds the columns of compute, at once on a new indicator and bar by bar after."""
+    df = _frame(300, seed=2)
+    expected = _outputs(indicator, indicator.compute(*(df[name] for name in indicator.INPUTS)))
+    applied = type(indicator)(**indicator.params)
+    head, tail = applied.apply_to_df(df[:200].copy()), applied.apply_to_df(df[200:].copy())
+    for name, values in zip(indicator.OUTPUTS, expected):
+        np.testing.assert_array_equal(np.concatenate([head[name], tail[name]]).astype('float64'), values)
+
+
+@pytest.mark.parametrize('level', [100.0, 1e4, 1e6])
+@pytest.mark.parametrize('tick', [0.01, 1.0])
+def test_boll_std_at_price_levels(level, tick):
+    """The bands are k sample standard deviations of the window, whatever the price level."""
+    close = _walk(5000, level, tick)
+    mid, upper, lower = BOLL(20, 2).compute(close)
+    windows = np.lib.stride_tricks.sliding_window_view(close, 20)
+    std = windows.std(axis=1, ddof=1)
+    np.testing.assert_allclose(mid[19:], windows.mean(axis=1), rtol=1e-12)
+    # the std is read back from bands of the magnitude of the prices
+    np.testing.assert_allclose((upper - mid)[19:] / 2, std, rtol=1e-12, atol=level * 1e-15)
+    np.testing.assert_allclose((mid - lower)[19:] / 2, std, rtol=1e-12, atol=level * 1e-15)
+
+
+def test_boll_flat_series():
+    """The bands of a flat series are the series itself."""
+    mid, upper, lower = BOLL(5, 2).compute(np.full(20, 3801.5))
+    assert np.isnan(mid[:4]).all()
+    assert mid[4:].tolist() == upper[4:].tolist() == lower[4:].tolist() == [3801.5] * 16
+
+
+def test_rolling_moments_match_streaming():
+    """The batch moments are the floats of RollingMoments, and the deviations are centered."""
+    values = _walk(1003, 1e6, 0.01, seed=1)
+    deviations, squares, anchors = rolling_moments(values, 7)
+    moments = RollingMoments(7)
+    streamed = [moments.update(value) for value in values.tolist()][6:]
+    assert deviations.tolist() == [total for total, _ in streamed]
+    assert squares.tolist() == [square for _, square in streamed]
+    assert np.abs(anchors - values[6:]).max() < 1
+
+
+def test_boll_batch_matches_streaming():
+    """BOLL gives the same floats in batch, bar by bar and restored from a JSON state."""
+    close = _walk(500, 1e6, 0.01, seed=2)
+    batch = np.column_stack(BOLL(20, 2).compute(close))
+    boll = BOLL(20, 2)
+    rows = [boll.update(value) for value in close[:250].tolist()]
+    boll = BOLL.from_state(json.loads(json.dumps(boll.get_state())))
+    rows += [boll.update(value) for value in close[250:].tolist()]
+    np.testing.assert_array_equal(np.array(rows), batch)
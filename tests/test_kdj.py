@@ -0,0 +1,124 @@
+"""Tests for the KDJ indicators, the batch and streaming forms being identical to calcKDJ on every row."""
+import json
+import random
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from onequant.indicators.KDJ import KDJ, StreamingKDJ, _round2
+
+PARAMS = [(9, 3, 3), (43, 9, 3), (1, 1, 1), (2, 1, 5), (5, 6, 1)]
+LISTS = ('high_list', 'low_list', 'rsv_list', 'k_list', 'd_list', 'j_list')
+
+
+def _bars(size, seed=0, ticks=True):
+    """Returns size (high, low, close) bars of a random walk, on whole ticks or not."""
+    rng = random.Random(seed)
+    bars, price = [], 100.0
+    for _ in range(size):
+        if ticks:
+            price += rng.randint(-2, 2)
+            bars.append((price + rng.randint(0, 2), price - rng.randint(0, 2), price))
+        else:
+            price += rng.gauss(0, 1)
+            bars.append((price + abs(rng.gauss(0, 0.5)), price - abs(rng.gauss(0, 0.5)), price))
+    return bars
+
+
+def _rows(params, bars):
+    """Returns calcKDJ of every bar and the KDJ object after them."""
+    kdj = KDJ(*params)
+    return [kdj.calcKDJ(*bar) for bar in bars], kdj
+
+
+def _compute(params, bars):
+    """Returns KDJ.compute of the bars as (K, D, J) rows."""
+    k, d, j = KDJ(*params).compute(*(list(column) for column in zip(*bars)) if bars else ([], [], []))
+    return list(zip(k.tolist(), d.tolist(), j.tolist()))
+
+
+@pytest.mark.parametrize('params', PARAMS)
+@pytest.mark.parametrize('seed, ticks', [(0, True), (1, False), (2, True)])
+def test_compute_matches_calc(params, seed, ticks):
+    """KDJ.compute gives the values of calcKDJ on every row."""
+    bars = _bars(300, seed, ticks)
+    assert _compute(params, bars) == _rows(params, bars)[0]
+
+
+@pytest.mark.parametrize('params', PARAMS)
+def test_flat_series(params):
+    """A series without any range stays at 50."""
+    bars = [(100.0, 100.0, 100.0)] * 60
+    assert _compute(params, bars) == _rows(params, bars)[0] == [(50.0, 50.0, 50.0)] * 60
+
+
+@pytest.mark.parametrize('size', [0, 1, 5, 9, 10, 11])
+def test_short_series(size):
+    """Series shorter than the warm-up give the values of calcKDJ too."""
+    bars = _bars(size, seed=3)
+    assert _compute((9, 3, 3), bars) == _rows((9, 3, 3), bars)[0]
+
+
+@pytest.mark.parametrize('params', PARAMS)
+def test_apply_to_df(params):
+    """apply_to_df adds the columns of calcKDJ and leaves the lists calcKDJ would have."""
+    bars = _bars(200, seed=4)
+    rows, expected = _rows(params, bars)
+    kdj = KDJ(*params)
+    df = kdj.apply_to_df(pd.DataFrame(bars, columns=['high', 'low', 'close']))
+    assert list(zip(df['K'], df['D'], df['J'])) == rows
+    for name in LISTS:
+        assert getattr(kdj, name) == getattr(expected, name), name
+
+    # then continues row by row, and so does apply_to_df on more rows
+    assert kdj.calcKDJ(101, 99, 100) == expected.calcKDJ(101, 99, 100)
+    more = _bars(20, seed=5)
+    df = kdj.apply_to_df(pd.DataFrame(more, columns=['high', 'low', 'close']))
+    assert list(zip(df['K'], df['D'], df['J'])) == [expected.calcKDJ(*bar) for bar in more]
+
+
+def test_round2_matches_round():
+    """_round2 rounds like round, ties included."""
+    values = np.concatenate(
+        [np.random.default_rng(0).uniform(-1000, 1000, 100000), np.arange(-1000, 1000) / 100 + 0.005]
+    )
+    assert _round2(values).tolist() == [round(value, 2) for value in values.tolist()]
+    assert _round2(values.reshape(-1, 4)).ravel().tolist() == _round2(values).tolist()
+
+
+@pytest.mark.parametrize('params', PARAMS)
+@pytest.mark.parametrize('seed, ticks', [(0, True), (1, False)])
+@pytest.mark.parametrize('cut', [0, 1, 9, 30, 200])
+def test_streaming_resumes_from_json_state(params, seed, ticks, cut):
+    """Restored from its JSON state at any bar, StreamingKDJ goes on with the values of calcKDJ."""
+    bars = _bars(200, seed, ticks)
+    expected = _rows(params, bars)[0]
+    kdj, rows = StreamingKDJ(*params), []
+    for index, bar in enumerate(bars):
+        if index == cut:
+            kdj = StreamingKDJ.from_state(json.loads(json.dumps(kdj.get_state())))
+        rows.append(kdj.calcKDJ(*bar))
+        # the state does not grow with the bars
+        assert len(kdj.highs) <= params[0] and len(kdj.lows) <= params[0]
+    assert rows == expected
+
+
+@pytest.mark.parametrize('params', PARAMS)
+@pytest.mark.parametrize('cut', [0, 1, 9, 30, 200])
+def test_streaming_apply_to_df_then_stream(params, cut):
+    """The apply_to_df of StreamingKDJ gives the values of calcKDJ and a state to stream on from."""
+    bars = _bars(200, seed=6)
+    expected = _rows(params, bars)[0]
+    kdj = StreamingKDJ(*params)
+    df = kdj.apply_to_df(pd.DataFrame(bars[:cut], columns=['high', 'low', 'close']))
+    assert list(zip(df['K'], df['D'], df['J'])) == expected[:cut]
+    resumed = StreamingKDJ.from_state(json.loads(json.dumps(kdj.get_state())))
+    assert [resumed.calcKDJ(*bar) for bar in bars[cut:]] == expected[cut:]
+    assert [kdj.calcKDJ(*bar) for bar in bars[cut:]] == expected[cut:]
+
+
+def test_streaming_flat_series():
+    """A series without any range stays at 50 when streamed."""
+    kdj = StreamingKDJ(5, 3, 3)
+    assert [kdj.calcKDJ(100.0, 100.0, 100.0) for _ in range(30)] == [(50.0, 50.0, 50.0)] * 30
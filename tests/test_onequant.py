@@ -1,21 +1,32 @@
 #!/usr/bin/env python
 """Tests for `onequant` package."""
+import subprocess
+import sys
 
 import pytest
 
+import onequant
 
-@pytest.fixture
-def response():
-    """Sample pytest fixture.
 
-    See more at: http://doc.pytest.org/en/latest/fixture.html
-    """
-    # import requests
-    # return requests.get('https://github.com/DarkDemiurg/cookiecutter-pypackage')
+def test_public_names():
+    """The public names resolve to the classes of their modules."""
+    from onequant.api.quotes import OqQuotes
+    from onequant.api.request import ApiWrapper
 
+    assert onequant.OqQuotes is OqQuotes
+    assert onequant.ApiWrapper is ApiWrapper
+    assert set(onequant.__all__) <= set(dir(onequant))
 
-def test_content(response):
-    """Sample pytest test function with the pytest fixture as an argument."""
-    # from bs4 import BeautifulSoup
-    # assert 'GitHub' in BeautifulSoup(response.content).title.string
-    del response
+
+def test_unknown_name():
+    """An unknown name raises AttributeError."""
+    with pytest.raises(AttributeError):
+        onequant.not_a_name
+
+
+def test_import_is_lazy():
+    """Importing the package does not import the api nor its heavy dependencies."""
+    modules = ('numpy', 'pandas', 'requests', 'onequant.api')
+    code = f'import sys, onequant; print(sorted(m for m in {modules} if m in sys.modules))'
+    output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True).stdout
+    assert output.strip() == '[]'
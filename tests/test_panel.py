@@ -0,0 +1,177 @@
+"""Tests for the panel indicators, every column being identical to the indicator of its symbol."""
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from onequant.indicators.KDJ import KDJ
+from onequant.indicators.panel import PanelKDJ, PanelSAR
+from onequant.indicators.SAR import SAR
+
+KDJ_PARAMS = [(9, 3, 3), (1, 1, 1), (5, 2, 4)]
+SAR_PARAMS = [(0.2, 0.02), (0.2, 0.2), (0.1, 0.05)]
+
+
+def _panels(bars, symbols, seed=0, flat=False):
+    """Returns (bars, symbols) high, low and close panels of random walks on whole ticks."""
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 1, (bars, symbols)), axis=0).round(1)
+    if flat:
+        return close.copy(), close.copy(), close
+    return (
+        close + rng.uniform(0, 2, (bars, symbols)).round(1),
+        close - rng.uniform(0, 2, (bars, symbols)).round(1),
+        close,
+    )
+
+
+def _stream(indicator, panels, start, restore):
+    """Yields the update of every bar of the panels from start, restoring the indicator from JSON at restore."""
+    for bar in range(start, len(panels[0])):
+        if bar == restore:
+            indicator = type(indicator).from_state(json.loads(json.dumps(indicator.get_state())))
+        yield bar, indicator, indicator.update(*(panel[bar] for panel in panels))
+
+
+@pytest.mark.parametrize('params', KDJ_PARAMS)
+@pytest.mark.parametrize('bars, flat', [(150, False), (150, True), (0, False), (1, False), (6, False)])
+def test_kdj_columns_match_compute(params, bars, flat):
+    """Every column of PanelKDJ.compute is the KDJ.compute of its symbol."""
+    panels = _panels(bars, 7, flat=flat)
+    result = PanelKDJ(*params).compute(*panels)
+    for symbol in range(7):
+        expected = KDJ(*params).compute(*(panel[:, symbol] for panel in panels))
+        for values, column in zip(result, expected):
+            np.testing.assert_array_equal(values[:, symbol], column)
+
+
+@pytest.mark.parametrize('params', KDJ_PARAMS)
+@pytest.mark.parametrize('cut', [0, 1, 8, 60])
+def test_kdj_update_after_apply(params, cut):
+    """PanelKDJ.update after apply, and after a JSON state round trip, gives the rows of compute."""
+    panels = _panels(120, 5, seed=1)
+    expected = PanelKDJ(*params).compute(*panels)
+    kdj = PanelKDJ(*params)
+    for values, rows in zip(kdj.apply(*(panel[:cut] for panel in panels)), expected):
+        np.testing.assert_array_equal(values, rows[:cut])
+    for bar, kdj, result in _stream(kdj, panels, cut, (cut + 120) // 2):
+        for values, rows in zip(result, expected):
+            np.testing.assert_array_equal(values, rows[bar])
+
+
+@pytest.mark.parametrize('params', SAR_PARAMS)
+@pytest.mark.parametrize('bars, flat', [(150, False), (150, True), (0, False), (1, False), (3, False)])
+def test_sar_columns_match_compute(params, bars, flat):
+    """Every column of PanelSAR.compute is the SAR.compute of its symbol, dtypes included."""
+    high, low, _ = _panels(bars, 7, flat=flat)
+    result = PanelSAR(*params).compute(high, low)
+    for symbol in range(7):
+        for values, column in zip(result, SAR(*params).compute(high[:, symbol], low[:, symbol])):
+            assert values.dtype == column.dtype
+            np.testing.assert_array_equal(values[:, symbol], column)
+
+
+@pytest.mark.parametrize('params', SAR_PARAMS)
+@pytest.mark.parametrize('cut', [0, 1, 2, 60])
+def test_sar_update_after_apply(params, cut):
+    """PanelSAR.update after apply, and after a JSON state round trip, gives the rows of compute."""
+    high, low, _ = _panels(120, 5, seed=2)
+    psar, trend, af, next_psar = PanelSAR(*params).compute(high, low)
+    sar = PanelSAR(*params)
+    np.testing.assert_array_equal(sar.apply(high[:cut], low[:cut])[0], psar[:cut])
+    for bar, sar, result in _stream(sar, (high, low), cut, (cut + 120) // 2):
+        np.testing.assert_array_equal(result, psar[bar])
+        np.testing.assert_array_equal(sar.trend, trend[bar])
+        np.testing.assert_array_equal(sar.af, af[bar])
+        np.testing.assert_array_equal(sar.next_psar, next_psar[bar])
+
+
+def test_dataframes_in_dataframes_out():
+    """Panels given as DataFrames give DataFrames with their index and columns."""
+    high, low, close = (
+        pd.DataFrame(panel, columns=['rb', 'hc', 'i'], index=pd.date_range('2023-01-01', periods=30, freq='min'))
+        for panel in _panels(30, 3)
+    )
+    for values in PanelKDJ().compute(high, low, close) + PanelSAR().compute(high, low):
+        assert isinstance(values, pd.DataFrame)
+        pd.testing.assert_index_equal(values.index, close.index)
+        pd.testing.assert_index_equal(values.columns, close.columns)
+    np.testing.assert_array_equal(PanelKDJ().apply(high, low, close)[0], PanelKDJ().compute(high, low, close)[0])
+
+
+def _ragged(bars=150, symbols=10, seed=3):
+    """Returns panels whose symbols miss bars: late listings, gaps, suspensions, delistings, no bar at all."""
+    high, low, close = _panels(bars, symbols, seed)
+    missing = np.zeros((bars, symbols), dtype=bool)
+    missing[:40, 0] = True
+    missing[70, 1] = True
+    missing[50:90, 2] = True
+    missing[120:, 3] = True
+    missing[:, 4] = True
+    missing[::7, 5] = True
+    missing[: bars - 3, 6] = True
+    high[missing] = np.nan
+    # a bar missing only one of its prices is missing too
+    close[100, 7] = np.nan
+    return high, low, close
+
+
+def _valid_bars(panels, symbol):
+    """Returns the rows where a symbol has all its prices, and its prices of those rows."""
+    columns = [panel[:, symbol] for panel in panels]
+    rows = np.flatnonzero(~np.any(np.isnan(columns), axis=0))
+    return rows, [column[rows] for column in columns]
+
+
+@pytest.mark.parametrize('params', KDJ_PARAMS)
+def test_kdj_ragged_panel(params):
+    """Every symbol of a ragged panel gets KDJ.compute of its own bars, and NaN at its missing bars."""
+    panels = _ragged()
+    result = PanelKDJ(*params).compute(*panels)
+    for symbol in range(panels[0].shape[1]):
+        rows, bars = _valid_bars(panels, symbol)
+        for values, column in zip(result, KDJ(*params).compute(*bars)):
+            np.testing.assert_array_equal(values[rows, symbol], column)
+            assert np.isnan(np.delete(values[:, symbol], rows)).all()
+
+
+@pytest.mark.parametrize('params', KDJ_PARAMS)
+@pytest.mark.parametrize('cut', [0, 30, 60, 149])
+def test_kdj_ragged_update_after_apply(params, cut):
+    """PanelKDJ.update over missing bars, after apply and a JSON state round trip, gives the rows of compute."""
+    panels = _ragged()
+    expected = PanelKDJ(*params).compute(*panels)
+    kdj = PanelKDJ(*params)
+    for values, rows in zip(kdj.apply(*(panel[:cut] for panel in panels)), expected):
+        np.testing.assert_array_equal(values, rows[:cut])
+    for bar, kdj, result in _stream(kdj, panels, cut, (cut + 150) // 2):
+        for values, rows in zip(result, expected):
+            np.testing.assert_array_equal(values, rows[bar])
+
+
+@pytest.mark.parametrize('params', SAR_PARAMS)
+def test_sar_ragged_panel(params):
+    """Every symbol of a ragged panel gets SAR.compute of its own bars, and NaN at its missing bars."""
+    high, low, _ = _ragged()
+    result = PanelSAR(*params).compute(high, low)
+    for symbol in range(high.shape[1]):
+        rows, bars = _valid_bars((high, low), symbol)
+        for values, column in zip(result, SAR(*params).compute(*bars)):
+            np.testing.assert_array_equal(values[rows, symbol], column)
+        for values in (result[0], result[2], result[3]):
+            assert np.isnan(np.delete(values[:, symbol], rows)).all()
+
+
+@pytest.mark.parametrize('params', SAR_PARAMS)
+@pytest.mark.parametrize('cut', [0, 30, 60, 149])
+def test_sar_ragged_update_after_apply(params, cut):
+    """PanelSAR.update over missing bars, after apply and a JSON state round trip, gives the rows of compute."""
+    high, low, _ = _ragged()
+    psar, trend, af, next_psar = PanelSAR(*params).compute(high, low)
+    sar = PanelSAR(*params)
+    sar.apply(high[:cut], low[:cut])
+    for bar, sar, result in _stream(sar, (high, low), cut, (cut + 150) // 2):
+        np.testing.assert_array_equal(result, psar[bar])
+        np.testing.assert_array_equal(sar.trend, trend[bar])
+    assert json.loads(json.dumps(sar.get_state(), allow_nan=False))
@@ -0,0 +1,110 @@
+"""Tests for the K-lines of `onequant.api.quotes`."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from onequant.api import quotes as quotes_module
+from onequant.api.barstore import BarStore
+from onequant.api.quotes import BarsFetchError, OqQuotes, _split_range, _stitch_bars
+
+START, END = '2024-01-02 09:00:00', '2024-01-03 09:00:00'
+
+
+@pytest.fixture
+def small_chunks(monkeypatch):
+    """Splits the K-line ranges into chunks of 100 bars, retried at once."""
+    monkeypatch.setattr(quotes_module, 'KLINE_CHUNK_BARS', 100)
+    monkeypatch.setattr(quotes_module, 'KLINE_RETRY_DELAY', 0)
+
+
+def test_split_range():
+    """The chunks cover the range without overlap, both ends included."""
+    assert _split_range(0, 249, 100) == [[0, 99], [100, 199], [200, 249]]
+    assert _split_range(0, 200, 100) == [[0, 99], [100, 199], [200, 200]]
+    assert _split_range(5, 5, 100) == [[5, 5]]
+    assert _split_range(0, 1000, None) == [[0, 1000]]
+
+
+def test_stitch_bars_drops_repeated_bars():
+    """Bars repeated on the chunk boundaries are kept once, in time order."""
+    ts = np.datetime64('2024-01-02T09:00', 'ms') + np.arange(6) * np.timedelta64(60000, 'ms')
+    chunks = [
+        {'ts': ts[:3], 'close': np.array([0.0, 1.0, 2.0])},
+        {'ts': ts[2:6], 'close': np.array([2.0, 3.0, 4.0, 5.0])},
+        {'ts': ts[:0], 'close': np.array([])},
+    ]
+    stitched = _stitch_bars(chunks)
+    assert stitched['ts'].tolist() == ts.tolist()
+    assert stitched['close'].tolist() == [0.0, 1.0, 2.0, 3.0, 4.0, 5.0]
+    assert _stitch_bars([chunks[0]]) is chunks[0]
+    assert _stitch_bars([]) == {}
+
+
+def test_chunked_fetch_matches_single_request(wrapper, standin, monkeypatch):
+    """A long range fetched in concurrent chunks gives the bars of one request."""
+    quotes = OqQuotes(wrapper)
+    single = quotes.future_bars('rb000', '1m', START, END)
+    assert len(single) == 24 * 60 + 1
+
+    monkeypatch.setattr(quotes_module, 'KLINE_CHUNK_BARS', 100)
+    requests = standin.requests
+    done = []
+    chunked = quotes.future_bars('rb000', '1m', START, END, progress=lambda *args: done.append(args))
+    assert standin.requests - requests == 15
+    assert done[-1] == (15, 15)
+    pd.testing.assert_frame_equal(chunked, single)
+    assert chunked['ts'].is_monotonic_increasing and chunked['ts'].is_unique
+
+    streamed = quotes.future_bars('rb000', '1m', START, END, stream=True)
+    pd.testing.assert_frame_equal(streamed, single)
+
+
+def test_limit_is_not_chunked(wrapper, standin, small_chunks):
+    """A request with a limit is sent as is."""
+    requests = standin.requests
+    bars = OqQuotes(wrapper).future_bars('rb000', '1m', START, END, limit=250)
+    assert standin.requests - requests == 1
+    assert len(bars) == 250
+
+
+def _failing(quotes, starts):
+    """Makes the chunks starting at the given ms timestamps fail."""
+    fetch = quotes._querytd_pd
+
+    def querytd_pd(router, params, **kwargs):
+        if params['start'] in starts:
+            raise ConnectionError(params['start'])
+        return fetch(router=router, params=params, **kwargs)
+
+    quotes._querytd_pd = querytd_pd
+
+
+def test_failed_chunks(wrapper, tmp_path, small_chunks):
+    """Failed chunks raise a BarsFetchError, the store keeps the others and fetches the rest next time."""
+    quotes = OqQuotes(wrapper, store=BarStore(str(tmp_path)))
+    params = quotes._bars_params('rb000', '1m', START, END, None)
+    ranges = _split_range(params['start'], params['end'], quotes_module._chunk_span('1m'))
+    _failing(quotes, {ranges[3][0], ranges[7][0]})
+
+    with pytest.raises(BarsFetchError) as error:
+        quotes.future_bars('rb000', '1m', START, END)
+    assert sorted(error.value.failed) == [tuple(ranges[3]), tuple(ranges[7])]
+    assert quotes.store.missing('rb000', '1m', params['start'], params['end']) == [ranges[3], ranges[7]]
+
+    del quotes._querytd_pd
+    fetched = quotes.future_bars('rb000', '1m', START, END)
+    pd.testing.assert_frame_equal(fetched.copy(), OqQuotes(wrapper).future_bars('rb000', '1m', START, END))
+
+
+def test_future_bars_batch(wrapper):
+    """The panel of several symbols holds the bars of each one."""
+    quotes = OqQuotes(wrapper)
+    panel = quotes.future_bars_batch(['rb000', 'ag000'], '1m', START, '2024-01-02 10:00:00')
+    for code in ('rb000', 'ag000'):
+        expected = quotes.future_bars(code, '1m', START, '2024-01-02 10:00:00')
+        assert panel.loc[code]['close'].tolist() == expected['close'].tolist()
+
+    wide = quotes.future_bars_batch(['rb000', 'ag000'], '1m', START, '2024-01-02 10:00:00', layout='wide')
+    assert wide['symbols'] == ['rb000', 'ag000']
+    assert wide['close'].shape == (61, 2)
+    assert wide['close'][:, 1].tolist() == panel.loc['ag000']['close'].tolist()
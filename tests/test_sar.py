@@ -0,0 +1,154 @@
+"""Tests for the Parabolic SAR indicators, the batch and streaming forms being identical to calcPSAR on every row."""
+import json
+import random
+
+import pandas as pd
+import pytest
+
+from onequant.indicators.SAR import SAR, StreamingSAR
+
+PARAMS = [(0.2, 0.02), (0.1, 0.01), (0.3, 0.05), (0.2, 0.2)]
+ATTRIBUTES = (
+    'psar_list',
+    'af_list',
+    'high_list',
+    'low_list',
+    'trend_list',
+    'next_psar_list',
+    'high_price_trend',
+    'low_price_trend',
+    'trend',
+    'af',
+    'last_high',
+    'last_low',
+)
+
+
+def _bars(size, seed=0, ticks=True):
+    """Returns size (high, low) bars of a random walk, on whole ticks or not."""
+    rng = random.Random(seed)
+    bars, price = [], 100.0
+    for _ in range(size):
+        if ticks:
+            price += rng.randint(-3, 3)
+            bars.append((price + rng.randint(0, 2), price - rng.randint(0, 2)))
+        else:
+            price += rng.gauss(0, 1)
+            bars.append((price + abs(rng.gauss(0, 0.5)), price - abs(rng.gauss(0, 0.5))))
+    return bars
+
+
+def _rows(params, bars):
+    """Returns calcPSAR of every bar and the SAR object after them."""
+    sar = SAR(*params)
+    return [sar.calcPSAR(*bar) for bar in bars], sar
+
+
+def _columns(bars):
+    """Returns the high and low lists of the bars."""
+    return [bar[0] for bar in bars], [bar[1] for bar in bars]
+
+
+@pytest.mark.parametrize('params', PARAMS)
+@pytest.mark.parametrize('seed, ticks', [(0, True), (1, False), (2, True)])
+def test_compute_matches_calc(params, seed, ticks):
+    """SAR.compute gives the values of calcPSAR, its trends, factors and next values on every row."""
+    bars = _bars(300, seed, ticks)
+    rows, expected = _rows(params, bars)
+    psar, trend, af, next_psar = SAR(*params).compute(*_columns(bars))
+    assert psar.tolist() == rows
+    assert trend.tolist() == expected.trend_list
+    assert af.tolist() == expected.af_list
+    assert next_psar.tolist() == expected.next_psar_list
+
+
+@pytest.mark.parametrize('params', PARAMS)
+def test_flat_series(params):
+    """A series without any range gives the values of calcPSAR."""
+    bars = [(100.0, 100.0)] * 60
+    rows, expected = _rows(params, bars)
+    psar, trend, af, next_psar = SAR(*params).compute(*_columns(bars))
+    assert psar.tolist() == rows
+    assert trend.tolist() == expected.trend_list
+
+
+@pytest.mark.parametrize('size', [0, 1, 2, 3])
+def test_short_series(size):
+    """Series of a few bars, or none, give the values of calcPSAR."""
+    bars = _bars(size, seed=3)
+    rows, expected = _rows((0.2, 0.02), bars)
+    psar, trend, af, next_psar = SAR().compute(*_columns(bars))
+    assert psar.tolist() == rows
+    assert next_psar.tolist() == expected.next_psar_list
+
+
+@pytest.mark.parametrize('params', PARAMS)
+def test_apply_to_df(params):
+    """apply_to_df adds the column of calcPSAR and leaves the state calcPSAR would have."""
+    bars = _bars(200, seed=4)
+    rows, expected = _rows(params, bars)
+    sar = SAR(*params)
+    df = sar.apply_to_df(pd.DataFrame(bars, columns=['high', 'low']))
+    assert df['PSAR'].tolist() == rows
+    for name in ATTRIBUTES:
+        assert getattr(sar, name) == getattr(expected, name), name
+
+    # then continues row by row
+    more = _bars(20, seed=5)
+    assert [sar.calcPSAR(*bar) for bar in more] == [expected.calcPSAR(*bar) for bar in more]
+
+
+def _history(sar):
+    """Returns the (psar, trend, af, next_psar) rows a SAR object kept."""
+    return list(zip(sar.psar_list, sar.trend_list, sar.af_list, sar.next_psar_list))
+
+
+@pytest.mark.parametrize('params', PARAMS)
+@pytest.mark.parametrize('seed, ticks', [(0, True), (1, False)])
+@pytest.mark.parametrize('cut', [0, 1, 2, 50, 300])
+def test_streaming_resumes_from_json_state(params, seed, ticks, cut):
+    """Restored from its JSON state at any bar, StreamingSAR goes on with the values of calcPSAR."""
+    bars = _bars(300, seed, ticks)
+    rows, expected = _rows(params, bars)
+    sar, streamed = StreamingSAR(*params, history_size=5), []
+    for index, bar in enumerate(bars):
+        if index == cut:
+            sar = StreamingSAR.from_state(json.loads(json.dumps(sar.get_state())))
+        streamed.append(sar.calcPSAR(*bar))
+    assert streamed == rows
+    assert list(sar.history) == _history(expected)[-5:]
+    assert sar.next_psar == expected.next_psar_list[-1]
+
+
+@pytest.mark.parametrize('history_size', [0, 1, 5])
+@pytest.mark.parametrize('size', [0, 1, 3, 100])
+def test_streaming_history(history_size, size):
+    """The history of StreamingSAR holds the last rows of calcPSAR, and no more."""
+    bars = _bars(size, seed=2)
+    expected = _rows((0.2, 0.02), bars)[1]
+    sar = StreamingSAR(history_size=history_size)
+    for bar in bars:
+        sar.calcPSAR(*bar)
+    assert list(sar.history) == (_history(expected)[-history_size:] if history_size else [])
+
+
+@pytest.mark.parametrize('params', PARAMS)
+@pytest.mark.parametrize('cut', [0, 1, 2, 50, 200])
+def test_streaming_apply_to_df_then_stream(params, cut):
+    """The apply_to_df of StreamingSAR gives the values of calcPSAR and a state to stream on from."""
+    bars = _bars(200, seed=6)
+    rows, expected = _rows(params, bars)
+    sar = StreamingSAR(*params, history_size=5)
+    df = sar.apply_to_df(pd.DataFrame(bars[:cut], columns=['high', 'low']))
+    assert df['PSAR'].tolist() == rows[:cut]
+    resumed = StreamingSAR.from_state(json.loads(json.dumps(sar.get_state())))
+    assert [resumed.calcPSAR(*bar) for bar in bars[cut:]] == rows[cut:]
+    assert [sar.calcPSAR(*bar) for bar in bars[cut:]] == rows[cut:]
+    assert list(sar.history) == _history(expected)[-5:]
+
+
+def test_streaming_flat_series():
+    """A series without any range gives the values of calcPSAR when streamed."""
+    bars = [(100.0, 100.0)] * 30
+    sar = StreamingSAR()
+    assert [sar.calcPSAR(*bar) for bar in bars] == _rows((0.2, 0.02), bars)[0]
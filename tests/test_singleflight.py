@@ -0,0 +1,62 @@
+"""Tests for `onequant.api.singleflight`."""
+import threading
+import time
+
+import pandas as pd
+
+from onequant.api import singleflight as singleflight_module
+from onequant.api.singleflight import SingleFlight
+
+
+def _wait_for(condition):
+    """Waits until condition() is true, for a few seconds at most."""
+    deadline = time.monotonic() + 5
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.001)
+
+
+def test_leader_changes_do_not_reach_followers(monkeypatch):
+    """The caller running the call modifying its frame in place leaves the frames of the others intact."""
+    copy = singleflight_module._copy
+
+    def slow_copy(result):
+        # the callers that waited copy after the first caller has modified its frame
+        time.sleep(0.05)
+        return copy(result)
+
+    monkeypatch.setattr(singleflight_module, '_copy', slow_copy)
+    flights = SingleFlight()
+    release = threading.Event()
+
+    def call():
+        release.wait(5)
+        return pd.DataFrame({'ts': [1, 2], 'value': [1.0, 2.0]})
+
+    def leader():
+        # what get_strategy_returns does with its frame
+        frame = flights.do('netvalue', call)
+        frame['ts'] = frame['ts'] * 1000
+        frame.set_index('ts', inplace=True)
+
+    results = []
+    threads = [threading.Thread(target=leader)]
+    threads[0].start()
+    _wait_for(lambda: flights.stats()['in_flight'] == 1)
+    for _ in range(3):
+        threads.append(threading.Thread(target=lambda: results.append(flights.do('netvalue', call))))
+        threads[-1].start()
+    _wait_for(lambda: flights.stats()['shared'] == 3)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(results) == 3
+    for frame in results:
+        pd.testing.assert_frame_equal(frame, pd.DataFrame({'ts': [1, 2], 'value': [1.0, 2.0]}))
+
+
+def test_result_of_unshared_call_is_not_copied():
+    """A call nobody waited for returns its result itself."""
+    result = pd.DataFrame({'value': [1.0]})
+    assert SingleFlight().do('netvalue', lambda: result) is result
@@ -0,0 +1,70 @@
+"""Tests for `onequant.portfolio.strategy_folio`."""
+import pandas as pd
+import pytest
+
+from onequant.api.strategies import OqStrategies
+from onequant.portfolio import strategy_folio
+from onequant.portfolio.strategy_folio import ReturnsFetchError, get_strategy_returns
+
+START = pd.Timestamp('2015-01-05', tz='UTC')
+# before the last net value, nothing is filled
+END = pd.Timestamp('2016-12-30', tz='UTC')
+
+
+@pytest.fixture
+def strategies(wrapper, monkeypatch):
+    """The OqStrategies of the stand-in server, strategies named 'bad*' failing."""
+    monkeypatch.setattr(strategy_folio, 'RETURNS_RETRY_DELAY', 0)
+    oqs = OqStrategies(wrapper)
+    netvalue = oqs.strategy_netvalue
+
+    def strategy_netvalue(strategy_id):
+        if strategy_id.startswith('bad'):
+            raise ConnectionError(strategy_id)
+        return netvalue(strategy_id)
+
+    oqs.strategy_netvalue = strategy_netvalue
+    return oqs
+
+
+def _returns(oqs, strategy_id):
+    """Returns the business day returns of one strategy, computed step by step."""
+    data = oqs.strategy_netvalue(strategy_id)
+    data = data.set_index(pd.to_datetime(data['ts']))[['net_value']]
+    data.index = data.index.floor('D')
+    data = data.resample('D').ffill()
+    data = data[data.index.dayofweek < 5]
+    return data['net_value'].pct_change().dropna()
+
+
+def test_returns_of_every_strategy(strategies):
+    """Every strategy gets one column of its business day returns, repeated strategies once."""
+    returns = get_strategy_returns(strategies, ['s1', 's2', 's1'], fill_start_date=START, fill_end_date=END)
+    assert returns.columns.tolist() == ['s1', 's2']
+    assert returns.attrs['failed'] == {}
+    assert (returns.index.dayofweek < 5).all()
+    for strategy_id in ('s1', 's2'):
+        expected = _returns(strategies, strategy_id)
+        pd.testing.assert_series_equal(returns[strategy_id], expected, check_names=False, check_freq=False)
+
+
+def test_net_values(strategies):
+    """With data_returns False the net values are returned."""
+    values = get_strategy_returns(strategies, ['s1'], fill_start_date=START, fill_end_date=END, data_returns=False)
+    assert values['s1'].iloc[0] == strategies.strategy_netvalue('s1')['net_value'].iloc[0]
+
+
+def test_failed_strategies_warn(strategies):
+    """Strategies still failing after the retries are reported in a warning and in the attrs."""
+    with pytest.warns(UserWarning, match='1 of 2 strategies'):
+        returns = get_strategy_returns(strategies, ['s1', 'bad1'], fill_start_date=START, fill_end_date=END)
+    assert returns.columns.tolist() == ['s1']
+    assert isinstance(returns.attrs['failed']['bad1'], ConnectionError)
+
+
+def test_failed_strategies_raise(strategies):
+    """With raise_errors a ReturnsFetchError holds the returns fetched."""
+    with pytest.raises(ReturnsFetchError) as error:
+        get_strategy_returns(strategies, ['bad1', 's2'], fill_start_date=START, fill_end_date=END, raise_errors=True)
+    assert list(error.value.failed) == ['bad1']
+    assert error.value.data.columns.tolist() == ['s2']
@@ -0,0 +1,72 @@
+"""Tests for the parameter sweeps, every row being identical to the indicator of its combination."""
+import itertools
+
+import numpy as np
+import pytest
+
+from onequant.indicators.KDJ import KDJ
+from onequant.indicators.SAR import SAR
+from onequant.indicators.sweep import sweep_kdj, sweep_sar
+
+KDJ_GRID = list(itertools.product([1, 5, 9, 30], [1, 3], [1, 3]))
+SAR_GRID = list(itertools.product([0.1, 0.2], [0.01, 0.02, 0.2]))
+
+
+@pytest.fixture(scope='module')
+def bars():
+    """High, low and close prices of a random walk on whole ticks."""
+    rng = np.random.default_rng(0)
+    close = 3000 + np.cumsum(rng.normal(0, 1, 2000)).round(1)
+    return close + rng.uniform(0, 2, 2000).round(1), close - rng.uniform(0, 2, 2000).round(1), close
+
+
+@pytest.mark.parametrize('processes', [1, 2])
+def test_sweep_kdj_matches_compute(bars, processes):
+    """Every row of sweep_kdj is the KDJ.compute of its combination."""
+    result = sweep_kdj(*bars, KDJ_GRID, processes=processes)
+    assert result['params'] == KDJ_GRID
+    for row, params in enumerate(KDJ_GRID):
+        for name, values in zip(('K', 'D', 'J'), KDJ(*params).compute(*bars)):
+            np.testing.assert_array_equal(result[name][row], values, err_msg=f'{name} {params}')
+
+
+@pytest.mark.parametrize('processes', [1, 2])
+def test_sweep_sar_matches_compute(bars, processes):
+    """Every row of sweep_sar is the SAR.compute of its combination, dtypes included."""
+    high, low, _ = bars
+    result = sweep_sar(high, low, SAR_GRID, processes=processes)
+    assert result['params'] == SAR_GRID
+    for row, params in enumerate(SAR_GRID):
+        for name, values in zip(('psar', 'trend', 'af', 'next_psar'), SAR(*params).compute(high, low)):
+            assert result[name].dtype == values.dtype
+            np.testing.assert_array_equal(result[name][row], values, err_msg=f'{name} {params}')
+
+
+def test_flat_series():
+    """A series without any range gives the rows of the indicators."""
+    flat = np.full(50, 100.0)
+    result = sweep_kdj(flat, flat, flat, KDJ_GRID, processes=1)
+    for row, params in enumerate(KDJ_GRID):
+        np.testing.assert_array_equal(result['K'][row], KDJ(*params).compute(flat, flat, flat)[0])
+    result = sweep_sar(flat, flat, SAR_GRID, processes=1)
+    for row, params in enumerate(SAR_GRID):
+        np.testing.assert_array_equal(result['psar'][row], SAR(*params).compute(flat, flat)[0])
+
+
+@pytest.mark.parametrize('size', [0, 1, 3])
+def test_short_series(bars, size):
+    """Series of a few bars, or none, give rows of that many bars."""
+    high, low, close = (column[:size] for column in bars)
+    result = sweep_kdj(high, low, close, KDJ_GRID, processes=2)
+    assert result['K'].shape == (len(KDJ_GRID), size)
+    for row, params in enumerate(KDJ_GRID):
+        np.testing.assert_array_equal(result['J'][row], KDJ(*params).compute(high, low, close)[2])
+    result = sweep_sar(high, low, SAR_GRID, processes=2)
+    for row, params in enumerate(SAR_GRID):
+        np.testing.assert_array_equal(result['psar'][row], SAR(*params).compute(high, low)[0])
+
+
+def test_empty_grid(bars):
+    """An empty grid gives no rows."""
+    assert sweep_kdj(*bars, [], processes=2)['K'].shape == (0, len(bars[2]))
+    assert sweep_sar(*bars[:2], [], processes=2)['psar'].shape == (0, len(bars[2]))
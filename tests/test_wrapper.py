@@ -0,0 +1,158 @@
+"""Tests for the pagination and the TDengine decoding of `onequant.api.wrapper`."""
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from onequant.api import synthetic
+from onequant.api import wrapper as wrapper_module
+from onequant.api.quotes import OqQuotes
+from onequant.api.tdstream import iter_tddata_chunks
+from onequant.api.wrapper import PaginationError, _pagination, _tddata_columns, _tddata_rows
+
+
+class _Pages:
+    """A paginated query of rows, some pages failing a given number of times."""
+
+    def __init__(self, n_rows, page_size, failures=None):
+        self.api = SimpleNamespace(pool_size=4)
+        self.rows = [{'i': i} for i in range(n_rows)]
+        self.page_size = page_size
+        self.failures = dict(failures or {})
+        self.pages = []
+
+    @_pagination
+    def query(self, params=None):
+        """Returns a page, or a failure while the page has failures left."""
+        page = params['current']
+        self.pages.append(page)
+        if self.failures.get(page):
+            self.failures[page] -= 1
+            if page % 2:
+                raise ConnectionError(f'page {page}')
+            return {'code': 500, 'data': None}
+        return synthetic.page_payload(self.rows, page, min(params['pageSize'], self.page_size))
+
+
+@pytest.fixture(autouse=True)
+def no_retry_delay(monkeypatch):
+    """Retries failed pages at once."""
+    monkeypatch.setattr(wrapper_module, 'PAGE_RETRY_DELAY', 0)
+
+
+def test_pages_joined_in_order():
+    """The pages are fetched concurrently and joined in page order."""
+    pages = _Pages(95, 10)
+    rows, code = pages.query(params={'symbol': 'rb'})
+    assert code == 200
+    assert rows == pages.rows
+    assert sorted(pages.pages) == list(range(1, 11))
+
+
+def test_single_page():
+    """A query of one page sends one request."""
+    pages = _Pages(5, 10)
+    assert pages.query()[0] == pages.rows
+    assert pages.pages == [1]
+
+
+def test_failed_pages_are_retried():
+    """A page failing fewer times than the retries is fetched."""
+    pages = _Pages(50, 10, failures={2: wrapper_module.PAGE_RETRIES, 3: 1})
+    assert pages.query()[0] == pages.rows
+    assert pages.pages.count(2) == wrapper_module.PAGE_RETRIES + 1
+
+
+def test_pagination_error():
+    """Pages failing every retry raise a PaginationError holding the other pages."""
+    pages = _Pages(50, 10, failures={2: 99, 5: 99})
+    with pytest.raises(PaginationError) as error:
+        pages.query()
+    assert set(error.value.failed) == {2, 5}
+    assert error.value.failed[2] == 500
+    assert isinstance(error.value.failed[5], ConnectionError)
+    assert error.value.data == pages.rows[:10] + pages.rows[20:40]
+
+
+def test_paginated_router(wrapper):
+    """The paginated routers of OqQuotes return the rows of every page of the server."""
+    codes = OqQuotes(wrapper).codeinfos()
+    assert codes['symbol'].tolist() == [f'sym{i}' for i in range(25)]
+
+
+def _payload(column_meta, rows):
+    return synthetic.tdengine_payload(column_meta, rows)
+
+
+def test_decode_column_types():
+    """Every TDengine type is decoded to its numpy dtype, NULL becoming NaN, NaT or None."""
+    meta = [
+        ['ts', 'TIMESTAMP', 8],
+        ['price', 'FLOAT', 4],
+        ['volume', 'BIGINT', 8],
+        ['flag', 'BOOL', 1],
+        ['symbol', 'NCHAR', 16],
+    ]
+    rows = [
+        ['2024-01-02 09:00:00.000', 3800.5, 10, True, 'rb000'],
+        ['2024-01-02 09:01:00.000', None, 11, False, 'rb000'],
+        [None, 3801.0, None, None, None],
+    ]
+    columns, code = _tddata_columns(_payload(meta, rows))
+    assert code == 200
+    assert columns['ts'].dtype == 'datetime64[ms]'
+    assert columns['ts'][:2].tolist() == np.array(['2024-01-02T09:00', '2024-01-02T09:01'], 'datetime64[ms]').tolist()
+    assert np.isnat(columns['ts'][2])
+    assert columns['price'].dtype == 'float64' and np.isnan(columns['price'][1])
+    # NULL in an integer column
+    assert columns['volume'].dtype == 'float64' and np.isnan(columns['volume'][2])
+    assert columns['flag'].tolist() == [True, False, None]
+    assert columns['symbol'].tolist() == ['rb000', 'rb000', None]
+
+
+def test_decode_type_codes_and_rfc3339():
+    """The type codes of the REST api 2.x are decoded, RFC 3339 timestamps keep their wall time."""
+    meta = [['ts', 9, 8], ['volume', 5, 8], ['price', 7, 8]]
+    rows = [['2024-01-02T09:00:00.000+08:00', 1, 1.5], ['2024-01-02T09:01:00.000+08:00', 2, 2.5]]
+    columns, _ = _tddata_columns(_payload(meta, rows))
+    assert columns['ts'].astype(str).tolist() == ['2024-01-02T09:00:00.000', '2024-01-02T09:01:00.000']
+    assert columns['volume'].dtype == 'int64'
+    assert columns['price'].tolist() == [1.5, 2.5]
+
+
+def test_decode_empty_and_errors():
+    """Empty responses keep their columns, failed ones return their code."""
+    columns, code = _tddata_columns(_payload(synthetic.KLINE_COLUMNS, []))
+    assert code == 200
+    assert list(columns) == [name for name, _, _ in synthetic.KLINE_COLUMNS]
+    assert all(len(column) == 0 for column in columns.values())
+    assert columns['ts'].dtype == 'datetime64[ms]'
+
+    failed = {'code': 200, 'data': {'code': 9, 'column_meta': [], 'data': [], 'rows': 0}}
+    assert _tddata_columns(failed) == (None, 200)
+    assert _tddata_columns({'code': 500, 'data': None}) == (None, 400)
+    assert _tddata_columns(None) == (None, 400)
+
+
+def test_columns_match_rows():
+    """The column decoder gives the values of the row decoder."""
+    payload = synthetic.kline_payload(500)
+    columns, _ = _tddata_columns(payload)
+    rows, _ = _tddata_rows(payload)
+    for name in columns:
+        values = [row[name] for row in rows]
+        if name == 'ts':
+            values = np.array(values, dtype='datetime64[ms]').tolist()
+        assert columns[name].tolist() == values
+
+
+def test_streamed_decode_matches_whole():
+    """Decoding a body in chunks gives the columns of decoding it whole."""
+    payload = synthetic.kline_payload(1234)
+    body = synthetic.encode(payload)
+    pieces = [body[i : i + 1000] for i in range(0, len(body), 1000)]
+    chunks = list(iter_tddata_chunks(pieces, chunk_rows=100))
+    assert [len(chunk['ts']) for chunk in chunks] == [100] * 12 + [34]
+    whole, _ = _tddata_columns(payload)
+    for name, column in whole.items():
+        assert np.concatenate([chunk[name] for chunk in chunks]).tolist() == column.tolist()